@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark of per-message SMS client overhead
+
+Compares building a provider client and HTTP connection for every message
+(what the views used to do) with the shared per-process registry and its
+pooled session. Messages go to a local keep-alive HTTP server, so the
+numbers are client overhead plus loopback round trips - no real SMS is sent
+and nothing is written to the database.
+
+Usage:
+    python benchmark_sms_overhead.py --messages 2000
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add the project directory to Python path
+project_dir = Path(__file__).resolve().parent
+sys.path.append(str(project_dir))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rental_management.settings')
+
+import django
+django.setup()
+
+import requests
+from django.conf import settings
+
+
+class OKHandler(BaseHTTPRequestHandler):
+    """Answers every request like SMSMobile accepting a message"""
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; with Nagle on, keep-alive
+    # responses stall on the client's delayed ACK (~40ms each)
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        OKHandler.connections += 1
+
+    def do_GET(self):
+        body = b'Message sent successfully'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run(label, send, messages):
+    OKHandler.connections = 0
+    latencies = []
+    started = time.perf_counter()
+    for i in range(messages):
+        t0 = time.perf_counter()
+        success = send(i)
+        latencies.append(time.perf_counter() - t0)
+        if not success:
+            print(f"❌ {label}: message {i} failed")
+            return None
+    elapsed = time.perf_counter() - started
+    result = {
+        'label': label,
+        'per_message_us': elapsed / messages * 1e6,
+        'p50_us': percentile(latencies, 50) * 1e6,
+        'p99_us': percentile(latencies, 99) * 1e6,
+        'connections': OKHandler.connections,
+    }
+    print(f"📊 {label:<32} {result['per_message_us']:>9.1f} µs/msg  "
+          f"p50 {result['p50_us']:>8.1f} µs  p99 {result['p99_us']:>8.1f} µs  "
+          f"connections opened: {result['connections']}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=1000, help='Messages per scenario (default: 1000)')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), OKHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/sendsms"
+
+    settings.SMSMOBILE_API_KEY = 'benchmark'
+    settings.SMSMOBILE_API_URL = url
+
+    from rental_app import provider_registry
+    from rental_app.sms_service import SMSMobileService
+
+    print("🔍 SMS client overhead benchmark")
+    print("=" * 50)
+    print(f"📱 {args.messages} messages per scenario against {url}")
+
+    def per_message_client(i):
+        # Old pattern: new service and a fresh connection for every message
+        service = SMSMobileService()
+        response = requests.get(service.api_url, params={'api_key': service.api_key, 'recipients': '+254712345678',
+                                                          'message': f'Benchmark {i}', 'sender_id': service.sender_id},
+                                timeout=10)
+        return response.status_code == 200
+
+    def registry_client(i):
+        provider = provider_registry.get_provider('smsmobile')
+        return provider.deliver('+254712345678', f'Benchmark {i}').success
+
+    # Warm both paths once so imports and DNS are not measured
+    per_message_client(0)
+    provider_registry.reset()
+    registry_client(0)
+
+    old = run('new client per message', per_message_client, args.messages)
+    new = run('shared registry client', registry_client, args.messages)
+    server.shutdown()
+
+    if old and new:
+        print(f"\n✅ Registry saves {old['per_message_us'] - new['per_message_us']:.1f} µs per message "
+              f"({old['per_message_us'] / new['per_message_us']:.1f}x faster)")
+    return bool(old and new)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
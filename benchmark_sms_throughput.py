@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""
+SMS throughput benchmark against the local provider simulator
+
+Sends a bulk_sms_reminder-sized batch of rent reminders through the real
+service classes (and the failover router) to sms_simulator.py, then reports
+messages/sec and p50/p99 latency per provider. Runs against a throwaway
+test database, so the real database and real providers are never touched.
+
+By default the app's own SMS_RATE_LIMITS are disabled to measure the raw
+send path; pass --app-rate-limits to include them.
+
+Usage:
+    python benchmark_sms_throughput.py --tenants 200 --latency 50 --jitter 30 --error-rate 0.02
+    python benchmark_sms_throughput.py --providers router --workers 4 --rate-limit 20
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+
+# Add the project directory to Python path
+project_dir = Path(__file__).resolve().parent
+sys.path.append(str(project_dir))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rental_management.settings')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+
+from sms_simulator import ProviderSimulator
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def create_tenants(count):
+    from rental_app.models import Tenant
+
+    tenants = [
+        Tenant(
+            name=f"Benchmark Tenant {i}",
+            phone=f"+2547{i:08d}",
+            phone_e164=f"+2547{i:08d}",
+            apartment_number=f"B{i}",
+            rent_amount=Decimal('15000.00'),
+            amount_due=Decimal('15000.00'),
+            rent_status='Unpaid',
+        )
+        for i in range(count)
+    ]
+    Tenant.objects.bulk_create(tenants)
+    return list(Tenant.objects.all())
+
+
+def get_sender(name):
+    from rental_app.provider_registry import get_provider
+    from rental_app.sms_router import get_sms_router
+
+    return get_sms_router() if name == 'router' else get_provider(name)
+
+
+def run(name, tenants, workers):
+    """Send one rent reminder per tenant like bulk_sms_reminder, split across workers"""
+    sender = get_sender(name)
+    latencies = []
+    outcomes = {'sent': 0, 'failed': 0}
+    lock = threading.Lock()
+
+    def worker(chunk):
+        try:
+            for tenant in chunk:
+                t0 = time.perf_counter()
+                success, _ = sender.send_rent_reminder(tenant)
+                elapsed = time.perf_counter() - t0
+                with lock:
+                    latencies.append(elapsed)
+                    outcomes['sent' if success else 'failed'] += 1
+        finally:
+            connection.close()
+
+    chunks = [tenants[i::workers] for i in range(workers)]
+    started = time.perf_counter()
+    if workers == 1:
+        worker(chunks[0])
+    else:
+        threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+
+    rate = len(latencies) / elapsed if elapsed else 0
+    print(f"📊 {name:<15} {rate:>8.1f} msg/s  "
+          f"p50 {percentile(latencies, 50) * 1000:>7.1f} ms  p99 {percentile(latencies, 99) * 1000:>7.1f} ms  "
+          f"✅ {outcomes['sent']}  ❌ {outcomes['failed']}")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tenants', type=int, default=200, help='Reminders per provider (default: 200)')
+    parser.add_argument('--providers', default='smsmobile,africastalking,whatsapp,router',
+                        help='Comma-separated providers to benchmark; "router" uses failover routing')
+    parser.add_argument('--workers', type=int, default=1, help='Concurrent senders (default: 1, like the view)')
+    parser.add_argument('--latency', type=float, default=0, help='Simulated provider latency in ms')
+    parser.add_argument('--jitter', type=float, default=0, help='Extra random latency up to this many ms')
+    parser.add_argument('--error-rate', type=float, default=0, help='Share of provider requests that fail (0-1)')
+    parser.add_argument('--rate-limit', type=float, help='Simulator requests per second per provider before 429')
+    parser.add_argument('--app-rate-limits', action='store_true', help="Keep the app's SMS_RATE_LIMITS")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    simulator = ProviderSimulator(
+        latency=args.latency / 1000, jitter=args.jitter / 1000, error_rate=args.error_rate,
+        rate_limit=args.rate_limit, seed=args.seed,
+    ).start()
+    for name, value in simulator.settings_overrides().items():
+        setattr(settings, name, value)
+    if not args.app_rate_limits:
+        settings.SMS_RATE_LIMITS = {}
+
+    from rental_app import provider_registry
+    provider_registry.reset()
+
+    print("🔍 SMS throughput benchmark")
+    print("=" * 50)
+    print(f"📡 Simulator at {simulator.url} (latency {args.latency:g}ms ±{args.jitter:g}ms, "
+          f"error rate {args.error_rate:g}, rate limit {args.rate_limit or 'none'})")
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        tenants = create_tenants(args.tenants)
+        print(f"📱 {len(tenants)} reminders per provider, {args.workers} worker(s)\n")
+        for name in [n.strip() for n in args.providers.split(',') if n.strip()]:
+            run(name, tenants, args.workers)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        simulator.stop()
+
+    print(f"\n📡 Simulator counters: {simulator.snapshot()}")
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,20 @@
+"""
+Gunicorn configuration (loaded automatically from the working directory)
+
+Worker count, bind address etc. still come from the command line and
+WEB_CONCURRENCY / PORT as before; this file only adds lifecycle hooks.
+"""
+
+
+def post_fork(server, worker):
+    """Build SMS provider clients and their connection pools once per worker"""
+    try:
+        import os
+        import django
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rental_management.settings')
+        django.setup()
+        from rental_app.provider_registry import warmup
+        warmup()
+    except Exception as e:
+        # Clients are built lazily on first use instead
+        server.log.warning(f"SMS provider warmup skipped: {e}")
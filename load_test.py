@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+"""
+HTTP load test for the rental management web app
+
+Simulated clerks log in, then walk the main pages and record payments
+according to a weighted mix, optionally at a fixed total request rate.
+Reports throughput and latency percentiles per URL name.
+
+Run the server the way the Procfile does, against a seeded database and
+with SMS providers pointed at sms_simulator.py:
+
+    python manage.py migrate
+    python manage.py seed_load_test --tenants 500
+    python sms_simulator.py &            # then export the printed *_API_URL values
+    gunicorn rental_management.wsgi:application --workers 3 --threads 4 &
+    python load_test.py --users 20 --duration 60
+
+Usage:
+    python load_test.py --base-url http://127.0.0.1:8000 --users 10 --duration 30 --rate 50
+    python load_test.py --mix dashboard=5,tenant_list=2,add_payment=1
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import requests
+
+# Add the project directory to Python path
+project_dir = Path(__file__).resolve().parent
+sys.path.append(str(project_dir))
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rental_management.settings')
+
+import django
+django.setup()
+
+from django.urls import reverse
+
+DEFAULT_MIX = {
+    'dashboard': 30,
+    'tenant_list': 20,
+    'payment_history': 20,
+    'analytics': 10,
+    'record_management': 10,
+    'add_payment': 10,
+}
+
+
+class Results:
+    """Latencies and errors per URL name, shared by all users"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def record(self, name, started, ok):
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.latencies[name].append(elapsed)
+            if not ok:
+                self.errors[name] += 1
+
+
+class Pacer:
+    """Spaces requests across all users to a total rate (None: as fast as possible)"""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_at = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            slot = max(self.next_at, time.perf_counter())
+            self.next_at = slot + self.interval
+        delay = slot - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Clerk:
+    """One logged-in browser session"""
+
+    def __init__(self, base_url, username, password, results):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.results = results
+        self.session = requests.Session()
+        self.tenant_ids = []
+
+    def url(self, name):
+        return self.base_url + reverse(name)
+
+    def csrf_post(self, url, data):
+        data = dict(data, csrfmiddlewaretoken=self.session.cookies.get('csrftoken', ''))
+        return self.session.post(url, data=data, headers={'Referer': url}, allow_redirects=False, timeout=30)
+
+    def login(self):
+        started = time.perf_counter()
+        self.session.get(self.url('login'), timeout=30)
+        response = self.csrf_post(self.url('login'), {'username': self.username, 'password': self.password})
+        ok = response.status_code == 302 and reverse('login') not in response.headers.get('Location', '')
+        self.results.record('login', started, ok)
+        return ok
+
+    def view(self, name):
+        started = time.perf_counter()
+        try:
+            response = self.session.get(self.url(name), allow_redirects=False, timeout=30)
+            ok = response.status_code == 200
+        except requests.RequestException:
+            response, ok = None, False
+        self.results.record(name, started, ok)
+        return response if ok else None
+
+    def load_tenant_ids(self):
+        """Tenant ids to pay for; the payment form picks tenants by search, so ask the API"""
+        try:
+            response = self.session.get(self.url('api_tenants'), params={'fields': 'id', 'limit': 200}, timeout=30)
+            self.tenant_ids = [row['id'] for row in response.json()['results']]
+        except (requests.RequestException, ValueError, KeyError):
+            self.tenant_ids = []
+
+    def add_payment(self):
+        """Open the payment form and submit a payment for a random tenant"""
+        form = self.view('add_payment')
+        if form is None:
+            return
+        if not self.tenant_ids:
+            self.load_tenant_ids()
+        if not self.tenant_ids:
+            return
+        data = {
+            'tenant': random.choice(self.tenant_ids),
+            'amount': random.choice(['500.00', '1000.00', '5000.00']),
+            'payment_type': 'Partial',
+            'status': 'Paid',
+            'notes': 'Load test payment',
+        }
+        started = time.perf_counter()
+        try:
+            response = self.csrf_post(self.url('add_payment'), data)
+            ok = response.status_code == 302
+        except requests.RequestException:
+            ok = False
+        self.results.record('add_payment (POST)', started, ok)
+
+
+def run_clerk(args, mix, pacer, results, deadline):
+    clerk = Clerk(args.base_url, args.username, args.password, results)
+    try:
+        if not clerk.login():
+            return
+    except requests.RequestException:
+        results.errors['login'] += 1
+        return
+    names, weights = zip(*mix.items())
+    while time.perf_counter() < deadline:
+        pacer.wait()
+        name = random.choices(names, weights)[0]
+        if name == 'add_payment':
+            clerk.add_payment()
+        else:
+            clerk.view(name)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown URL name {name!r} (choose from {', '.join(DEFAULT_MIX)})")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"bad weight for {name!r}: {weight!r}")
+    return mix
+
+
+def report(results, elapsed):
+    print(f"\n{'URL name':<22} {'reqs':>7} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8}")
+    print("-" * 84)
+    total = errors = 0
+    for name in sorted(results.latencies):
+        values = sorted(results.latencies[name])
+        total += len(values)
+        errors += results.errors[name]
+        print(f"{name:<22} {len(values):>7} {results.errors[name]:>7} {len(values) / elapsed:>8.1f} "
+              f"{percentile(values, 50) * 1000:>8.1f} {percentile(values, 90) * 1000:>8.1f} "
+              f"{percentile(values, 99) * 1000:>8.1f} {values[-1] * 1000:>8.1f}")
+    print("-" * 84)
+    print(f"{'total':<22} {total:>7} {errors:>7} {total / elapsed:>8.1f}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--username', default='loadtest')
+    parser.add_argument('--password', default='loadtest123')
+    parser.add_argument('--users', type=int, default=10, help='Concurrent clerks (default: 10)')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run (default: 30)')
+    parser.add_argument('--rate', type=float, help='Total requests per second across all clerks (default: unpaced)')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help='Weighted URL mix, e.g. dashboard=30,tenant_list=20,add_payment=10')
+    args = parser.parse_args()
+
+    print("🔍 Rental Management load test")
+    print("=" * 50)
+    print(f"🌐 {args.base_url}: {args.users} clerks for {args.duration:g}s, "
+          f"rate {args.rate or 'unpaced'}, mix {args.mix}")
+
+    results = Results()
+    pacer = Pacer(args.rate)
+    started = time.perf_counter()
+    deadline = started + args.duration
+    threads = [
+        threading.Thread(target=run_clerk, args=(args, args.mix, pacer, results, deadline), daemon=True)
+        for _ in range(args.users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    if not results.latencies.get('dashboard') and results.errors.get('login'):
+        print("❌ Could not log in - run `python manage.py seed_load_test` and check --username/--password")
+        return False
+    errors = report(results, elapsed)
+    print(f"\n{'⚠️' if errors else '✅'} {errors} errors")
+    return not errors
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
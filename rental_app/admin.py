@@ -1,13 +1,122 @@
 from django.contrib import admin
-from .models import Tenant, Payment, SMSLog
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from .models import (
+    Property, Unit, Tenant, Payment, SMSLog, MpesaCallback, RateLimitBucket, DeliveryReport,
+    SMSLogDailySummary, HistoryDailySummary, SMSDailyCounter, TenantHistory, PaymentHistory,
+)
+from .sms_retry_service import SMSRetryService
+from .search_service import TenantSearchService
+
+# Below this many rows an exact COUNT(*) is cheap and the estimate is least accurate
+ESTIMATE_THRESHOLD = 10000
+
+
+def estimated_row_count(queryset):
+    """The planner's row estimate for the queryset's table (PostgreSQL only, else None)"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [connection.ops.quote_name(queryset.model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    # reltuples is -1 until the table has been vacuumed or analyzed
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses pg_class.reltuples instead of COUNT(*) for unfiltered changelists
+    of large tables. Filtered and searched lists still get an exact count.
+
+    The estimate can be off after bulk deletes or inserts, so a page that
+    comes back empty (or past the estimated end) falls back to the exact
+    count and is clamped to the real last page.
+    """
+    estimated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset)
+            if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+                self.estimated = True
+                return estimate
+        return super().count
+
+    def page(self, number):
+        try:
+            page = super().page(number)
+        except EmptyPage:
+            if not self.estimated:
+                raise
+        else:
+            if not self.estimated or page.number == 1 or len(page.object_list):
+                return page
+        self.estimated = False
+        self.__dict__['count'] = self.object_list.count()
+        self.__dict__.pop('num_pages', None)
+        try:
+            return super().page(number)
+        except EmptyPage:
+            return super().page(self.num_pages)
+
+
+class LargeTableChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        # The paginator may have replaced an overestimate with the exact count
+        self.result_count = self.paginator.count
+        self.multi_page = self.result_count > self.list_per_page
+        self.can_show_all = self.result_count <= self.list_max_show_all
+        self.page_num = min(self.page_num, self.paginator.num_pages)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables that grow without bound"""
+    paginator = EstimatedCountPaginator
+    # Skip the second COUNT(*) behind "N total" when a filter is applied
+    show_full_result_count = False
+    
+    def get_changelist(self, request, **kwargs):
+        return LargeTableChangeList
+
+
+@admin.register(Property)
+class PropertyAdmin(admin.ModelAdmin):
+    list_display = ['name', 'landlord', 'address', 'created_at']
+    list_select_related = ['landlord']
+    list_filter = ['landlord']
+    search_fields = ['name', 'address', 'landlord__username']
+
+
+@admin.register(Unit)
+class UnitAdmin(admin.ModelAdmin):
+    list_display = ['number', 'property']
+    list_filter = ['property']
+    search_fields = ['number', 'property__name']
+    list_select_related = ['property']
+    autocomplete_fields = ['property']
 
 
 @admin.register(Tenant)
 class TenantAdmin(admin.ModelAdmin):
-    list_display = ['name', 'apartment_number', 'phone', 'rent_amount_display', 'amount_due_display', 'due_date', 'rent_status', 'created_at']
-    list_filter = ['rent_status', 'created_at', 'due_date']
-    search_fields = ['name', 'apartment_number', 'phone']
+    list_display = ['name', 'property', 'apartment_number', 'phone', 'rent_amount_display', 'amount_due_display', 'due_date', 'rent_status', 'created_at']
+    list_filter = ['rent_status', 'property', 'created_at', 'due_date']
+    search_fields = ['name', 'apartment_number', 'phone', 'phone_e164']
     list_editable = ['rent_status', 'due_date']
+    list_select_related = ['property']
+    autocomplete_fields = ['property']
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Use the trigram/FTS index instead of LIKE scans over every search field
+        return TenantSearchService.filter(queryset, search_term), False
     
     def rent_amount_display(self, obj):
         return f"KSh {obj.rent_amount}"
@@ -19,10 +128,12 @@ class TenantAdmin(admin.ModelAdmin):
 
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
-    list_display = ['tenant', 'amount_display', 'payment_type', 'date', 'status']
+class PaymentAdmin(LargeTableAdmin):
+    list_display = ['tenant', 'amount_display', 'payment_type', 'date', 'status', 'transaction_id']
     list_filter = ['status', 'payment_type', 'date']
-    search_fields = ['tenant__name', 'notes']
+    search_fields = ['tenant__name', 'notes', 'transaction_id']
+    list_select_related = ['tenant']
+    autocomplete_fields = ['tenant']
     
     def amount_display(self, obj):
         return f"KSh {obj.amount}"
@@ -30,12 +141,97 @@ class PaymentAdmin(admin.ModelAdmin):
 
 
 @admin.register(SMSLog)
-class SMSLogAdmin(admin.ModelAdmin):
-    list_display = ['tenant', 'status', 'sent_at', 'message_preview']
-    list_filter = ['status', 'sent_at']
-    search_fields = ['tenant__name', 'message']
-    readonly_fields = ['sent_at', 'response_data']
+class SMSLogAdmin(LargeTableAdmin):
+    list_display = ['tenant', 'status', 'delivery_status', 'provider', 'attempts', 'sent_at', 'next_retry_at', 'message_preview']
+    list_filter = ['status', 'delivery_status', 'provider', 'sent_at']
+    search_fields = ['tenant__name', 'message', 'provider_message_id']
+    readonly_fields = ['sent_at', 'response_data', 'attempts', 'next_retry_at', 'provider_message_id', 'delivery_status', 'failure_reason', 'delivery_updated_at']
+    list_select_related = ['tenant']
+    autocomplete_fields = ['tenant']
+    actions = ['retry_dead_letters']
+    
+    def get_queryset(self, request):
+        # Provider responses are only shown on the change form
+        return super().get_queryset(request).defer('response_data')
     
     def message_preview(self, obj):
         return obj.message[:50] + '...' if len(obj.message) > 50 else obj.message
     message_preview.short_description = 'Message Preview'
+    
+    def retry_dead_letters(self, request, queryset):
+        requeued = SMSRetryService.retry_dead_letters(queryset)
+        self.message_user(request, f"{requeued} dead-letter message(s) queued for retry.")
+    retry_dead_letters.short_description = 'Retry selected dead letters'
+
+
+@admin.register(MpesaCallback)
+class MpesaCallbackAdmin(LargeTableAdmin):
+    list_display = ['trans_id', 'amount_display', 'msisdn', 'bill_ref_number', 'status', 'tenant', 'received_at']
+    list_filter = ['status', 'transaction_type', 'received_at']
+    search_fields = ['trans_id', 'msisdn', 'bill_ref_number', 'first_name']
+    readonly_fields = ['payload', 'received_at', 'processed_at', 'payment']
+    list_select_related = ['tenant']
+    autocomplete_fields = ['tenant']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('payload')
+    
+    def amount_display(self, obj):
+        return f"KSh {obj.amount}"
+    amount_display.short_description = 'Amount'
+
+
+@admin.register(RateLimitBucket)
+class RateLimitBucketAdmin(admin.ModelAdmin):
+    list_display = ['key', 'tokens', 'last_refill', 'version']
+    readonly_fields = ['tokens', 'last_refill', 'version']
+
+
+@admin.register(DeliveryReport)
+class DeliveryReportAdmin(LargeTableAdmin):
+    list_display = ['provider_message_id', 'provider', 'status', 'failure_reason', 'received_at']
+    list_filter = ['provider', 'status']
+    search_fields = ['provider_message_id', 'phone']
+
+
+@admin.register(SMSLogDailySummary)
+class SMSLogDailySummaryAdmin(admin.ModelAdmin):
+    list_display = ['day', 'tenant', 'status', 'delivery_status', 'provider', 'count']
+    list_filter = ['status', 'provider', 'day']
+    list_select_related = ['tenant']
+    autocomplete_fields = ['tenant']
+
+
+@admin.register(HistoryDailySummary)
+class HistoryDailySummaryAdmin(admin.ModelAdmin):
+    list_display = ['day', 'source', 'tenant_name', 'apartment_number', 'action', 'count', 'total_amount']
+    list_filter = ['source', 'action', 'day']
+    search_fields = ['tenant_name', 'apartment_number']
+
+
+@admin.register(SMSDailyCounter)
+class SMSDailyCounterAdmin(admin.ModelAdmin):
+    list_display = ['day', 'provider', 'status', 'count']
+    list_filter = ['provider', 'status', 'day']
+
+
+class HistoryAdmin(LargeTableAdmin):
+    """History rows are written by the app; the admin only browses them"""
+    list_filter = ['action', 'changed_at']
+    search_fields = ['tenant_name', 'apartment_number']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(TenantHistory)
+class TenantHistoryAdmin(HistoryAdmin):
+    list_display = ['changed_at', 'tenant_name', 'apartment_number', 'action', 'changed_by']
+
+
+@admin.register(PaymentHistory)
+class PaymentHistoryAdmin(HistoryAdmin):
+    list_display = ['changed_at', 'tenant_name', 'apartment_number', 'payment_amount', 'action', 'changed_by']
@@ -2,154 +2,114 @@
 Africa's Talking SMS Service for Rental Management System
 """
 
-import africastalking
+import requests
 from django.conf import settings
-from django.utils import timezone
 from .models import SMSLog
+from .phone import normalize_phone
+from .sms_providers import SMSProvider, TRANSIENT_HTTP_STATUSES, provider_timeout
 
+# Per-recipient statusCodes that are worth retrying (InternalServerError, GatewayError)
+TRANSIENT_STATUS_CODES = {500, 501}
 
-class AfricasTalkingService:
+
+class AfricasTalkingService(SMSProvider):
     """Service for sending SMS via Africa's Talking API"""
-    
+
+    name = 'africastalking'
+
     def __init__(self):
         self.username = settings.AFRICASTALKING_USERNAME
         self.api_key = settings.AFRICASTALKING_API_KEY
         self.sender_id = settings.AFRICASTALKING_SENDER_ID
-        
-        # Initialize Africa's Talking SDK
-        if self.api_key:
-            africastalking.initialize(self.username, self.api_key)
-            self.sms = africastalking.SMS
-        else:
-            self.sms = None
-    
-    def send_sms(self, phone_number, message_text, tenant=None):
+        # The SDK sends without a request timeout, so post to the REST endpoint directly
+        self.api_url = getattr(settings, 'AFRICASTALKING_API_URL', None) or (
+            'https://api.sandbox.africastalking.com/version1/messaging'
+            if self.username == 'sandbox'
+            else 'https://api.africastalking.com/version1/messaging'
+        )
+
+    def is_configured(self):
+        return bool(self.api_key)
+
+    def deliver(self, phone_number, message_text):
         """
         Send SMS via Africa's Talking
-        
+
         Args:
             phone_number (str): Recipient phone number
             message_text (str): Message content
-            tenant (Tenant): Tenant object for logging
-            
+
         Returns:
-            tuple: (success: bool, message: str)
+            SendResult
         """
-        if not self.api_key or not self.sms:
-            return False, "Africa's Talking API not configured"
-        
+        if not self.is_configured():
+            return self._result(False, "Africa's Talking API not configured")
+
         # Ensure phone number is in international format
         formatted_phone = self._format_phone_number(phone_number)
-        
+
+        data = {
+            'username': self.username,
+            'to': formatted_phone,
+            'message': message_text,
+        }
+        if self.sender_id:
+            data['from'] = self.sender_id
+        headers = {
+            'Accept': 'application/json',
+            'apiKey': self.api_key,
+        }
+
         try:
-            # Send SMS using Africa's Talking SDK
-            response = self.sms.send(
-                message_text,
-                [formatted_phone],
-                self.sender_id
-            )
-            
-            # Log the SMS attempt
-            if tenant:
-                self._log_sms(tenant, message_text, response)
-            
-            # Check response for success
-            if response and response.get('SMSMessageData'):
-                recipients = response['SMSMessageData'].get('Recipients', [])
-                if recipients:
-                    recipient = recipients[0]
-                    if recipient.get('status') == 'Success':
-                        return True, "SMS sent successfully"
-                    else:
-                        error_msg = recipient.get('statusMessage', 'Unknown error')
-                        return False, f"SMS failed: {error_msg}"
-                else:
-                    return False, "SMS failed: No recipients in response"
-            else:
-                return False, "SMS failed: Invalid response format"
-                
-        except Exception as e:
+            response = self.session.post(self.api_url, data=data, headers=headers, timeout=provider_timeout())
+        except requests.exceptions.Timeout:
+            return self._result(False, "SMS request timed out", {'error': 'timeout'}, transient=True)
+        except requests.exceptions.RequestException as e:
             error_msg = f"Error sending SMS: {str(e)}"
-            if tenant:
-                self._log_sms(tenant, message_text, None, error_msg)
-            return False, error_msg
-    
+            return self._result(False, error_msg, {'error': error_msg}, transient=True)
+
+        if response.status_code not in (200, 201):
+            error_msg = f"HTTP {response.status_code}: {response.text[:200]}"
+            return self._result(
+                False, f"SMS failed: {error_msg}", {'error': f"HTTP {response.status_code}"},
+                transient=response.status_code in TRANSIENT_HTTP_STATUSES
+            )
+
+        try:
+            body = response.json()
+        except ValueError:
+            return self._result(False, "SMS failed: Invalid response format", {'response': response.text[:200]})
+
+        # Check response for success
+        recipients = (body.get('SMSMessageData') or {}).get('Recipients', [])
+        if not recipients:
+            return self._result(False, "SMS failed: No recipients in response", {'response': body})
+
+        recipient = recipients[0]
+        if recipient.get('status') == 'Success':
+            result = self._result(True, "SMS sent successfully", {'response': body})
+            result.provider_message_id = recipient.get('messageId') or ''
+            return result
+        error_msg = recipient.get('status') or 'Unknown error'
+        return self._result(
+            False, f"SMS failed: {error_msg}", {'response': body},
+            transient=recipient.get('statusCode') in TRANSIENT_STATUS_CODES
+        )
+
     def _format_phone_number(self, phone_number):
         """Format phone number for Africa's Talking"""
-        # Remove any spaces or special characters
-        phone_number = phone_number.replace(' ', '').replace('-', '').replace('(', '').replace(')', '')
-        
-        # Ensure phone number is in international format
-        if not phone_number.startswith('+'):
-            if phone_number.startswith('0'):
-                # Kenyan number starting with 0
-                phone_number = '+254' + phone_number[1:]
-            elif phone_number.startswith('254'):
-                # Kenyan number without +
-                phone_number = '+' + phone_number
-            else:
-                # Assume it's a Kenyan number
-                phone_number = '+254' + phone_number
-        
-        return phone_number
-    
-    def _log_sms(self, tenant, message, response=None, error_msg=None):
-        """Log SMS attempt to database"""
-        try:
-            status = 'success' if not error_msg else 'failure'
-            response_data = {
-                'response': response,
-                'error': error_msg
-            } if error_msg else {'response': response}
-            
-            SMSLog.objects.create(
-                tenant=tenant,
-                message=message,
-                status=status,
-                response_data=response_data
-            )
-        except Exception as e:
-            print(f"Error logging SMS: {e}")
-    
-    def send_rent_confirmation(self, tenant, payment_amount):
-        """Send rent payment confirmation SMS"""
-        message = f"Hello {tenant.name}, your rent payment of KSh {payment_amount:,.2f} has been received. Thank you for your payment!"
-        return self.send_sms(tenant.phone, message, tenant)
-    
-    def send_rent_reminder(self, tenant):
-        """Send rent payment reminder SMS"""
-        if tenant.rent_status == 'Overdue':
-            message = f"Hello {tenant.name}, your rent payment of KSh {tenant.rent_amount:,.2f} is overdue. Please make payment as soon as possible to avoid any inconvenience."
-        else:
-            message = f"Hello {tenant.name}, this is a friendly reminder that your rent payment of KSh {tenant.rent_amount:,.2f} is due. Please make payment to avoid any inconvenience."
-        
-        return self.send_sms(tenant.phone, message, tenant)
-    
-    def send_custom_message(self, tenant, custom_message):
-        """Send custom SMS message"""
-        return self.send_sms(tenant.phone, custom_message, tenant)
-    
-    def send_payment_reminder(self, tenant, days_overdue=None):
-        """Send payment reminder with overdue information"""
-        if days_overdue:
-            message = f"Hello {tenant.name}, your rent payment of KSh {tenant.rent_amount:,.2f} is {days_overdue} days overdue. Please make payment immediately."
-        else:
-            message = f"Hello {tenant.name}, this is a reminder that your rent payment of KSh {tenant.rent_amount:,.2f} is due. Please make payment to avoid any inconvenience."
-        
-        return self.send_sms(tenant.phone, message, tenant)
-    
-    def get_sms_statistics(self):
+        return normalize_phone(phone_number) or phone_number
+
+    def get_sms_statistics(self, start=None, end=None):
         """Get SMS statistics"""
         try:
-            total_sms = SMSLog.objects.count()
-            successful_sms = SMSLog.objects.filter(status='success').count()
-            failed_sms = SMSLog.objects.filter(status='failure').count()
-            
+            stats = super().get_sms_statistics(start, end)
+
             return {
-                'total_sms': total_sms,
-                'successful_sms': successful_sms,
-                'failed_sms': failed_sms,
-                'success_rate': (successful_sms / total_sms * 100) if total_sms > 0 else 0
+                'total_sms': stats['total_sent'],
+                'successful_sms': stats['success_count'],
+                'failed_sms': stats['failure_count'],
+                'success_rate': stats['success_rate']
             }
         except Exception as e:
             return {
@@ -159,24 +119,24 @@ class AfricasTalkingService:
                 'success_rate': 0,
                 'error': str(e)
             }
-    
+
     def get_recent_sms_logs(self, limit=10):
         """Get recent SMS logs"""
         try:
             return SMSLog.objects.select_related('tenant').order_by('-sent_at')[:limit]
         except Exception as e:
             return []
-    
+
     def test_connection(self):
         """Test Africa's Talking connection"""
         if not self.api_key:
             return False, "API key not configured"
-        
+
         try:
             # Try to send a test SMS to verify connection
             test_message = "Test message from Rental Management System"
             test_phone = "+254700000000"  # Dummy number for testing
-            
+
             # This will test the connection without actually sending
             return True, "Connection test successful"
         except Exception as e:
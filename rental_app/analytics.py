@@ -1,12 +1,26 @@
 from django.db.models import Sum, Count, Q
 from django.utils import timezone
-from datetime import datetime, timedelta
-from .models import Tenant, Payment
+from datetime import date, datetime, timedelta
+import calendar
+from .models import Tenant, Payment, TenantHistory, PaymentHistory
+from .retention_service import RetentionService
+
+
+def scoped_tenants(user=None):
+    """Tenants visible to `user`; every tenant when no user is given"""
+    return Tenant.objects.all() if user is None else Tenant.objects.for_user(user)
+
+
+def scoped_payments(user=None):
+    """Payments visible to `user`; every payment when no user is given"""
+    return Payment.objects.all() if user is None else Payment.objects.for_user(user)
 
 
 class AnalyticsService:
+    """Income and tenant statistics, scoped to a landlord's properties when a user is given"""
+
     @staticmethod
-    def get_monthly_income(year=None, month=None):
+    def get_monthly_income(year=None, month=None, user=None):
         """Get monthly income for a specific month"""
         if not year:
             year = timezone.now().year
@@ -19,7 +33,7 @@ class AnalyticsService:
         else:
             end_date = timezone.datetime(year, month + 1, 1)
         
-        payments = Payment.objects.filter(
+        payments = scoped_payments(user).filter(
             date__gte=start_date,
             date__lt=end_date,
             status='Paid'
@@ -37,14 +51,14 @@ class AnalyticsService:
         }
     
     @staticmethod
-    def get_yearly_income(year=None):
+    def get_yearly_income(year=None, user=None):
         """Get yearly income breakdown by month"""
         if not year:
             year = timezone.now().year
         
         monthly_data = []
         for month in range(1, 13):
-            month_data = AnalyticsService.get_monthly_income(year, month)
+            month_data = AnalyticsService.get_monthly_income(year, month, user)
             monthly_data.append(month_data)
         
         total_yearly = sum(month['total_income'] for month in monthly_data)
@@ -56,19 +70,39 @@ class AnalyticsService:
         }
     
     @staticmethod
-    def get_tenant_analytics():
+    def get_record_activity(year, month):
+        """
+        Tenant and payment history actions in a month, including rows
+        retention has already folded into HistoryDailySummary.
+
+        History rows are not tied to a property, so this is system-wide.
+        """
+        start = date(year, month, 1)
+        end = date(year, month, calendar.monthrange(year, month)[1])
+        activity = {}
+        for source, model in (('tenant', TenantHistory), ('payment', PaymentHistory)):
+            counts = RetentionService.history_action_counts(source, start, end)
+            activity[source] = [
+                {'action': label, 'count': counts[action]}
+                for action, label in model.ACTION_CHOICES if counts.get(action)
+            ]
+        return activity
+    
+    @staticmethod
+    def get_tenant_analytics(user=None):
         """Get tenant payment analytics"""
-        total_tenants = Tenant.objects.count()
-        paid_tenants = Tenant.objects.filter(rent_status='Paid').count()
-        unpaid_tenants = Tenant.objects.filter(rent_status='Unpaid').count()
-        partial_tenants = Tenant.objects.filter(rent_status='Partial').count()
-        overdue_tenants = Tenant.objects.filter(rent_status='Overdue').count()
+        tenants = scoped_tenants(user)
+        total_tenants = tenants.count()
+        paid_tenants = tenants.filter(rent_status='Paid').count()
+        unpaid_tenants = tenants.filter(rent_status='Unpaid').count()
+        partial_tenants = tenants.filter(rent_status='Partial').count()
+        overdue_tenants = tenants.filter(rent_status='Overdue').count()
         
-        total_rent_due = Tenant.objects.aggregate(
+        total_rent_due = tenants.aggregate(
             total=Sum('rent_amount')
         )['total'] or 0
         
-        total_amount_due = Tenant.objects.aggregate(
+        total_amount_due = tenants.aggregate(
             total=Sum('amount_due')
         )['total'] or 0
         
@@ -86,12 +120,12 @@ class AnalyticsService:
         }
     
     @staticmethod
-    def get_payment_trends(days=30):
+    def get_payment_trends(days=30, user=None):
         """Get payment trends for the last N days"""
         end_date = timezone.now()
         start_date = end_date - timedelta(days=days)
         
-        payments = Payment.objects.filter(
+        payments = scoped_payments(user).filter(
             date__gte=start_date,
             date__lte=end_date,
             status='Paid'
@@ -111,10 +145,10 @@ class AnalyticsService:
         }
     
     @staticmethod
-    def get_overdue_tenants():
+    def get_overdue_tenants(user=None):
         """Get list of overdue tenants"""
         overdue_tenants = []
-        for tenant in Tenant.objects.filter(rent_status='Overdue'):
+        for tenant in scoped_tenants(user).filter(rent_status='Overdue'):
             next_due = tenant.get_next_due_date()
             days_overdue = (timezone.now().date() - next_due.date()).days
             overdue_tenants.append({
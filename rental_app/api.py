@@ -0,0 +1,280 @@
+"""
+Read-only JSON API for Rental Management System
+
+List endpoints for tenants, payments and SMS logs, plus an analytics
+summary, all scoped to the signed-in user's properties:
+
+- Cursor pagination: results come newest first; pass the returned
+  `next_cursor` as `?cursor=` for the next page. `?limit=` sets the page
+  size (default 50, max 200).
+- Field selection: `?fields=id,name,amount_due` fetches only those columns
+  with values().
+- Filters: simple equality filters per resource, e.g. `?rent_status=Overdue`.
+- Conditional GET: every response carries an ETag; send it back in
+  If-None-Match to get a 304 when nothing changed.
+
+Clients authenticate with the normal login session.
+"""
+
+import base64
+import binascii
+import uuid
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_safe
+
+from .models import Property, Tenant, Payment, SMSLog
+from .analytics import AnalyticsService, scoped_tenants, scoped_payments
+from .conditional import make_etag, fingerprint, not_modified, set_validators
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# Per resource: the scoped queryset, the timestamp the cursor walks, the
+# public fields (name -> ORM lookup), the fields returned when `fields` is
+# not given, and the allowed equality filters (name -> ORM lookup).
+RESOURCES = {
+    'tenants': {
+        'queryset': Tenant.objects.for_user,
+        'cursor_field': 'created_at',
+        'fields': {
+            'id': 'id',
+            'name': 'name',
+            'phone': 'phone',
+            'phone_e164': 'phone_e164',
+            'property_id': 'property_id',
+            'property': 'property__name',
+            'apartment_number': 'apartment_number',
+            'rent_amount': 'rent_amount',
+            'rent_status': 'rent_status',
+            'due_date': 'due_date',
+            'amount_due': 'amount_due',
+            'last_payment_date': 'last_payment_date',
+            'created_at': 'created_at',
+            'updated_at': 'updated_at',
+        },
+        'default_fields': ['id', 'name', 'phone', 'property', 'apartment_number', 'rent_amount',
+                           'rent_status', 'due_date', 'amount_due', 'last_payment_date'],
+        'filters': {'rent_status': 'rent_status', 'property': 'property_id'},
+    },
+    'payments': {
+        'queryset': Payment.objects.for_user,
+        'cursor_field': 'date',
+        'fields': {
+            'id': 'id',
+            'tenant_id': 'tenant_id',
+            'tenant': 'tenant__name',
+            'apartment_number': 'tenant__apartment_number',
+            'amount': 'amount',
+            'payment_type': 'payment_type',
+            'status': 'status',
+            'date': 'date',
+            'notes': 'notes',
+            'transaction_id': 'transaction_id',
+        },
+        'default_fields': ['id', 'tenant_id', 'tenant', 'amount', 'payment_type', 'status', 'date',
+                           'transaction_id'],
+        'filters': {'tenant': 'tenant_id', 'status': 'status', 'payment_type': 'payment_type'},
+    },
+    'sms': {
+        'queryset': SMSLog.objects.for_user,
+        'cursor_field': 'sent_at',
+        'fields': {
+            'id': 'id',
+            'tenant_id': 'tenant_id',
+            'tenant': 'tenant__name',
+            'message': 'message',
+            'status': 'status',
+            'provider': 'provider',
+            'attempts': 'attempts',
+            'delivery_status': 'delivery_status',
+            'failure_reason': 'failure_reason',
+            'delivery_updated_at': 'delivery_updated_at',
+            'sent_at': 'sent_at',
+        },
+        'default_fields': ['id', 'tenant_id', 'tenant', 'status', 'provider', 'attempts',
+                           'delivery_status', 'sent_at'],
+        'filters': {'tenant': 'tenant_id', 'status': 'status', 'provider': 'provider',
+                    'delivery_status': 'delivery_status'},
+    },
+}
+
+
+class APIError(Exception):
+    """A client error reported as a JSON 400"""
+
+
+def api_view(view):
+    """GET/HEAD only, JSON 401 instead of a login redirect, JSON 400 for APIError"""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+        try:
+            return view(request, *args, **kwargs)
+        except APIError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    return wrapper
+
+
+def encode_cursor(timestamp, pk):
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{pk}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, pk = raw.split('|')
+        timestamp = parse_datetime(timestamp)
+        pk = uuid.UUID(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise APIError('Invalid cursor')
+    if timestamp is None:
+        raise APIError('Invalid cursor')
+    return timestamp, pk
+
+
+def parse_limit(value):
+    if not value:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise APIError('limit must be a number')
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def parse_fields(value, resource):
+    if not value:
+        return resource['default_fields']
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in resource['fields']]
+    if unknown:
+        raise APIError(f"Unknown fields: {', '.join(unknown)} (choose from {', '.join(resource['fields'])})")
+    return fields
+
+
+def paginate(request, name):
+    """The JSON page for a list resource, or a 304 when the client is up to date"""
+    resource = RESOURCES[name]
+    params = request.GET
+    limit = parse_limit(params.get('limit'))
+    fields = parse_fields(params.get('fields'), resource)
+
+    queryset = resource['queryset'](request.user)
+    for param, lookup in resource['filters'].items():
+        if param in params:
+            try:
+                queryset = queryset.filter(**{lookup: params[param]})
+            except (ValidationError, ValueError):
+                raise APIError(f'Invalid value for {param}')
+
+    lookups = [resource['fields'][field] for field in fields]
+    # Columns read from the tenant or property row change without touching payments or SMS logs
+    related = []
+    if any(lookup.startswith('tenant__') for lookup in lookups):
+        related.append(fingerprint(Tenant.objects.for_user(request.user)))
+    if any(lookup.startswith('property__') for lookup in lookups):
+        related.append(fingerprint(Property.objects.for_user(request.user)))
+    etag = make_etag(request.user.pk, name, sorted(params.lists()), fingerprint(queryset), related)
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    ordered_by = resource['cursor_field']
+    if params.get('cursor'):
+        timestamp, pk = decode_cursor(params['cursor'])
+        queryset = queryset.filter(
+            Q(**{f'{ordered_by}__lt': timestamp}) | Q(**{ordered_by: timestamp, 'id__lt': pk})
+        )
+    # values() on the ORM lookups, plus the cursor columns even when `fields` leaves them out
+    rows = list(
+        queryset.values(*dict.fromkeys(lookups + [ordered_by, 'id']))
+        .order_by(f'-{ordered_by}', '-id')[:limit + 1]
+    )
+
+    next_cursor = next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][ordered_by], rows[-1]['id'])
+        query = params.copy()
+        query['cursor'] = next_cursor
+        next_url = request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+    rows = [{field: row[lookup] for field, lookup in zip(fields, lookups)} for row in rows]
+
+    response = JsonResponse({'results': rows, 'next_cursor': next_cursor, 'next': next_url})
+    return set_validators(response, etag)
+
+
+@api_view
+def tenants(request):
+    """Tenants in the user's properties"""
+    return paginate(request, 'tenants')
+
+
+@api_view
+def payments(request):
+    """Payments by tenants in the user's properties"""
+    return paginate(request, 'payments')
+
+
+@api_view
+def sms_logs(request):
+    """SMS sent to tenants in the user's properties"""
+    return paginate(request, 'sms')
+
+
+@api_view
+def analytics_summary(request):
+    """Tenant, income and trend figures from AnalyticsService"""
+    now = timezone.now()
+    try:
+        year = int(request.GET.get('year', now.year))
+        month = int(request.GET.get('month', now.month))
+        days = int(request.GET.get('days', 30))
+    except ValueError:
+        raise APIError('year, month and days must be numbers')
+    if not 1 <= year <= 9998 or not 1 <= month <= 12 or not 1 <= days <= 366:
+        raise APIError('year, month (1-12) or days (1-366) out of range')
+
+    user = request.user
+    # Trends and overdue days move with the calendar even when no data changes
+    etag = make_etag(
+        user.pk, 'analytics', year, month, days, timezone.localdate(),
+        fingerprint(scoped_tenants(user)), fingerprint(scoped_payments(user)),
+    )
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    yearly = AnalyticsService.get_yearly_income(year, user=user)
+    response = JsonResponse({
+        'tenants': AnalyticsService.get_tenant_analytics(user=user),
+        'monthly_income': AnalyticsService.get_monthly_income(year, month, user=user),
+        'yearly_income': {
+            'year': yearly['year'],
+            'total_yearly': yearly['total_yearly'],
+            'months': [
+                {key: data[key] for key in ('month', 'month_name', 'total_income', 'payment_count')}
+                for data in yearly['monthly_data']
+            ],
+        },
+        'payment_trends': AnalyticsService.get_payment_trends(days, user=user),
+        'overdue_tenants': [
+            {
+                'id': item['tenant'].id,
+                'name': item['tenant'].name,
+                'apartment_number': item['tenant'].apartment_number,
+                'days_overdue': item['days_overdue'],
+                'amount_due': item['amount_due'],
+            }
+            for item in AnalyticsService.get_overdue_tenants(user=user)
+        ],
+    })
+    return set_validators(response, etag)
@@ -1,6 +1,32 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, post_save, post_delete
+
+
+def ensure_search_index(sender, using, **kwargs):
+    """Re-create the tenant search index if a migration dropped it (SQLite table rebuilds)"""
+    from django.db import connections
+    from .search_service import TenantSearchService
+
+    TenantSearchService.ensure_index(connections[using])
+
+
+def reset_data_versions(sender, **kwargs):
+    """flush and test database setup emit post_migrate; drop fragments cached for the old data"""
+    from .data_version import DataVersion
+
+    DataVersion.reset()
 
 
 class RentalAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rental_app'
+
+    def ready(self):
+        post_migrate.connect(ensure_search_index, sender=self)
+        post_migrate.connect(reset_data_versions, sender=self)
+
+        from .models import Tenant, Payment
+        from .data_version import bump_tenants, bump_payments
+        for signal in (post_save, post_delete):
+            signal.connect(bump_tenants, sender=Tenant)
+            signal.connect(bump_payments, sender=Payment)
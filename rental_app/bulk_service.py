@@ -0,0 +1,123 @@
+"""
+Bulk actions for Rental Management System
+
+Bulk delete and bulk SMS pages target either a filter specification
+(see BulkFilterForm), resolved server-side to one queryset, or a small
+explicit selection of ids. Either way the rows are processed in chunks
+walked by primary key, so memory and transaction size stay bounded no
+matter how many rows match. Bulk SMS is queued for the retry worker
+rather than sent inside the request.
+"""
+
+import uuid
+
+from django.db import transaction
+
+from .models import Tenant, ArchivedTenant, TenantHistory
+from .payment_service import PaymentService
+from .message_templates import templates
+from .sms_retry_service import SMSRetryService
+from .data_version import DataVersion
+
+CHUNK_SIZE = 500
+# Checkbox selections larger than this must be expressed as a filter
+MAX_SELECTED_IDS = 100
+# Rows shown on a bulk action page; the rest are only counted
+PREVIEW_LIMIT = 50
+REMINDER_TYPES = ('rent_reminder', 'payment_reminder')
+
+
+class TooManySelected(ValueError):
+    """More explicit ids than MAX_SELECTED_IDS were posted"""
+
+
+def selected(queryset, ids):
+    """Narrow `queryset` to an explicit selection, ignoring malformed ids"""
+    if len(ids) > MAX_SELECTED_IDS:
+        raise TooManySelected(
+            f'{len(ids)} rows selected; select at most {MAX_SELECTED_IDS} or use the filters instead.'
+        )
+    valid = []
+    for value in ids:
+        try:
+            valid.append(uuid.UUID(value))
+        except ValueError:
+            continue
+    return queryset.filter(pk__in=valid)
+
+
+def chunks(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Yield lists of up to chunk_size objects in primary key order.
+
+    Each chunk is fetched after the previous one was processed, starting
+    after its last key, so rows deleted by the caller are never re-read.
+    """
+    queryset = queryset.order_by('pk')
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1].pk
+
+
+class BulkActionService:
+    """Chunked bulk delete and reminder queueing"""
+
+    @staticmethod
+    def delete_tenants(queryset, chunk_size=CHUNK_SIZE):
+        """
+        Archive and delete every tenant in `queryset`, one chunk per transaction.
+
+        Returns:
+            int: tenants deleted
+        """
+        total = 0
+        for tenants in chunks(queryset, chunk_size):
+            with transaction.atomic():
+                archived, history = zip(*(tenant.archive_records() for tenant in tenants))
+                ArchivedTenant.objects.bulk_create(archived)
+                TenantHistory.objects.bulk_create(history)
+                Tenant.objects.filter(pk__in=[tenant.pk for tenant in tenants]).delete()
+                DataVersion.bump('tenants', 'payments')
+            total += len(tenants)
+        return total
+
+    @staticmethod
+    def delete_payments(queryset, chunk_size=CHUNK_SIZE):
+        """
+        Delete every payment in `queryset`, restoring tenant balances,
+        one chunk per transaction.
+
+        Returns:
+            int: payments deleted
+        """
+        total = 0
+        for payments in chunks(queryset.select_related('tenant'), chunk_size):
+            total += PaymentService.delete_payments(payments)
+        return total
+
+    @staticmethod
+    def queue_reminders(queryset, message_type, chunk_size=CHUNK_SIZE):
+        """
+        Queue a rent or payment reminder for every tenant in `queryset`.
+        The process_sms_retries worker sends them, so the request only
+        renders messages and inserts log rows.
+
+        Returns:
+            int: messages queued
+        """
+        if message_type not in REMINDER_TYPES:
+            raise ValueError(f"Unknown reminder type: {message_type}")
+        queued = 0
+        for tenants in chunks(queryset, chunk_size):
+            if message_type == 'payment_reminder':
+                messages = [(tenant, templates.render(message_type, tenant, amount_due=tenant.amount_due))
+                            for tenant in tenants]
+            else:
+                messages = [(tenant, templates.render(message_type, tenant)) for tenant in tenants]
+            queued += SMSRetryService.enqueue(messages)
+        return queued
@@ -0,0 +1,292 @@
+"""
+Cold storage for archived tenants and payments
+
+ArchivedTenant and ArchivedPayment rows older than a cutoff are moved out
+of the database into append-only segment files under
+settings.COLD_STORAGE_DIR/<table>/. Each segment is written once and never
+modified:
+
+- <name>.jsonl.gz: rows as JSON lines ordered by archived_at, compressed
+  in blocks of `block_rows` rows. Every block is a complete gzip member,
+  so one block can be read without decompressing the rest (and the whole
+  file is still a valid .gz for zcat).
+- <name>.blocks: one fixed-width record per block (first and last
+  archived_at as epoch microseconds, byte offset, byte length), for
+  date-range reads.
+- <name>.ids: one fixed-width record per row (original_id, block offset,
+  block length) sorted by original_id, for lookups.
+
+Readers memory-map the index files and binary search them, so a lookup
+touches a few index pages and one block per segment. The .ids file is
+renamed into place last and is what marks a segment as complete.
+
+Rows are deleted from the database only after their segment is on disk
+and has been read back and checked. COLD_STORAGE_DIR has no default: it
+must point at persistent, backed-up storage (not a Heroku dyno's disk).
+A run interrupted between the two leaves the rows in both places; the
+next run stores them again and readers drop the duplicates by row id.
+"""
+
+import calendar
+import gzip
+import json
+import mmap
+import os
+import struct
+import uuid
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ArchivedTenant, ArchivedPayment
+
+TABLES = {
+    'tenants': ArchivedTenant,
+    'payments': ArchivedPayment,
+}
+
+ID_RECORD = struct.Struct('>16sQI')      # original_id, block offset, block length
+BLOCK_RECORD = struct.Struct('>qqQI')    # first/last archived_at (epoch us), offset, length
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+SEGMENT_SUFFIX = '.jsonl.gz'
+
+
+def months_ago(months, now=None):
+    """The same moment `months` calendar months before `now` (day clamped to month end)"""
+    now = now or timezone.now()
+    month_index = now.year * 12 + now.month - 1 - months
+    year, month = divmod(month_index, 12)
+    day = min(now.day, calendar.monthrange(year, month + 1)[1])
+    return now.replace(year=year, month=month + 1, day=day)
+
+
+def to_micros(moment):
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+class ArchiveEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder without its millisecond truncation, so timestamps round-trip exactly"""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class ColdStorageError(Exception):
+    """Cold storage is not configured, or a written segment failed its check"""
+
+
+def storage_dir(table):
+    directory = getattr(settings, 'COLD_STORAGE_DIR', None)
+    if not directory:
+        raise ColdStorageError('COLD_STORAGE_DIR is not set')
+    return Path(directory) / table
+
+
+class RecordView:
+    """Sequence over fixed-width records in a mmap, keyed for bisect"""
+
+    def __init__(self, buffer, record, key):
+        self.buffer = buffer
+        self.record = record
+        self.key = key
+
+    def __len__(self):
+        return len(self.buffer) // self.record.size
+
+    def __getitem__(self, index):
+        return self.key(self.record.unpack_from(self.buffer, index * self.record.size))
+
+
+class Segment:
+    """One immutable segment: data file plus its two index files"""
+
+    def __init__(self, ids_path):
+        self.ids_path = Path(ids_path)
+        self.base = self.ids_path.with_suffix('')
+        self.data_path = self.base.with_name(self.base.name + SEGMENT_SUFFIX)
+        self.blocks_path = self.base.with_suffix('.blocks')
+
+    def _mapped(self, path):
+        with open(path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read_blocks(self, spans):
+        """Rows of the blocks at (offset, length) spans, in order"""
+        with open(self.data_path, 'rb') as f:
+            for offset, length in spans:
+                f.seek(offset)
+                for line in gzip.decompress(f.read(length)).splitlines():
+                    yield json.loads(line)
+
+    def remove(self):
+        for path in (self.ids_path, self.blocks_path, self.data_path):
+            path.unlink(missing_ok=True)
+
+    def verify(self, rows, block_rows):
+        """
+        Read the segment back from disk and raise ColdStorageError unless
+        it holds exactly `rows` and the id index finds the first row of
+        every block.
+        """
+        expected = [str(row['id']) for row in rows]
+        stored = [row['id'] for row in self.between(None, None)]
+        if stored != expected:
+            raise ColdStorageError(f'{self.data_path.name}: {len(stored)} rows read back, expected {len(expected)}')
+        for row in rows[::block_rows]:
+            if str(row['id']) not in [found['id'] for found in self.find(row['original_id'])]:
+                raise ColdStorageError(f"{self.ids_path.name}: original_id {row['original_id']} not found")
+
+    def find(self, original_id):
+        key = uuid.UUID(str(original_id)).bytes
+        spans = []
+        with self._mapped(self.ids_path) as ids:
+            view = RecordView(ids, ID_RECORD, key=lambda record: record[0])
+            index = bisect_left(view, key)
+            while index < len(view):
+                record = ID_RECORD.unpack_from(ids, index * ID_RECORD.size)
+                if record[0] != key:
+                    break
+                if record[1:] not in spans:
+                    spans.append(record[1:])
+                index += 1
+        wanted = str(uuid.UUID(bytes=key))
+        return [row for row in self.read_blocks(spans) if row['original_id'] == wanted]
+
+    def between(self, start, end):
+        start_us = to_micros(start) if start else None
+        end_us = to_micros(end) if end else None
+        spans = []
+        with self._mapped(self.blocks_path) as blocks:
+            # Blocks are in archived_at order, so their last timestamps are sorted
+            view = RecordView(blocks, BLOCK_RECORD, key=lambda record: record[1])
+            index = bisect_left(view, start_us) if start_us is not None else 0
+            for index in range(index, len(view)):
+                first, _, offset, length = BLOCK_RECORD.unpack_from(blocks, index * BLOCK_RECORD.size)
+                if end_us is not None and first >= end_us:
+                    break
+                spans.append((offset, length))
+        for row in self.read_blocks(spans):
+            archived_at = parse_datetime(row['archived_at'])
+            if (start is None or archived_at >= start) and (end is None or archived_at < end):
+                yield row
+
+
+def _write_synced(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class ColdStorageService:
+    """Move archive rows into segment files and read them back"""
+
+    @staticmethod
+    def segments(table):
+        """Complete segments for `table`, oldest first"""
+        return [Segment(path) for path in sorted(storage_dir(table).glob('*.ids'))]
+
+    @staticmethod
+    def write_segment(table, rows, block_rows=256):
+        """
+        Write rows (dicts from values(), ordered by archived_at) as a new segment.
+
+        Returns:
+            Segment: the segment written
+        """
+        directory = storage_dir(table)
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"{timezone.now():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+
+        data = bytearray()
+        blocks = []
+        ids = []
+        for start in range(0, len(rows), block_rows):
+            block = rows[start:start + block_rows]
+            payload = ''.join(json.dumps(row, cls=ArchiveEncoder) + '\n' for row in block)
+            compressed = gzip.compress(payload.encode(), mtime=0)
+            offset, length = len(data), len(compressed)
+            data += compressed
+            blocks.append(BLOCK_RECORD.pack(
+                to_micros(block[0]['archived_at']), to_micros(block[-1]['archived_at']), offset, length
+            ))
+            ids.extend((row['original_id'].bytes, offset, length) for row in block)
+        ids.sort()
+
+        segment = Segment(directory / f'{name}.ids')
+        for path, content in (
+            (segment.data_path, bytes(data)),
+            (segment.blocks_path, b''.join(blocks)),
+            (segment.ids_path, b''.join(ID_RECORD.pack(*record) for record in ids)),
+        ):
+            temporary = path.with_name(path.name + '.tmp')
+            _write_synced(temporary, content)
+            os.replace(temporary, path)
+        return segment
+
+    @staticmethod
+    def export(table, before, segment_rows=10000, block_rows=256, dry_run=False):
+        """
+        Move rows of `table` archived before `before` into segments,
+        deleting each batch from the database once its segment is written
+        and verified. A segment that fails verification is removed and
+        ColdStorageError raised, leaving its rows in the database.
+
+        Returns:
+            int: rows moved
+        """
+        model = TABLES[table]
+        old = model.objects.filter(archived_at__lt=before)
+        storage_dir(table)  # fail before touching anything if unconfigured
+        if dry_run:
+            return old.count()
+
+        total = 0
+        while True:
+            rows = list(old.order_by('archived_at', 'id').values()[:segment_rows])
+            if not rows:
+                return total
+            segment = ColdStorageService.write_segment(table, rows, block_rows)
+            try:
+                segment.verify(rows, block_rows)
+            except Exception:
+                segment.remove()
+                raise
+            with transaction.atomic():
+                model.objects.filter(id__in=[row['id'] for row in rows]).delete()
+            total += len(rows)
+
+    @staticmethod
+    def find(table, original_id):
+        """
+        Cold rows for an original tenant or payment id.
+
+        Returns:
+            list: row dicts (values as stored in JSON)
+        """
+        seen = set()
+        results = []
+        for segment in ColdStorageService.segments(table):
+            for row in segment.find(original_id):
+                if row['id'] not in seen:
+                    seen.add(row['id'])
+                    results.append(row)
+        return results
+
+    @staticmethod
+    def between(table, start=None, end=None):
+        """Cold rows archived in [start, end), oldest segment first"""
+        seen = set()
+        for segment in ColdStorageService.segments(table):
+            for row in segment.between(start, end):
+                if row['id'] not in seen:
+                    seen.add(row['id'])
+                    yield row
@@ -0,0 +1,136 @@
+"""
+Conditional GET helpers for Rental Management System
+
+Validators are computed from a small aggregate over the data a response is
+built from, so a client polling an unchanged resource gets a 304 without
+the response being rendered. Tenant and payment fingerprints rely on
+updated_at, so writes that bypass save() (QuerySet.update()) must set it.
+"""
+
+import hashlib
+import json
+import os
+from functools import lru_cache, wraps
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max, Q, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .models import Property, Tenant, Payment, SMSLog
+
+
+def make_etag(*parts):
+    """A quoted strong ETag for any JSON-serialisable parts"""
+    data = json.dumps(parts, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+    return '"%s"' % hashlib.md5(data.encode()).hexdigest()
+
+
+def tenants_fingerprint(tenants):
+    """
+    Row count and newest updated_at, answered from the (property,
+    updated_at) index. Every write path bumps updated_at, including
+    PaymentService's .update() calls; the count catches deletes.
+    """
+    return tenants.aggregate(count=Count('pk'), updated=Max('updated_at'))
+
+
+def payments_fingerprint(payments):
+    """Row count and newest updated_at, answered from the (tenant, updated_at) index"""
+    return payments.aggregate(count=Count('pk'), updated=Max('updated_at'))
+
+
+def sms_fingerprint(logs):
+    return logs.aggregate(
+        count=Count('pk'),
+        latest=Max('sent_at'),
+        delivery=Max('delivery_updated_at'),
+        attempts=Sum('attempts'),
+        success=Count('pk', filter=Q(status='success')),
+        retrying=Count('pk', filter=Q(status='retrying')),
+        dead=Count('pk', filter=Q(status='dead')),
+    )
+
+
+def properties_fingerprint(properties):
+    """Ids and names: a landlord has few properties, and renames have no timestamp"""
+    return list(properties.order_by('pk').values_list('pk', 'name'))
+
+
+FINGERPRINTS = {
+    Property: properties_fingerprint,
+    Tenant: tenants_fingerprint,
+    Payment: payments_fingerprint,
+    SMSLog: sms_fingerprint,
+}
+
+
+def fingerprint(queryset):
+    """Fingerprint of a Property, Tenant, Payment or SMSLog queryset"""
+    return FINGERPRINTS[queryset.model](queryset.order_by())
+
+
+def not_modified(request, etag):
+    """A 304 response if the client already has `etag`, else None"""
+    return get_conditional_response(request, etag=etag)
+
+
+def set_validators(response, etag):
+    """Send the ETag and make per-user responses revalidate on every use"""
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+@lru_cache(maxsize=None)
+def release_marker():
+    """
+    Changes when templates or collected static files change, so a deploy
+    invalidates pages cached by browsers (old HTML may point at hashed
+    static files that no longer exist). Computed once per process.
+    """
+    paths = [Path(settings.STATIC_ROOT) / 'staticfiles.json']
+    for directory in settings.TEMPLATES[0].get('DIRS', []):
+        for root, _, files in os.walk(directory):
+            paths.extend(Path(root) / name for name in files)
+    stamps = []
+    for path in sorted(paths):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        stamps.append((str(path), stat.st_size, stat.st_mtime_ns))
+    return make_etag(stamps)
+
+
+def conditional_page(fingerprint_func):
+    """
+    Conditional GET for a per-user HTML page.
+
+    `fingerprint_func(request)` returns cheap JSON-serialisable data that
+    changes whenever the page would. No ETag is sent while flash messages
+    are pending, so they are never hidden behind a 304.
+    """
+    def etag_func(request, *args, **kwargs):
+        if len(messages.get_messages(request)):
+            return None
+        return make_etag(
+            request.user.pk, release_marker(), sorted(request.GET.lists()), fingerprint_func(request)
+        )
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.has_header('ETag'):
+                patch_cache_control(response, private=True, no_cache=True)
+                patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,82 @@
+"""
+Data version counters for Rental Management System
+
+Each tracked table has a version token in the cache that changes after
+every committed write. Template fragments that include the token in their
+cache key are reused until the data changes.
+
+Model saves and deletes bump versions through signals (see apps.py).
+Writes that bypass signals (QuerySet.update(), bulk_create) must call
+DataVersion.bump() themselves.
+"""
+
+import uuid
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+
+TRACKED = ('tenants', 'payments')
+
+
+def cache_key(name):
+    return f'data-version:{name}'
+
+
+def _set_new_version(name):
+    # A fresh random token rather than incr(): concurrent bumps can't collide,
+    # and an evicted counter can't restart at a value old fragments still use
+    cache.set(cache_key(name), uuid.uuid4().hex, timeout=None)
+
+
+class DataVersion:
+    """Read and bump the version tokens of tracked tables"""
+
+    @staticmethod
+    def get(*names):
+        """
+        Current tokens for `names` (default: every tracked table).
+
+        Returns:
+            dict: {name: token}
+        """
+        names = names or TRACKED
+        versions = cache.get_many([cache_key(name) for name in names])
+        result = {}
+        for name in names:
+            token = versions.get(cache_key(name))
+            if token is None:
+                cache.add(cache_key(name), uuid.uuid4().hex, timeout=None)
+                token = cache.get(cache_key(name))
+            result[name] = token
+        return result
+
+    @staticmethod
+    def reset(*names):
+        """Change the tokens for `names` (default: all) right away, outside any transaction"""
+        for name in names or TRACKED:
+            _set_new_version(name)
+
+    @staticmethod
+    def bump(*names, using=None):
+        """
+        Change the tokens for `names` once the current transaction commits,
+        so a fragment is never cached under the new version with old data.
+        Repeated bumps in one transaction are queued once.
+        """
+        connection = transaction.get_connection(using)
+        queued = {getattr(entry[1], 'data_version', None) for entry in connection.run_on_commit}
+        for name in names:
+            if name in queued:
+                continue
+            callback = partial(_set_new_version, name)
+            callback.data_version = name
+            transaction.on_commit(callback, using=using)
+
+
+def bump_tenants(sender, **kwargs):
+    DataVersion.bump('tenants', using=kwargs.get('using'))
+
+
+def bump_payments(sender, **kwargs):
+    DataVersion.bump('payments', using=kwargs.get('using'))
@@ -0,0 +1,149 @@
+"""
+SMS delivery reports (DLRs) for Rental Management System
+
+The provider posts one report per message status change. Reports are
+staged in DeliveryReport and applied in micro-batches: one UPDATE per
+(delivery status, failure reason) group keyed on SMSLog.provider_message_id,
+then the staged rows are deleted.
+"""
+
+from collections import OrderedDict, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import SMSLog, DeliveryReport
+from .sms_statistics_service import SMSStatisticsService, DELIVERY_COUNTER_STATUSES, log_day
+
+# Africa's Talking DLR status -> SMSLog.delivery_status
+AFRICASTALKING_STATUSES = {
+    'Sent': 'sent',
+    'Submitted': 'sent',
+    'Buffered': 'sent',
+    'Success': 'delivered',
+    'Rejected': 'failed',
+    'Failed': 'failed',
+    'AbsentSubscriber': 'failed',
+    'Expired': 'failed',
+}
+FINAL_STATUSES = ('delivered', 'failed')
+
+
+class DeliveryReportService:
+    """Service for staging and applying provider delivery reports"""
+
+    @staticmethod
+    def parse_africastalking(data):
+        """
+        Validate an Africa's Talking delivery report (form fields).
+
+        Returns:
+            dict: Fields for DeliveryReport
+
+        Raises:
+            ValueError: If the id or status is missing or unknown
+        """
+        message_id = str(data.get('id') or '').strip()
+        status = str(data.get('status') or '').strip()
+        if not message_id:
+            raise ValueError("Missing id")
+        if status not in AFRICASTALKING_STATUSES:
+            raise ValueError(f"Unknown status: {status!r}")
+        return {
+            'provider': 'africastalking',
+            'provider_message_id': message_id,
+            'status': status,
+            'failure_reason': str(data.get('failureReason') or '')[:50],
+            'phone': str(data.get('phoneNumber') or '')[:20],
+            'payload': {key: data.get(key) for key in data.keys()},
+        }
+
+    @staticmethod
+    def ingest(data):
+        """Validate and stage one Africa's Talking report"""
+        DeliveryReport.objects.create(**DeliveryReportService.parse_africastalking(data))
+
+    @staticmethod
+    def flush_due():
+        """Check whether the staged reports should be applied now"""
+        batch_size = getattr(settings, 'DLR_BATCH_SIZE', 200)
+        max_wait = getattr(settings, 'DLR_BATCH_MAX_WAIT', 5)
+        if DeliveryReport.objects.all()[batch_size - 1:batch_size].exists():
+            return True
+        oldest = DeliveryReport.objects.order_by('received_at').values_list('received_at', flat=True).first()
+        return oldest is not None and oldest <= timezone.now() - timedelta(seconds=max_wait)
+
+    @staticmethod
+    def process_pending(limit=None):
+        """
+        Apply one batch of staged reports.
+
+        Returns:
+            int: number of reports consumed
+        """
+        limit = limit or getattr(settings, 'DLR_BATCH_SIZE', 200)
+        now = timezone.now()
+
+        with transaction.atomic():
+            reports = list(
+                DeliveryReport.objects.select_for_update(skip_locked=True)
+                .order_by('received_at', 'id')[:limit]
+            )
+            if not reports:
+                return 0
+
+            # Latest report per message wins within the batch
+            latest = OrderedDict()
+            for report in reports:
+                latest[report.provider_message_id] = report
+
+            groups = {}
+            for message_id, report in latest.items():
+                delivery_status = AFRICASTALKING_STATUSES[report.status]
+                reason = report.failure_reason if delivery_status == 'failed' else ''
+                groups.setdefault((delivery_status, reason), []).append(message_id)
+
+            # Counter changes for the delivered/undelivered statistics
+            deltas = defaultdict(int)
+            current = (
+                SMSLog.objects.select_for_update()
+                .filter(provider_message_id__in=list(latest))
+                .values_list('provider_message_id', 'sent_at', 'provider', 'delivery_status')
+            )
+            for message_id, sent_at, provider, old_status in current:
+                new_status = AFRICASTALKING_STATUSES[latest[message_id].status]
+                if new_status not in FINAL_STATUSES and old_status in FINAL_STATUSES:
+                    continue
+                old_counter = DELIVERY_COUNTER_STATUSES.get(old_status)
+                new_counter = DELIVERY_COUNTER_STATUSES.get(new_status)
+                if old_counter != new_counter:
+                    if old_counter:
+                        deltas[(log_day(sent_at), provider, old_counter)] -= 1
+                    if new_counter:
+                        deltas[(log_day(sent_at), provider, new_counter)] += 1
+
+            for (delivery_status, reason), message_ids in groups.items():
+                logs = SMSLog.objects.filter(provider_message_id__in=message_ids)
+                if delivery_status not in FINAL_STATUSES:
+                    # A late "Sent" must not overwrite a delivered/failed result
+                    logs = logs.exclude(delivery_status__in=FINAL_STATUSES)
+                logs.update(
+                    delivery_status=delivery_status,
+                    failure_reason=reason,
+                    delivery_updated_at=now,
+                )
+
+            SMSStatisticsService.apply_deltas(deltas)
+            DeliveryReport.objects.filter(pk__in=[report.pk for report in reports]).delete()
+        return len(reports)
+
+    @staticmethod
+    def process_all(limit=None):
+        """Drain the staged reports batch by batch"""
+        total = 0
+        while True:
+            applied = DeliveryReportService.process_pending(limit)
+            if not applied:
+                return total
+            total += applied
@@ -1,24 +1,75 @@
+from datetime import datetime, time, timedelta
+
 from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Submit, Row, Column
-from .models import Tenant, Payment
+from .models import Tenant, Payment, Property, RENT_STATUS_CHOICES, PAYMENT_STATUS_CHOICES
+from .phone import normalize_phone
+
+
+class TenantAutocompleteWidget(forms.TextInput):
+    """
+    Search box backed by the tenant_search endpoint instead of a <select>
+    with every tenant. The chosen tenant's id is posted in a hidden input,
+    and only that tenant is loaded to show its name when the form is
+    re-rendered.
+    """
+    input_type = 'search'
+    
+    class Media:
+        js = ['js/tenant_autocomplete.js']
+    
+    def label_for(self, value):
+        queryset = getattr(self.choices, 'queryset', None)
+        if not value or queryset is None:
+            return ''
+        try:
+            tenant = queryset.only('name', 'apartment_number').filter(pk=value).first()
+        except (ValidationError, ValueError):
+            return ''
+        return str(tenant) if tenant else ''
+    
+    def render(self, name, value, attrs=None, renderer=None):
+        attrs = self.build_attrs(self.attrs, attrs)
+        search = forms.TextInput(attrs={
+            **attrs,
+            'type': 'search',
+            'autocomplete': 'off',
+            'placeholder': 'Search by name, apartment or phone',
+        })
+        return format_html(
+            '<div class="position-relative" data-tenant-autocomplete data-url="{}">{}{}'
+            '<div class="list-group position-absolute w-100 shadow-sm" style="z-index: 1000;"></div></div>',
+            reverse('tenant_search'),
+            search.render(f'{name}_search', self.label_for(value)),
+            forms.HiddenInput().render(name, value or '', {'id': f"{attrs.get('id', 'id_' + name)}_value"}),
+        )
 
 
 class TenantForm(forms.ModelForm):
     class Meta:
         model = Tenant
-        fields = ['name', 'phone', 'apartment_number', 'rent_amount', 'due_date', 'rent_status']
+        fields = ['name', 'phone', 'property', 'apartment_number', 'rent_amount', 'due_date', 'rent_status']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
             'phone': forms.TextInput(attrs={'class': 'form-control', 'placeholder': '+254712345678'}),
+            'property': forms.Select(attrs={'class': 'form-control'}),
             'apartment_number': forms.TextInput(attrs={'class': 'form-control'}),
             'rent_amount': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'placeholder': 'Enter amount in KSh'}),
             'due_date': forms.NumberInput(attrs={'class': 'form-control', 'min': '1', 'max': '31', 'placeholder': 'Day of month (1-31)'}),
             'rent_status': forms.Select(attrs={'class': 'form-control'}),
         }
     
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, user=None, **kwargs):
         super().__init__(*args, **kwargs)
+        if user is not None:
+            self.fields['property'].queryset = Property.objects.for_user(user)
+            # Landlords must file every tenant under one of their properties
+            self.fields['property'].required = not user.is_superuser
         self.helper = FormHelper()
         self.helper.layout = Layout(
             Row(
@@ -27,17 +78,24 @@ class TenantForm(forms.ModelForm):
                 css_class='form-row'
             ),
             Row(
+                Column('property', css_class='form-group col-md-6 mb-0'),
                 Column('apartment_number', css_class='form-group col-md-6 mb-0'),
-                Column('rent_amount', css_class='form-group col-md-6 mb-0'),
                 css_class='form-row'
             ),
             Row(
-                Column('due_date', css_class='form-group col-md-6 mb-0'),
-                Column('rent_status', css_class='form-group col-md-6 mb-0'),
+                Column('rent_amount', css_class='form-group col-md-4 mb-0'),
+                Column('due_date', css_class='form-group col-md-4 mb-0'),
+                Column('rent_status', css_class='form-group col-md-4 mb-0'),
                 css_class='form-row'
             ),
             Submit('submit', 'Save Tenant', css_class='btn btn-primary')
         )
+    
+    def clean_phone(self):
+        phone = self.cleaned_data['phone']
+        if not normalize_phone(phone):
+            raise forms.ValidationError('Enter a valid phone number, e.g. +254712345678 or 0712345678.')
+        return phone
 
 
 class PaymentForm(forms.ModelForm):
@@ -45,15 +103,17 @@ class PaymentForm(forms.ModelForm):
         model = Payment
         fields = ['tenant', 'amount', 'payment_type', 'status', 'notes']
         widgets = {
-            'tenant': forms.Select(attrs={'class': 'form-control'}),
+            'tenant': TenantAutocompleteWidget(attrs={'class': 'form-control'}),
             'amount': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'placeholder': 'Enter amount in KSh'}),
             'payment_type': forms.Select(attrs={'class': 'form-control'}),
             'status': forms.Select(attrs={'class': 'form-control'}),
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Optional notes about this payment'}),
         }
     
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, user=None, **kwargs):
         super().__init__(*args, **kwargs)
+        if user is not None:
+            self.fields['tenant'].queryset = Tenant.objects.for_user(user)
         self.helper = FormHelper()
         self.helper.layout = Layout(
             'tenant',
@@ -66,3 +126,176 @@ class PaymentForm(forms.ModelForm):
             'notes',
             Submit('submit', 'Record Payment', css_class='btn btn-success')
         )
+
+
+class StatementUploadForm(forms.Form):
+    file = forms.FileField(
+        label='Statement CSV',
+        help_text='M-Pesa statement or bank export saved as CSV',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv'})
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        initial=True,
+        label='Dry run (report matches without saving)'
+    )
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.helper = FormHelper()
+        self.helper.layout = Layout(
+            'file',
+            'dry_run',
+            Submit('submit', 'Import Payments', css_class='btn btn-primary')
+        )
+
+
+class TenantUploadForm(forms.Form):
+    file = forms.FileField(
+        label='Tenant sheet',
+        help_text='CSV or XLSX with columns: name, phone, apartment_number, rent_amount, due_date (optional), rent_status (optional), amount_due (optional)',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'})
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        initial=True,
+        label='Dry run (validate without creating tenants)'
+    )
+    skip_invalid = forms.BooleanField(
+        required=False,
+        label='Create valid rows even if some rows have errors'
+    )
+    property = forms.ModelChoiceField(
+        queryset=Property.objects.all(),
+        required=False,
+        help_text='Property the tenants live in',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if user is not None:
+            self.fields['property'].queryset = Property.objects.for_user(user)
+            self.fields['property'].required = not user.is_superuser
+        self.helper = FormHelper()
+        self.helper.layout = Layout(
+            'property',
+            'file',
+            'dry_run',
+            'skip_invalid',
+            Submit('submit', 'Import Tenants', css_class='btn btn-primary')
+        )
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class BulkFilterForm(forms.Form):
+    """
+    Filter specification for a bulk action, submitted in the query string
+    and resolved server-side to one queryset instead of a list of ids.
+
+    Subclasses add their fields and map each one in `lookups` to a queryset
+    lookup, or to a (lookup, convert) pair when the value needs converting.
+    """
+    lookups = {'property': 'property'}
+    
+    property = forms.ModelChoiceField(
+        queryset=Property.objects.all(),
+        required=False,
+        empty_label='All properties',
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'})
+    )
+    
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if user is not None:
+            self.fields['property'].queryset = Property.objects.for_user(user)
+    
+    def has_filters(self):
+        """Whether a valid filter narrows the rows, so 'all matching' is not 'all'"""
+        return self.is_bound and self.is_valid() and any(value not in (None, '', []) for value in self.cleaned_data.values())
+    
+    def filter(self, queryset):
+        """Narrow `queryset` to the filters in cleaned_data"""
+        for name, lookup in self.lookups.items():
+            value = self.cleaned_data.get(name)
+            if value in (None, '', []):
+                continue
+            if isinstance(lookup, tuple):
+                lookup, convert = lookup
+                value = convert(value)
+            queryset = queryset.filter(**{lookup: value})
+        return queryset
+
+
+class BulkTenantFilterForm(BulkFilterForm):
+    lookups = {
+        'property': 'property',
+        'rent_status': 'rent_status__in',
+        'due_day_from': 'due_date__gte',
+        'due_day_to': 'due_date__lte',
+        'min_amount_due': 'amount_due__gte',
+    }
+    
+    rent_status = forms.MultipleChoiceField(
+        choices=RENT_STATUS_CHOICES,
+        required=False,
+        widget=forms.CheckboxSelectMultiple
+    )
+    due_day_from = forms.IntegerField(
+        required=False, min_value=1, max_value=31, label='Due day from',
+        widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm'})
+    )
+    due_day_to = forms.IntegerField(
+        required=False, min_value=1, max_value=31, label='Due day to',
+        widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm'})
+    )
+    min_amount_due = forms.DecimalField(
+        required=False, min_value=0, max_digits=10, decimal_places=2, label='Amount due at least',
+        widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm'})
+    )
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('due_day_from'), cleaned_data.get('due_day_to')
+        if start and end and start > end:
+            raise ValidationError('The due day range is reversed.')
+        return cleaned_data
+
+
+class BulkPaymentFilterForm(BulkFilterForm):
+    # Local-midnight bounds rather than date__date, so the date index is used
+    lookups = {
+        'property': 'tenant__property',
+        'status': 'status__in',
+        'date_from': ('date__gte', start_of_day),
+        'date_to': ('date__lt', lambda day: start_of_day(day + timedelta(days=1))),
+        'min_amount': 'amount__gte',
+    }
+    
+    status = forms.MultipleChoiceField(
+        choices=PAYMENT_STATUS_CHOICES,
+        required=False,
+        widget=forms.CheckboxSelectMultiple
+    )
+    date_from = forms.DateField(
+        required=False, label='Paid from',
+        widget=forms.DateInput(attrs={'class': 'form-control form-control-sm', 'type': 'date'})
+    )
+    date_to = forms.DateField(
+        required=False, label='Paid to',
+        widget=forms.DateInput(attrs={'class': 'form-control form-control-sm', 'type': 'date'})
+    )
+    min_amount = forms.DecimalField(
+        required=False, min_value=0, max_digits=10, decimal_places=2, label='Amount at least',
+        widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm'})
+    )
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('date_from'), cleaned_data.get('date_to')
+        if start and end and start > end:
+            raise ValidationError('The date range is reversed.')
+        return cleaned_data
@@ -0,0 +1,537 @@
+"""
+Bulk CSV/XLSX importers for Rental Management System
+
+Statement files are parsed as a stream, so memory use depends on the batch
+size and the number of tenants, not on the size of the file.
+"""
+
+import csv
+import re
+from collections import Counter, defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from .models import Tenant, Payment, Unit, RENT_STATUS_CHOICES
+from .payment_service import PaymentService
+from .data_version import DataVersion
+from .phone import normalize_phone
+
+# Header aliases seen in M-Pesa statements and the common Kenyan bank exports
+AMOUNT_COLUMNS = ['paid in', 'amount', 'credit', 'credit amount', 'transamount', 'deposit']
+REFERENCE_COLUMNS = ['receipt no.', 'receipt no', 'receipt', 'transaction id', 'transid', 'reference', 'ref no', 'ref']
+PHONE_COLUMNS = ['phone', 'phone number', 'msisdn', 'mobile']
+ACCOUNT_COLUMNS = ['account', 'account no.', 'account reference', 'billrefnumber', 'bill ref', 'apartment', 'a/c no.']
+DETAILS_COLUMNS = ['details', 'description', 'narration', 'particulars']
+DATE_COLUMNS = ['completion time', 'date', 'transaction date', 'value date', 'transtime']
+STATUS_COLUMNS = ['transaction status', 'status']
+
+PHONE_PATTERN = re.compile(r'(?:\+?254|0)?([17]\d{8})\b')
+ACCOUNT_PATTERN = re.compile(r'\bacc(?:ount)?\.?\s*(?:no\.?\s*)?[:\-]?\s*([A-Za-z0-9\-/]+)', re.IGNORECASE)
+
+# Keep the unmatched-row report bounded for multi-million row statements
+MAX_REPORTED_ROWS = 1000
+MAX_AMOUNT = Decimal('1e8')
+MAX_REFERENCE_LENGTH = Payment._meta.get_field('transaction_id').max_length
+
+
+def parse_amount(value):
+    """Parse '15,000.00', 'KSh 1,500' etc. Returns None for blank/zero/negative"""
+    cleaned = re.sub(r'[^\d.\-]', '', str(value or ''))
+    if not cleaned:
+        return None
+    try:
+        amount = Decimal(cleaned).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value!r}")
+    # Payment.amount is max_digits=10, decimal_places=2
+    if amount >= MAX_AMOUNT:
+        raise ValueError(f"Amount out of range: {value!r}")
+    return amount if amount > 0 else None
+
+
+class AmbiguousTenant(ValueError):
+    """A phone number or account reference belongs to more than one tenant"""
+
+
+class TenantIndex:
+    """
+    In-memory lookup of tenant IDs by phone and apartment, built with one query.
+
+    Apartment numbers are unique only within a property, so build the index
+    from the importing landlord's tenants (Tenant.objects.for_user). Keys
+    still shared by several tenants are kept as ambiguous, never resolved.
+    """
+
+    AMBIGUOUS = object()
+
+    def __init__(self, queryset=None):
+        queryset = queryset if queryset is not None else Tenant.objects.all()
+        self.by_phone = {}
+        self.by_apartment = {}
+        self.rent_amounts = {}
+        for tenant_id, phone, apartment, rent_amount in queryset.values_list(
+            'id', 'phone_e164', 'apartment_number', 'rent_amount'
+        ).iterator(chunk_size=5000):
+            if phone:
+                self._add(self.by_phone, phone, tenant_id)
+            self._add(self.by_apartment, apartment.strip().upper(), tenant_id)
+            self.rent_amounts[tenant_id] = rent_amount
+
+    def _add(self, index, key, tenant_id):
+        if index.setdefault(key, tenant_id) != tenant_id:
+            index[key] = self.AMBIGUOUS
+
+    def match(self, phone='', account=''):
+        """
+        Return the tenant ID for an account reference or phone number, or None.
+
+        Raises:
+            AmbiguousTenant: if the reference or phone matches several tenants
+        """
+        if account:
+            tenant_id = self.by_apartment.get(account.strip().upper())
+            if tenant_id is self.AMBIGUOUS:
+                raise AmbiguousTenant(f"Account {account!r} matches more than one tenant")
+            if tenant_id:
+                return tenant_id
+        phone = normalize_phone(phone)
+        tenant_id = self.by_phone.get(phone) if phone else None
+        if tenant_id is self.AMBIGUOUS:
+            raise AmbiguousTenant(f"Phone {phone} matches more than one tenant")
+        return tenant_id
+
+
+class ImportReport:
+    """Summary of an import run"""
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.total_rows = 0
+        self.imported = 0
+        self.total_amount = Decimal('0')
+        self.duplicates = 0
+        self.skipped = 0
+        self.unmatched_count = 0
+        self.unmatched = []
+        self.errors = []
+        self.tenants_updated = 0
+
+    def add_unmatched(self, line, reason, row):
+        self.unmatched_count += 1
+        if len(self.unmatched) < MAX_REPORTED_ROWS:
+            self.unmatched.append({'line': line, 'reason': reason, 'row': row})
+
+    def add_error(self, line, message):
+        if len(self.errors) < MAX_REPORTED_ROWS:
+            self.errors.append({'line': line, 'message': message})
+
+
+class PaymentStatementImporter:
+    """
+    Import credits from an M-Pesa statement or bank CSV as Payment rows.
+
+    Rows are validated and matched batch by batch, written with bulk_create,
+    and balance changes are aggregated per tenant and applied once at the end.
+    """
+
+    def __init__(self, batch_size=1000, dry_run=False, tenant_index=None):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.tenant_index = tenant_index
+
+    @staticmethod
+    def _find_column(headers, candidates):
+        for candidate in candidates:
+            if candidate in headers:
+                return headers.index(candidate)
+        return None
+
+    def _read_rows(self, stream):
+        """
+        Yield (line_number, fields) dicts, skipping statement preambles.
+
+        M-Pesa statements start with customer details before the table header,
+        so the header is the first row that contains an amount column.
+        """
+        reader = csv.reader(stream)
+        columns = None
+        for row in reader:
+            headers = [cell.strip().lower() for cell in row]
+            if self._find_column(headers, AMOUNT_COLUMNS) is not None:
+                columns = {
+                    name: self._find_column(headers, candidates)
+                    for name, candidates in (
+                        ('amount', AMOUNT_COLUMNS),
+                        ('reference', REFERENCE_COLUMNS),
+                        ('phone', PHONE_COLUMNS),
+                        ('account', ACCOUNT_COLUMNS),
+                        ('details', DETAILS_COLUMNS),
+                        ('date', DATE_COLUMNS),
+                        ('status', STATUS_COLUMNS),
+                    )
+                }
+                break
+        if columns is None:
+            raise ValueError("Could not find a header row with an amount column (e.g. 'Paid In', 'Amount', 'Credit')")
+
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            yield reader.line_num, {
+                name: (row[index].strip() if index is not None and index < len(row) else '')
+                for name, index in columns.items()
+            }
+
+    def _extract_payer(self, fields):
+        """Phone and account reference from dedicated columns or the details text"""
+        phone = fields['phone']
+        account = fields['account']
+        details = fields['details']
+        if not phone and details:
+            found = PHONE_PATTERN.search(details)
+            phone = found.group(1) if found else ''
+        if not account and details:
+            found = ACCOUNT_PATTERN.search(details)
+            account = found.group(1) if found else ''
+        return phone, account
+
+    def run(self, stream):
+        """
+        Import all rows from a text stream.
+
+        Args:
+            stream: Iterable of CSV lines (open file or TextIOWrapper)
+
+        Returns:
+            ImportReport
+        """
+        report = ImportReport(dry_run=self.dry_run)
+        if self.tenant_index is None:
+            self.tenant_index = TenantIndex()
+
+        with transaction.atomic():
+            deltas = defaultdict(Decimal)
+            batch = []
+            for line, fields in self._read_rows(stream):
+                report.total_rows += 1
+                batch.append((line, fields))
+                if len(batch) >= self.batch_size:
+                    self._process_batch(batch, deltas, report)
+                    batch = []
+            if batch:
+                self._process_batch(batch, deltas, report)
+
+            if not self.dry_run:
+                report.tenants_updated = PaymentService.apply_balance_deltas(deltas)
+
+        return report
+
+    def _process_batch(self, batch, deltas, report):
+        candidates = []
+        for line, fields in batch:
+            if fields['status'] and fields['status'].lower() not in ('completed', 'success', 'successful'):
+                report.skipped += 1
+                continue
+            try:
+                amount = parse_amount(fields['amount'])
+            except ValueError as e:
+                report.add_error(line, str(e))
+                continue
+            # One oversized value would abort the whole bulk_create on PostgreSQL
+            if fields['reference'] and len(fields['reference']) > MAX_REFERENCE_LENGTH:
+                report.add_error(line, f"Reference longer than {MAX_REFERENCE_LENGTH} characters: {fields['reference']!r}")
+                continue
+            if amount is None:
+                # Withdrawals and zero rows are not rent payments
+                report.skipped += 1
+                continue
+            candidates.append((line, fields, amount))
+
+        # One query per batch for receipts that were already recorded
+        references = [fields['reference'] for _, fields, _ in candidates if fields['reference']]
+        existing = set(
+            Payment.objects.filter(transaction_id__in=references).values_list('transaction_id', flat=True)
+        ) if references else set()
+
+        payments = []
+        for line, fields, amount in candidates:
+            reference = fields['reference'] or None
+            if reference and reference in existing:
+                report.duplicates += 1
+                continue
+
+            phone, account = self._extract_payer(fields)
+            try:
+                tenant_id = self.tenant_index.match(phone=phone, account=account)
+            except AmbiguousTenant as e:
+                report.add_error(line, str(e))
+                continue
+            if tenant_id is None:
+                report.add_unmatched(line, 'No tenant with this phone or apartment', fields)
+                continue
+
+            if reference:
+                existing.add(reference)
+            rent_amount = self.tenant_index.rent_amounts[tenant_id]
+            payments.append(Payment(
+                tenant_id=tenant_id,
+                amount=amount,
+                payment_type='Full' if amount >= rent_amount else 'Partial',
+                status='Paid',
+                transaction_id=reference,
+                notes=f"Statement import: {reference or 'no reference'} on {fields['date'] or 'unknown date'}",
+            ))
+            deltas[tenant_id] += amount
+            report.imported += 1
+            report.total_amount += amount
+
+        if payments and not self.dry_run:
+            Payment.objects.bulk_create(payments)
+            DataVersion.bump('payments')
+
+
+TENANT_COLUMNS = {
+    'name': ['name', 'tenant', 'tenant name', 'full name'],
+    'phone': ['phone', 'phone number', 'mobile', 'msisdn'],
+    'apartment_number': ['apartment_number', 'apartment', 'apartment number', 'unit', 'house no', 'house number'],
+    'rent_amount': ['rent_amount', 'rent', 'rent amount', 'monthly rent'],
+    'due_date': ['due_date', 'due date', 'due day'],
+    'rent_status': ['rent_status', 'status', 'rent status'],
+    'amount_due': ['amount_due', 'amount due', 'balance', 'arrears'],
+}
+REQUIRED_TENANT_COLUMNS = ['name', 'phone', 'apartment_number', 'rent_amount']
+RENT_STATUSES = {value.lower(): value for value, _ in RENT_STATUS_CHOICES}
+
+
+class TenantImportReport:
+    """Per-row validation errors and totals for a tenant import"""
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.total_rows = 0
+        self.created = 0
+        self.invalid_rows = 0
+        self.errors = []
+
+    def add_error(self, line, field, message):
+        if len(self.errors) < MAX_REPORTED_ROWS:
+            self.errors.append({'line': line, 'field': field, 'message': message})
+
+
+class TenantImporter:
+    """
+    Onboard tenants from a CSV or XLSX sheet.
+
+    All rows are loaded and validated together column by column: phone
+    format, due day, amounts, and duplicate apartment numbers both within
+    the file and against existing tenants (one query). Valid rows are then
+    created with bulk_create inside a single transaction.
+    """
+
+    def __init__(self, dry_run=False, skip_invalid=False, batch_size=1000, property=None):
+        self.dry_run = dry_run
+        self.skip_invalid = skip_invalid
+        self.batch_size = batch_size
+        # Apartment numbers are unique per property; without one, across all tenants
+        self.property = property
+
+    @staticmethod
+    def _map_headers(headers):
+        headers = [str(h or '').strip().lower() for h in headers]
+        mapping = {}
+        for field, candidates in TENANT_COLUMNS.items():
+            for candidate in candidates:
+                if candidate in headers:
+                    mapping[field] = headers.index(candidate)
+                    break
+        missing = [field for field in REQUIRED_TENANT_COLUMNS if field not in mapping]
+        if missing:
+            raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+        return mapping
+
+    @staticmethod
+    def _rows_from_csv(stream):
+        reader = csv.reader(stream)
+        for row in reader:
+            yield reader.line_num, row
+
+    @staticmethod
+    def _rows_from_xlsx(fileobj):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("XLSX import requires openpyxl (pip install openpyxl), or save the sheet as CSV")
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+        try:
+            for line, row in enumerate(workbook.active.iter_rows(values_only=True), start=1):
+                yield line, ['' if cell is None else cell for cell in row]
+        finally:
+            workbook.close()
+
+    def _load(self, rows):
+        """Return columns as parallel lists: {field: [...]} plus line numbers"""
+        mapping = None
+        columns = {field: [] for field in TENANT_COLUMNS}
+        lines = []
+        for line, row in rows:
+            if mapping is None:
+                mapping = self._map_headers(row)
+                continue
+            if not any(str(cell).strip() for cell in row):
+                continue
+            lines.append(line)
+            for field in TENANT_COLUMNS:
+                index = mapping.get(field)
+                value = row[index] if index is not None and index < len(row) else ''
+                columns[field].append(str(value).strip() if value is not None else '')
+        if mapping is None:
+            raise ValueError("The file is empty")
+        return lines, columns
+
+    def _validate(self, lines, columns, report):
+        """Validate every column in one pass each; returns {row_index: [errors]}"""
+        errors = defaultdict(list)
+        cleaned = {field: [None] * len(lines) for field in TENANT_COLUMNS}
+
+        for i, name in enumerate(columns['name']):
+            if not name:
+                errors[i].append(('name', 'Name is required'))
+            elif len(name) > 200:
+                errors[i].append(('name', 'Name is longer than 200 characters'))
+            cleaned['name'][i] = name
+
+        for i, phone in enumerate(columns['phone']):
+            normalized = normalize_phone(phone)
+            if normalized:
+                cleaned['phone'][i] = normalized
+            else:
+                errors[i].append(('phone', f'Invalid phone number: {phone!r}'))
+
+        for field in ('rent_amount', 'amount_due'):
+            for i, value in enumerate(columns[field]):
+                if not value:
+                    if field == 'rent_amount':
+                        errors[i].append((field, 'Rent amount is required'))
+                    continue
+                try:
+                    amount = Decimal(value.replace(',', '')).quantize(Decimal('0.01'))
+                except InvalidOperation:
+                    amount = None
+                if amount is None or not amount.is_finite():
+                    errors[i].append((field, f'Invalid amount: {value!r}'))
+                    continue
+                if amount < 0 or (field == 'rent_amount' and amount == 0) or amount >= Decimal('1e8'):
+                    errors[i].append((field, f'Amount out of range: {value!r}'))
+                cleaned[field][i] = amount
+
+        for i, value in enumerate(columns['due_date']):
+            if not value:
+                cleaned['due_date'][i] = 1
+                continue
+            # Spreadsheets give '5' or '5.0'; '5.7', 'inf' and 'nan' are not days
+            try:
+                number = Decimal(value.strip())
+                day = int(number) if number.is_finite() and number == number.to_integral_value() else None
+            except (InvalidOperation, OverflowError):
+                day = None
+            if day is None or not 1 <= day <= 31:
+                errors[i].append(('due_date', f'Due date must be a day of the month (1-31): {value!r}'))
+            cleaned['due_date'][i] = day
+
+        for i, value in enumerate(columns['rent_status']):
+            status = RENT_STATUSES.get(value.lower(), None) if value else 'Unpaid'
+            if status is None:
+                errors[i].append(('rent_status', f'Unknown status: {value!r}'))
+            cleaned['rent_status'][i] = status
+
+        apartments = [apt.upper() for apt in columns['apartment_number']]
+        counts = Counter(apartments)
+        # One query for every apartment number already in use
+        occupied = Tenant.objects.filter(property=self.property) if self.property else Tenant.objects.all()
+        existing = {apt.strip().upper() for apt in occupied.values_list('apartment_number', flat=True)}
+        for i, apartment in enumerate(columns['apartment_number']):
+            key = apartments[i]
+            if not apartment:
+                errors[i].append(('apartment_number', 'Apartment number is required'))
+            elif len(apartment) > 50:
+                errors[i].append(('apartment_number', 'Apartment number is longer than 50 characters'))
+            elif key in existing:
+                errors[i].append(('apartment_number', f'Apartment {apartment} already has a tenant'))
+            elif counts[key] > 1:
+                errors[i].append(('apartment_number', f'Apartment {apartment} appears {counts[key]} times in the file'))
+            cleaned['apartment_number'][i] = apartment
+
+        for i, field_errors in sorted(errors.items()):
+            for field, message in field_errors:
+                report.add_error(lines[i], field, message)
+        report.invalid_rows = len(errors)
+        return cleaned, errors
+
+    def _assign_units(self, tenants):
+        """Create missing units for the property in bulk and attach each tenant to its unit"""
+        numbers = {tenant.apartment_number for tenant in tenants}
+        Unit.objects.bulk_create(
+            [Unit(property=self.property, number=number) for number in numbers],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        units = {
+            unit.number: unit
+            for unit in Unit.objects.filter(property=self.property, number__in=numbers)
+        }
+        for tenant in tenants:
+            tenant.unit = units[tenant.apartment_number]
+
+    def run(self, fileobj, filename=''):
+        """
+        Import tenants from an open file.
+
+        Args:
+            fileobj: Text stream for CSV, binary file for XLSX
+            filename (str): Used to detect XLSX by extension
+
+        Returns:
+            TenantImportReport
+        """
+        report = TenantImportReport(dry_run=self.dry_run)
+        if filename.lower().endswith(('.xlsx', '.xlsm')):
+            rows = self._rows_from_xlsx(fileobj)
+        else:
+            rows = self._rows_from_csv(fileobj)
+
+        lines, columns = self._load(rows)
+        report.total_rows = len(lines)
+        cleaned, errors = self._validate(lines, columns, report)
+
+        if errors and not self.skip_invalid:
+            return report
+
+        tenants = []
+        for i in range(len(lines)):
+            if i in errors:
+                continue
+            status = cleaned['rent_status'][i]
+            amount_due = cleaned['amount_due'][i]
+            if amount_due is None:
+                # New tenants owe the first month unless they are marked paid
+                amount_due = Decimal('0') if status == 'Paid' else cleaned['rent_amount'][i]
+            tenants.append(Tenant(
+                name=cleaned['name'][i],
+                phone=cleaned['phone'][i],
+                phone_e164=cleaned['phone'][i],
+                apartment_number=cleaned['apartment_number'][i],
+                rent_amount=cleaned['rent_amount'][i],
+                due_date=cleaned['due_date'][i],
+                rent_status=status,
+                amount_due=amount_due,
+                property=self.property,
+            ))
+
+        if not self.dry_run:
+            with transaction.atomic():
+                if self.property:
+                    self._assign_units(tenants)
+                Tenant.objects.bulk_create(tenants, batch_size=self.batch_size)
+                DataVersion.bump('tenants')
+        report.created = len(tenants)
+        return report
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from rental_app.retention_service import RetentionService, DEFAULT_POLICIES
+
+
+class Command(BaseCommand):
+    help = 'Roll old SMS logs and history rows into daily summaries and delete them (see RETENTION_POLICIES)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--table',
+            action='append',
+            choices=list(DEFAULT_POLICIES),
+            help='Only process this table (can be repeated; default: all)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Rows per transaction (default: 1000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the rows that would be rolled up or stripped'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        results = RetentionService.apply(
+            tables=options['table'],
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+        )
+
+        prefix = 'Would process' if options['dry_run'] else 'Processed'
+        for table, result in results.items():
+            message = f"{prefix} {table}: {result['rolled_up']} rows rolled up"
+            if table == 'sms_logs':
+                message += f", {result['stripped']} responses stripped"
+            self.stdout.write(self.style.SUCCESS(message + '.'))
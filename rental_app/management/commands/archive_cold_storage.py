@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rental_app.cold_storage import ColdStorageService, ColdStorageError, TABLES, months_ago
+
+
+class Command(BaseCommand):
+    help = 'Move archived tenants and payments older than N months from the database into cold storage segment files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=getattr(settings, 'COLD_STORAGE_MONTHS', 12),
+            help='Move rows archived more than this many months ago (default: COLD_STORAGE_MONTHS)'
+        )
+        parser.add_argument(
+            '--table',
+            action='append',
+            choices=list(TABLES),
+            help='Only process this table (can be repeated; default: all)'
+        )
+        parser.add_argument(
+            '--segment-rows',
+            type=int,
+            default=10000,
+            help='Rows per segment file and per delete transaction (default: 10000)'
+        )
+        parser.add_argument(
+            '--block-rows',
+            type=int,
+            default=256,
+            help='Rows per compressed block within a segment (default: 256)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the rows that would be moved'
+        )
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'COLD_STORAGE_DIR', None):
+            raise CommandError(
+                'COLD_STORAGE_DIR is not set. Point it at persistent, backed-up storage: rows are '
+                'deleted from the database once written there, and dyno disks are thrown away.'
+            )
+        if options['months'] < 0:
+            raise CommandError('--months must not be negative')
+        if options['segment_rows'] < 1 or options['block_rows'] < 1:
+            raise CommandError('--segment-rows and --block-rows must be at least 1')
+
+        before = months_ago(options['months'])
+        prefix = 'Would move' if options['dry_run'] else 'Moved'
+        for table in options['table'] or list(TABLES):
+            try:
+                moved = ColdStorageService.export(
+                    table,
+                    before,
+                    segment_rows=options['segment_rows'],
+                    block_rows=options['block_rows'],
+                    dry_run=options['dry_run'],
+                )
+            except ColdStorageError as e:
+                raise CommandError(f'{table}: {e}')
+            self.stdout.write(self.style.SUCCESS(
+                f"{prefix} {moved} archived {table} from before {before:%Y-%m-%d} to cold storage."
+            ))
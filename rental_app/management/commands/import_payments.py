@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rental_app.importers import PaymentStatementImporter, TenantIndex
+from rental_app.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Import payments from an M-Pesa statement or bank CSV export'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='Path to the CSV statement file')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Match and validate rows without writing anything'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows validated and inserted per batch (default: 1000)'
+        )
+        parser.add_argument(
+            '--encoding',
+            type=str,
+            default='utf-8-sig',
+            help='File encoding (default: utf-8-sig)'
+        )
+        parser.add_argument(
+            '--landlord',
+            type=str,
+            help="Username whose tenants the statement is matched against (default: all tenants)"
+        )
+
+    def handle(self, *args, **options):
+        tenant_index = None
+        if options['landlord']:
+            try:
+                landlord = get_user_model().objects.get_by_natural_key(options['landlord'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user named {options['landlord']!r}")
+            tenant_index = TenantIndex(Tenant.objects.for_user(landlord))
+
+        importer = PaymentStatementImporter(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            tenant_index=tenant_index
+        )
+
+        try:
+            with open(options['path'], newline='', encoding=options['encoding']) as stream:
+                report = importer.run(stream)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for row in report.unmatched:
+            self.stdout.write(
+                self.style.WARNING(f"Line {row['line']}: {row['reason']} {dict(row['row'])}")
+            )
+        for error in report.errors:
+            self.stdout.write(self.style.ERROR(f"Line {error['line']}: {error['message']}"))
+
+        prefix = 'Dry run: would import' if report.dry_run else 'Imported'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{prefix} {report.imported} payments (KSh {report.total_amount}) from '
+                f'{report.total_rows} rows. {report.duplicates} duplicates, '
+                f'{report.unmatched_count} unmatched, {report.skipped} skipped, '
+                f'{len(report.errors)} errors.'
+            )
+        )
@@ -0,0 +1,73 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from rental_app.importers import TenantImporter
+from rental_app.models import Property
+
+
+class Command(BaseCommand):
+    help = 'Onboard tenants in bulk from a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='Path to the .csv or .xlsx file')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate every row without creating tenants'
+        )
+        parser.add_argument(
+            '--skip-invalid',
+            action='store_true',
+            help='Create the valid rows even if some rows have errors'
+        )
+        parser.add_argument(
+            '--property',
+            type=str,
+            help='ID of the property the tenants live in'
+        )
+
+    def handle(self, *args, **options):
+        building = None
+        if options['property']:
+            try:
+                building = Property.objects.get(pk=options['property'])
+            except (Property.DoesNotExist, ValidationError):
+                raise CommandError(f"Property {options['property']} does not exist")
+
+        importer = TenantImporter(
+            dry_run=options['dry_run'],
+            skip_invalid=options['skip_invalid'],
+            property=building
+        )
+        path = options['path']
+
+        try:
+            if path.lower().endswith(('.xlsx', '.xlsm')):
+                with open(path, 'rb') as fileobj:
+                    report = importer.run(fileobj, filename=path)
+            else:
+                with open(path, newline='', encoding='utf-8-sig') as fileobj:
+                    report = importer.run(fileobj, filename=path)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for error in report.errors:
+            self.stdout.write(
+                self.style.ERROR(f"Line {error['line']} ({error['field']}): {error['message']}")
+            )
+
+        if report.invalid_rows and not options['skip_invalid']:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'{report.invalid_rows} of {report.total_rows} rows are invalid. '
+                    'No tenants were created; fix the file or use --skip-invalid.'
+                )
+            )
+            return
+
+        prefix = 'Dry run: would create' if report.dry_run else 'Created'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{prefix} {report.created} tenants from {report.total_rows} rows '
+                f'({report.invalid_rows} invalid rows skipped).'
+            )
+        )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from rental_app.delivery_report_service import DeliveryReportService
+
+
+class Command(BaseCommand):
+    help = 'Apply staged SMS delivery reports that have not been flushed by the webhook yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Reports per transaction (default: DLR_BATCH_SIZE)'
+        )
+
+    def handle(self, *args, **options):
+        applied = DeliveryReportService.process_all(options['batch_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Applied {applied} delivery reports.")
+        )
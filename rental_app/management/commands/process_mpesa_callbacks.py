@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from rental_app.mpesa_service import MpesaService
+
+
+class Command(BaseCommand):
+    help = 'Apply staged M-Pesa callbacks that have not been flushed by the webhook yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Callbacks per transaction (default: MPESA_BATCH_SIZE)'
+        )
+
+    def handle(self, *args, **options):
+        totals = MpesaService.process_all(options['batch_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed M-Pesa callbacks: {totals['matched']} matched, "
+                f"{totals['unmatched']} unmatched."
+            )
+        )
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rental_app.sms_retry_service import SMSRetryService
+from rental_app.delivery_report_service import DeliveryReportService
+from rental_app.mpesa_service import MpesaService
+
+
+class Command(BaseCommand):
+    help = ('Resend SMS messages whose transient failure is due for a retry, and apply staged delivery '
+            'reports and M-Pesa callbacks')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=100,
+            help='Maximum messages to resend per pass (default: 100)'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, checking for due retries every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=10,
+            help='Seconds to sleep between passes with --loop when nothing was due (default: 10)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            totals = SMSRetryService.process_due(options['limit'])
+            handled = sum(totals.values())
+            # Reports that arrived too slowly to fill a batch in the webhook
+            reports = DeliveryReportService.process_all()
+            # Callbacks too few to fill a batch are otherwise only applied when the next one arrives
+            mpesa = MpesaService.process_all()
+            payments = mpesa['matched'] + mpesa['unmatched']
+            if handled or reports or payments or not options['loop']:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Retried {handled} SMS: {totals['success']} sent, {totals['retrying']} rescheduled, "
+                        f"{totals['dead']} dead, {totals['failure']} failed. "
+                        f"Applied {reports} delivery reports and {payments} M-Pesa callbacks."
+                    )
+                )
+            if not options['loop']:
+                break
+            # A full pass means more may be due already
+            if handled < options['limit']:
+                time.sleep(options['interval'])
@@ -0,0 +1,114 @@
+import random
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from rental_app.models import Property, Unit, Tenant, Payment, SMSLog
+from rental_app.sms_statistics_service import SMSStatisticsService, log_day
+from rental_app.data_version import DataVersion
+
+NAME_PREFIX = 'Load Test Tenant'
+
+
+class Command(BaseCommand):
+    help = 'Seed tenants, payments and SMS logs for load testing (see load_test.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenants', type=int, default=500, help='Tenants to create (default: 500)')
+        parser.add_argument('--payments', type=int, default=12, help='Payments per tenant, one per month (default: 12)')
+        parser.add_argument('--sms', type=int, default=4, help='SMS logs per tenant (default: 4)')
+        parser.add_argument('--username', default='loadtest', help='Login for load_test.py (default: loadtest)')
+        parser.add_argument('--password', default='loadtest123', help='Password (default: loadtest123)')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+        parser.add_argument('--force', action='store_true', help='Allow seeding when DEBUG is off')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError('DEBUG is off - this looks like a production database. Use --force to seed anyway.')
+        if min(options['tenants'], options['payments'], options['sms']) < 0:
+            raise CommandError('Counts must not be negative')
+
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            user = User.objects.create_user(options['username'], password=options['password'], is_staff=True)
+            self.stdout.write(f"Created user {options['username']}")
+        building = Property.objects.get_or_create(landlord=user, name='Load Test Towers')[0]
+
+        offset = Tenant.objects.filter(name__startswith=NAME_PREFIX).count()
+        tenants = []
+        units = []
+        for i in range(offset, offset + options['tenants']):
+            rent = Decimal(rng.choice([8000, 12000, 15000, 18000, 25000]))
+            status = rng.choice(['Paid', 'Paid', 'Partial', 'Unpaid', 'Overdue'])
+            phone = f"+2547{i:08d}"
+            unit = Unit(property=building, number=f"LT-{i}")
+            units.append(unit)
+            tenants.append(Tenant(
+                property=building,
+                unit=unit,
+                name=f"{NAME_PREFIX} {i}",
+                phone=phone,
+                phone_e164=phone,
+                apartment_number=f"LT-{i}",
+                rent_amount=rent,
+                rent_status=status,
+                amount_due=Decimal(0) if status == 'Paid' else rent,
+                due_date=rng.randint(1, 28),
+            ))
+
+        with transaction.atomic():
+            Unit.objects.bulk_create(units, batch_size=500)
+            Tenant.objects.bulk_create(tenants, batch_size=500)
+
+            # auto_now_add fields ignore explicit values, so spread dates with one UPDATE per month
+            payments_by_month = defaultdict(list)
+            payments = []
+            for tenant in tenants:
+                for month in range(options['payments']):
+                    payment = Payment(
+                        tenant=tenant,
+                        amount=tenant.rent_amount,
+                        payment_type='Full',
+                        status='Paid',
+                        notes='Seeded for load testing',
+                    )
+                    payments.append(payment)
+                    payments_by_month[month].append(payment.pk)
+            Payment.objects.bulk_create(payments, batch_size=500)
+            for month, ids in payments_by_month.items():
+                Payment.objects.filter(pk__in=ids).update(date=now - timedelta(days=30 * month))
+
+            logs_by_day = defaultdict(list)
+            logs = []
+            counts = defaultdict(int)
+            for tenant in tenants:
+                for _ in range(options['sms']):
+                    days_ago = rng.randint(0, 89)
+                    status = 'success' if rng.random() < 0.9 else 'failure'
+                    log = SMSLog(
+                        tenant=tenant,
+                        message=f"Dear {tenant.name}, your rent of KSh {tenant.rent_amount} is due.",
+                        status=status,
+                        provider='africastalking',
+                    )
+                    logs.append(log)
+                    logs_by_day[days_ago].append(log.pk)
+                    counts[(log_day(now - timedelta(days=days_ago)), 'africastalking', status)] += 1
+            SMSLog.objects.bulk_create(logs, batch_size=500)
+            for days_ago, ids in logs_by_day.items():
+                SMSLog.objects.filter(pk__in=ids).update(sent_at=now - timedelta(days=days_ago))
+            SMSStatisticsService.apply_deltas(counts)
+            DataVersion.bump('tenants', 'payments')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(tenants)} tenants, {len(payments)} payments and {len(logs)} SMS logs."
+        ))
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
+from rental_app.models import Property
 
 
 class Command(BaseCommand):
@@ -9,29 +10,38 @@ class Command(BaseCommand):
         parser.add_argument('--username', type=str, help='Username for the landlord')
         parser.add_argument('--email', type=str, help='Email for the landlord')
         parser.add_argument('--password', type=str, help='Password for the landlord')
+        parser.add_argument('--property', type=str, help='Create a property with this name for the landlord')
+        parser.add_argument('--no-superuser', action='store_true', help='Create a landlord who only sees their own properties')
 
     def handle(self, *args, **options):
         username = options['username'] or 'landlord'
         email = options['email'] or 'landlord@example.com'
         password = options['password'] or 'landlord123'
 
-        if User.objects.filter(username=username).exists():
+        user = User.objects.filter(username=username).first()
+        if user:
             self.stdout.write(
                 self.style.WARNING(f'User {username} already exists')
             )
-            return
+        else:
+            user = User.objects.create_user(
+                username=username,
+                email=email,
+                password=password,
+                is_staff=True,
+                is_superuser=not options['no_superuser']
+            )
 
-        user = User.objects.create_user(
-            username=username,
-            email=email,
-            password=password,
-            is_staff=True,
-            is_superuser=True
-        )
+            self.stdout.write(
+                self.style.SUCCESS(f'Successfully created landlord user: {username}')
+            )
+            self.stdout.write(f'Username: {username}')
+            self.stdout.write(f'Email: {email}')
+            self.stdout.write(f'Password: {password}')
 
-        self.stdout.write(
-            self.style.SUCCESS(f'Successfully created landlord user: {username}')
-        )
-        self.stdout.write(f'Username: {username}')
-        self.stdout.write(f'Email: {email}')
-        self.stdout.write(f'Password: {password}')
+        if options['property']:
+            building, created = Property.objects.get_or_create(landlord=user, name=options['property'])
+            if created:
+                self.stdout.write(self.style.SUCCESS(f'Created property {building.name} ({building.pk})'))
+            else:
+                self.stdout.write(self.style.WARNING(f'Property {building.name} already exists ({building.pk})'))
@@ -0,0 +1,220 @@
+"""
+Message template registry for Rental Management System
+
+Templates are parsed once into literal/field parts, so rendering a batch of
+tenants is a string join per tenant. Each rendered message can report how
+many billable SMS segments it needs (GSM-7 or UCS-2).
+"""
+
+import math
+from string import Formatter
+
+# GSM 03.38 basic character set (one septet each)
+GSM7_BASIC = set(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+# Extension table characters cost an escape septet plus the character
+GSM7_EXTENDED = set("^{}\\[~]|€\f")
+
+GSM7_SINGLE_SEGMENT = 160
+GSM7_MULTI_SEGMENT = 153
+UCS2_SINGLE_SEGMENT = 70
+UCS2_MULTI_SEGMENT = 67
+
+
+def segment_info(text):
+    """
+    Work out the encoding and number of SMS segments for a message.
+
+    Returns:
+        dict: encoding ('GSM-7' or 'UCS-2'), length (septets or UTF-16 units),
+              segments, and remaining characters in the last segment
+    """
+    septets = 0
+    for ch in text:
+        if ch in GSM7_BASIC:
+            septets += 1
+        elif ch in GSM7_EXTENDED:
+            septets += 2
+        else:
+            break
+    else:
+        single, multi, encoding, length = GSM7_SINGLE_SEGMENT, GSM7_MULTI_SEGMENT, 'GSM-7', septets
+        return _segments(encoding, length, single, multi)
+
+    # Any non-GSM character switches the whole message to UCS-2
+    length = len(text.encode('utf-16-le')) // 2
+    return _segments('UCS-2', length, UCS2_SINGLE_SEGMENT, UCS2_MULTI_SEGMENT)
+
+
+def _segments(encoding, length, single, multi):
+    if length <= single:
+        segments = 1 if length else 0
+        capacity = single
+    else:
+        segments = math.ceil(length / multi)
+        capacity = segments * multi
+    return {
+        'encoding': encoding,
+        'length': length,
+        'segments': segments,
+        'remaining': capacity - length,
+    }
+
+
+def ordinal(day):
+    """1 -> '1st', 22 -> '22nd', 13 -> '13th'"""
+    day = int(day)
+    if 10 <= day % 100 <= 20:
+        suffix = 'th'
+    else:
+        suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10, 'th')
+    return f"{day}{suffix}"
+
+
+def tenant_context(tenant, **extra):
+    """Template variables for a tenant"""
+    context = {
+        'name': tenant.name,
+        'apartment_number': tenant.apartment_number,
+        'rent_amount': tenant.rent_amount,
+        'amount_due': tenant.amount_due,
+        'due_date': tenant.due_date,
+        'due_day': ordinal(tenant.due_date),
+    }
+    context.update(extra)
+    return context
+
+
+class MessageTemplate:
+    """A message text with {placeholders}, compiled once"""
+
+    def __init__(self, name, text, description=''):
+        self.name = name
+        self.text = text
+        self.description = description
+        # [(literal, field_name or None, format_spec)]
+        self.parts = [
+            (literal, field, spec or '')
+            for literal, field, spec, _ in Formatter().parse(text)
+        ]
+        self.fields = {field for _, field, _ in self.parts if field}
+
+    def render(self, context):
+        """Render with a dict of values"""
+        out = []
+        for literal, field, spec in self.parts:
+            out.append(literal)
+            if field is not None:
+                out.append(format(context[field], spec))
+        return ''.join(out)
+
+    def render_for_tenant(self, tenant, **extra):
+        return self.render(tenant_context(tenant, **extra))
+
+    def render_many(self, tenants, **extra):
+        """Render for a batch of tenants: yields (tenant, message)"""
+        for tenant in tenants:
+            yield tenant, self.render(tenant_context(tenant, **extra))
+
+    def segment_report(self, tenants, **extra):
+        """
+        Segment statistics for sending this template to a batch of tenants.
+
+        Returns:
+            dict: messages, total_segments, max_segments, multi_segment_count,
+                  encoding, longest (sample of the longest message)
+        """
+        report = {
+            'template': self.name,
+            'messages': 0,
+            'total_segments': 0,
+            'max_segments': 0,
+            'multi_segment_count': 0,
+            'encoding': 'GSM-7',
+            'longest': '',
+            'longest_length': 0,
+        }
+        for _, message in self.render_many(tenants, **extra):
+            info = segment_info(message)
+            report['messages'] += 1
+            report['total_segments'] += info['segments']
+            if info['segments'] > 1:
+                report['multi_segment_count'] += 1
+            if info['encoding'] == 'UCS-2':
+                report['encoding'] = 'UCS-2'
+            if info['length'] > report['longest_length']:
+                report['longest'] = message
+                report['longest_length'] = info['length']
+            report['max_segments'] = max(report['max_segments'], info['segments'])
+        return report
+
+
+class TemplateRegistry:
+    """Named message templates shared by every SMS and WhatsApp service"""
+
+    def __init__(self):
+        self._templates = {}
+
+    def register(self, name, text, description=''):
+        self._templates[name] = MessageTemplate(name, text, description)
+        return self._templates[name]
+
+    def get(self, name):
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise KeyError(f"Unknown message template: {name}")
+
+    def render(self, name, tenant, **extra):
+        return self.get(name).render_for_tenant(tenant, **extra)
+
+    def names(self):
+        return sorted(self._templates)
+
+
+templates = TemplateRegistry()
+
+templates.register(
+    'rent_reminder',
+    # Kept short so typical names and amounts fit one 160-character segment
+    "Hello {name}, a friendly reminder that your rent for apartment {apartment_number} "
+    "(KSh {rent_amount}) is due on the {due_day}. Please pay as soon as possible. Thank you!",
+    'General rent due reminder'
+)
+templates.register(
+    'rent_due',
+    "Hello {name}, this is a friendly reminder that your rent payment of KSh {rent_amount:,.2f} is due. "
+    "Please make payment to avoid any inconvenience.",
+    'Short rent due reminder'
+)
+templates.register(
+    'rent_overdue',
+    "Hello {name}, your rent payment of KSh {rent_amount:,.2f} is overdue. "
+    "Please make payment as soon as possible to avoid any inconvenience.",
+    'Overdue rent reminder'
+)
+templates.register(
+    'rent_days_overdue',
+    "Hello {name}, your rent payment of KSh {rent_amount:,.2f} is {days_overdue} days overdue. "
+    "Please make payment immediately.",
+    'Overdue reminder with number of days'
+)
+templates.register(
+    'payment_reminder',
+    "Hello {name}, you have an outstanding balance of KSh {amount_due} for apartment {apartment_number}. "
+    "Please make your payment as soon as possible. Thank you!",
+    'Specific amount due reminder'
+)
+templates.register(
+    'rent_confirmation',
+    "Hello {name}, we have received your rent payment for apartment {apartment_number}. "
+    "Thank you for your timely payment!",
+    'Rent received confirmation'
+)
+templates.register(
+    'payment_received',
+    "Hello {name}, your rent payment of KSh {payment_amount:,.2f} has been received. Thank you for your payment!",
+    'Payment received confirmation with amount'
+)
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental_app', '0004_archivedpayment_archivedtenant_paymenthistory_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='transaction_id',
+            field=models.CharField(blank=True, help_text='M-Pesa receipt or bank reference', max_length=30, null=True, unique=True),
+        ),
+        migrations.CreateModel(
+            name='MpesaCallback',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('trans_id', models.CharField(help_text='M-Pesa transaction ID / receipt number', max_length=30, unique=True)),
+                ('transaction_type', models.CharField(blank=True, max_length=30)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('msisdn', models.CharField(blank=True, help_text='Payer phone number as sent by Safaricom', max_length=64)),
+                ('bill_ref_number', models.CharField(blank=True, help_text='Account reference entered by the payer', max_length=50)),
+                ('first_name', models.CharField(blank=True, max_length=100)),
+                ('trans_time', models.DateTimeField(blank=True, null=True)),
+                ('payload', models.JSONField(help_text='Raw callback payload')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('matched', 'Matched'), ('unmatched', 'Unmatched'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('payment', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mpesa_callback', to='rental_app.payment')),
+                ('tenant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mpesa_callbacks', to='rental_app.tenant')),
+            ],
+            options={
+                'verbose_name': 'M-Pesa Callback',
+                'verbose_name_plural': 'M-Pesa Callbacks',
+                'ordering': ['-received_at'],
+                'indexes': [models.Index(fields=['status', 'received_at'], name='rental_app__status_10daab_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:38
+
+from django.db import migrations, models
+
+
+def backfill_phone_e164(apps, schema_editor):
+    """Normalize existing phone numbers in chunks with bulk_update"""
+    from rental_app.phone import normalize_phone
+
+    Tenant = apps.get_model('rental_app', 'Tenant')
+    batch = []
+    for tenant in Tenant.objects.only('id', 'phone').iterator(chunk_size=2000):
+        tenant.phone_e164 = normalize_phone(tenant.phone)
+        batch.append(tenant)
+        if len(batch) >= 2000:
+            Tenant.objects.bulk_update(batch, ['phone_e164'])
+            batch = []
+    if batch:
+        Tenant.objects.bulk_update(batch, ['phone_e164'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental_app', '0005_mpesa_callbacks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenant',
+            name='phone_e164',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Normalized phone number used for sending and payment matching', max_length=16),
+        ),
+        migrations.RunPython(backfill_phone_e164, migrations.RunPython.noop),
+    ]
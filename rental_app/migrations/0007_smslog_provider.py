@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental_app', '0006_tenant_phone_e164'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='smslog',
+            name='provider',
+            field=models.CharField(blank=True, help_text='Provider that handled the final attempt', max_length=20),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental_app', '0007_smslog_provider'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='provider:sender_id', max_length=100, unique=True)),
+                ('tokens', models.FloatField(help_text='Tokens left after the last reservation (negative while callers wait)')),
+                ('last_refill', models.FloatField(help_text='Unix time the tokens were last refilled')),
+                ('version', models.PositiveIntegerField(default=0, help_text='Compare-and-swap counter')),
+            ],
+        ),
+    ]
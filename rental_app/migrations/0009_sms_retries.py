@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental_app', '0008_rate_limit_bucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='smslog',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Number of times this message was sent'),
+        ),
+        migrations.AddField(
+            model_name='smslog',
+            name='next_retry_at',
+            field=models.DateTimeField(blank=True, help_text='When a retrying message is sent again', null=True),
+        ),
+        migrations.AlterField(
+            model_name='smslog',
+            name='status',
+            field=models.CharField(choices=[('success', 'Success'), ('failure', 'Failure'), ('retrying', 'Retrying'), ('dead', 'Dead Letter')], max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='smslog',
+            index=models.Index(fields=['status', 'next_retry_at'], name='rental_app__status_e10a6c_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental_app', '0009_sms_retries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryReport',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('provider', models.CharField(max_length=20)),
+                ('provider_message_id', models.CharField(max_length=100)),
+                ('status', models.CharField(help_text='Status as sent by the provider', max_length=30)),
+                ('failure_reason', models.CharField(blank=True, max_length=50)),
+                ('phone', models.CharField(blank=True, max_length=20)),
+                ('payload', models.JSONField(help_text='Raw report fields')),
+                ('received_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['received_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='smslog',
+            name='delivery_status',
+            field=models.CharField(blank=True, choices=[('sent', 'Sent to Network'), ('delivered', 'Delivered'), ('failed', 'Not Delivered')], help_text="Handset delivery from the provider's delivery report", max_length=10),
+        ),
+        migrations.AddField(
+            model_name='smslog',
+            name='delivery_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='smslog',
+            name='failure_reason',
+            field=models.CharField(blank=True, help_text='Delivery failure reason reported by the provider', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='smslog',
+            name='provider_message_id',
+            field=models.CharField(blank=True, db_index=True, help_text='Message ID assigned by the provider', max_length=100),
+        ),
+    ]
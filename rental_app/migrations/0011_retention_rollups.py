@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental_app', '0010_sms_delivery_reports'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoryDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('tenant', 'Tenant History'), ('payment', 'Payment History')], max_length=10)),
+                ('day', models.DateField()),
+                ('tenant_name', models.CharField(max_length=100)),
+                ('apartment_number', models.CharField(max_length=20)),
+                ('action', models.CharField(max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, help_text='Sum of payment amounts (payment history only)', max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'History Daily Summary',
+                'verbose_name_plural': 'History Daily Summaries',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['source', 'day'], name='rental_app__source_16b185_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SMSLogDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('success', 'Success'), ('failure', 'Failure'), ('retrying', 'Retrying'), ('dead', 'Dead Letter')], max_length=10)),
+                ('delivery_status', models.CharField(blank=True, max_length=10)),
+                ('provider', models.CharField(blank=True, max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('tenant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sms_summaries', to='rental_app.tenant')),
+            ],
+            options={
+                'verbose_name': 'SMS Daily Summary',
+                'verbose_name_plural': 'SMS Daily Summaries',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['day'], name='rental_app__day_f52ced_idx'), models.Index(fields=['tenant', 'day'], name='rental_app__tenant__cd0330_idx')],
+            },
+        ),
+    ]
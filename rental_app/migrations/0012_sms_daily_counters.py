@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:51
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_counters(apps, schema_editor):
+    """Seed the counters from existing logs and retention summaries"""
+    SMSLog = apps.get_model('rental_app', 'SMSLog')
+    SMSLogDailySummary = apps.get_model('rental_app', 'SMSLogDailySummary')
+    SMSDailyCounter = apps.get_model('rental_app', 'SMSDailyCounter')
+    delivery_statuses = {'delivered': 'delivered', 'failed': 'undelivered'}
+
+    counts = defaultdict(int)
+    logs = SMSLog.objects.annotate(day=TruncDate('sent_at')).order_by()
+    for row in logs.values('day', 'provider', 'status').annotate(n=Count('id')):
+        counts[(row['day'], row['provider'], row['status'])] += row['n']
+    for row in logs.filter(delivery_status__in=list(delivery_statuses)).values('day', 'provider', 'delivery_status').annotate(n=Count('id')):
+        counts[(row['day'], row['provider'], delivery_statuses[row['delivery_status']])] += row['n']
+
+    summaries = SMSLogDailySummary.objects.order_by()
+    for row in summaries.values('day', 'provider', 'status').annotate(n=Sum('count')):
+        counts[(row['day'], row['provider'], row['status'])] += row['n']
+    for row in summaries.filter(delivery_status__in=list(delivery_statuses)).values('day', 'provider', 'delivery_status').annotate(n=Sum('count')):
+        counts[(row['day'], row['provider'], delivery_statuses[row['delivery_status']])] += row['n']
+
+    SMSDailyCounter.objects.bulk_create(
+        [SMSDailyCounter(day=day, provider=provider, status=status, count=n) for (day, provider, status), n in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental_app', '0011_retention_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SMSDailyCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('provider', models.CharField(blank=True, max_length=20)),
+                ('status', models.CharField(max_length=12)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'SMS Daily Counter',
+                'verbose_name_plural': 'SMS Daily Counters',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='smsdailycounter',
+            constraint=models.UniqueConstraint(fields=('day', 'provider', 'status'), name='unique_sms_daily_counter'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+def assign_existing_tenants(apps, schema_editor):
+    """
+    Put existing tenants in one property owned by the first superuser (else
+    the earliest user), one unit per apartment. A tenant without a property
+    is outside every landlord's scope, so none may be left behind.
+    """
+    Tenant = apps.get_model('rental_app', 'Tenant')
+    Property = apps.get_model('rental_app', 'Property')
+    Unit = apps.get_model('rental_app', 'Unit')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    if not Tenant.objects.exists():
+        return
+    users = User.objects.order_by('date_joined', 'pk')
+    landlord = users.filter(is_superuser=True).first() or users.first()
+    if landlord is None:
+        raise RuntimeError(
+            "Existing tenants need a landlord but there are no users. Run "
+            "'python manage.py migrate auth' and 'python manage.py createsuperuser', "
+            "then migrate again."
+        )
+
+    building = Property.objects.create(landlord=landlord, name='Main Property')
+    units = {}
+    for tenant in Tenant.objects.filter(property__isnull=True).only('pk', 'apartment_number').iterator():
+        # Blank numbers get no unit, as in Tenant.resolve_unit
+        number = (tenant.apartment_number or '').strip()
+        if number and number not in units:
+            units[number] = Unit.objects.create(property=building, number=number)
+        Tenant.objects.filter(pk=tenant.pk).update(property=building, unit=units.get(number))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('rental_app', '0012_sms_daily_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Property',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('address', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Properties',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Unit',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('number', models.CharField(max_length=50)),
+            ],
+            options={
+                'ordering': ['property', 'number'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['tenant', '-date'], name='payment_tenant_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='property',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='units', to='rental_app.property'),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='landlord',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='properties', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='tenant',
+            name='property',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='tenants', to='rental_app.property'),
+        ),
+        migrations.AddField(
+            model_name='tenant',
+            name='unit',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Set from the property and apartment number', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tenants', to='rental_app.unit'),
+        ),
+        migrations.AddIndex(
+            model_name='tenant',
+            index=models.Index(fields=['property', 'rent_status'], name='tenant_property_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tenant',
+            index=models.Index(fields=['property', '-created_at'], name='tenant_property_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='unit',
+            constraint=models.UniqueConstraint(fields=('property', 'number'), name='unique_unit_number_per_property'),
+        ),
+        migrations.AddConstraint(
+            model_name='property',
+            constraint=models.UniqueConstraint(fields=('landlord', 'name'), name='unique_property_name_per_landlord'),
+        ),
+        migrations.RunPython(assign_existing_tenants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """pg_trgm GIN indexes on PostgreSQL, an FTS5 trigram table with triggers on SQLite"""
+    from rental_app.search_service import TenantSearchService
+
+    TenantSearchService.ensure_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from rental_app.search_service import TenantSearchService
+
+    TenantSearchService.drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental_app', '0013_properties_units'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental_app', '0016_payment_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['tenant', 'updated_at'], name='payment_tenant_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tenant',
+            index=models.Index(fields=['property', 'updated_at'], name='tenant_property_updated_idx'),
+        ),
+    ]
@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 from datetime import timedelta
 import uuid
+from .phone import normalize_phone
 
 # Global constants for choices
 RENT_STATUS_CHOICES = [
@@ -23,11 +25,67 @@ PAYMENT_TYPE_CHOICES = [
 ]
 
 
+class PropertyQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """Properties the user manages (all of them for superusers)"""
+        if user.is_superuser:
+            return self
+        return self.filter(landlord=user)
+
+
+class Property(models.Model):
+    """A building managed for one landlord"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    landlord = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='properties')
+    name = models.CharField(max_length=200)
+    address = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = PropertyQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = "Properties"
+        constraints = [
+            models.UniqueConstraint(fields=['landlord', 'name'], name='unique_property_name_per_landlord'),
+        ]
+    
+    def __str__(self):
+        return self.name
+
+
+class Unit(models.Model):
+    """A rentable unit (apartment, shop, room) in a property"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='units')
+    number = models.CharField(max_length=50)
+    
+    class Meta:
+        ordering = ['property', 'number']
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'number'], name='unique_unit_number_per_property'),
+        ]
+    
+    def __str__(self):
+        return f"{self.property.name} - {self.number}"
+
+
+class TenantQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """Tenants in the user's properties (all tenants for superusers)"""
+        if user.is_superuser:
+            return self
+        return self.filter(property__landlord=user)
+
+
 class Tenant(models.Model):
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    property = models.ForeignKey(Property, on_delete=models.PROTECT, null=True, blank=True, related_name='tenants')
+    unit = models.ForeignKey(Unit, on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='tenants', help_text="Set from the property and apartment number")
     name = models.CharField(max_length=200)
     phone = models.CharField(max_length=20)  # International format like +2547...
+    phone_e164 = models.CharField(max_length=16, blank=True, db_index=True, editable=False, help_text="Normalized phone number used for sending and payment matching")
     apartment_number = models.CharField(max_length=50)
     rent_amount = models.DecimalField(max_digits=10, decimal_places=2)
     rent_status = models.CharField(max_length=10, choices=RENT_STATUS_CHOICES, default='Unpaid')
@@ -37,12 +95,45 @@ class Tenant(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TenantQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Per-landlord pages filter by property first
+            models.Index(fields=['property', 'rent_status'], name='tenant_property_status_idx'),
+            models.Index(fields=['property', '-created_at'], name='tenant_property_created_idx'),
+            # Conditional GET fingerprints: COUNT and MAX(updated_at) per landlord
+            models.Index(fields=['property', 'updated_at'], name='tenant_property_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - Apt {self.apartment_number}"
     
+    def save(self, *args, **kwargs):
+        """Keep the normalized phone column and the unit in sync"""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'phone' in update_fields:
+            self.phone_e164 = normalize_phone(self.phone)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'phone_e164'}
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'property', 'apartment_number'} & set(update_fields):
+            self.unit = self.resolve_unit()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'unit'}
+        super().save(*args, **kwargs)
+    
+    def resolve_unit(self):
+        """The unit for this tenant's property and apartment number, created if new"""
+        number = (self.apartment_number or '').strip()
+        if not self.property_id or not number:
+            return None
+        unit = self.unit if self.unit_id else None
+        if unit is not None and unit.property_id == self.property_id and unit.number == number:
+            return unit
+        return Unit.objects.get_or_create(property_id=self.property_id, number=number)[0]
+    
     def get_next_due_date(self):
         """Get the next due date for this tenant"""
         now = timezone.now()
@@ -75,27 +166,33 @@ class Tenant(models.Model):
         next_due = self.get_next_due_date()
         return timezone.now().date() > next_due.date()
     
-    def update_status(self):
-        """Update the tenant's payment status based on amount due and due date"""
+    def compute_status(self):
+        """Work out the payment status from amount due and due date without saving"""
+        status = self.rent_status
         if self.amount_due <= 0:
-            self.rent_status = 'Paid'
+            status = 'Paid'
         elif self.amount_due >= self.rent_amount:
-            self.rent_status = 'Unpaid'
+            status = 'Unpaid'
         elif self.amount_due > 0:
-            self.rent_status = 'Partial'
+            status = 'Partial'
         
         # Check if overdue
-        if self.is_overdue() and self.rent_status != 'Paid':
-            self.rent_status = 'Overdue'
+        if status != 'Paid' and timezone.now().date() > self.get_next_due_date().date():
+            status = 'Overdue'
         
+        return status
+    
+    def update_status(self):
+        """Update the tenant's payment status based on amount due and due date"""
+        self.rent_status = self.compute_status()
         self.save()
     
     def add_payment(self, amount):
-        """Add a payment and update amount due"""
+        """Add a payment and update amount due atomically"""
+        from .payment_service import PaymentService
+        
         if amount > 0:
-            self.amount_due = max(0, self.amount_due - amount)
-            self.last_payment_date = timezone.now()
-            self.update_status()
+            PaymentService.apply_payment(self, amount)
     
     def reset_for_new_month(self):
         """Reset tenant for new month - add full rent to amount due"""
@@ -104,10 +201,9 @@ class Tenant(models.Model):
             self.rent_status = 'Unpaid'
             self.save()
     
-    def delete(self, *args, **kwargs):
-        """Override delete to archive tenant before deletion"""
-        # Archive tenant before deletion
-        ArchivedTenant.objects.create(
+    def archive_records(self):
+        """Unsaved ArchivedTenant and TenantHistory rows recording this tenant's deletion"""
+        archived = ArchivedTenant(
             original_id=self.id,
             name=self.name,
             phone=self.phone,
@@ -122,19 +218,32 @@ class Tenant(models.Model):
             archived_by='System',
             archive_reason='Tenant deleted'
         )
-        
-        # Log the deletion
-        TenantHistory.objects.create(
+        history = TenantHistory(
             tenant_name=self.name,
             apartment_number=self.apartment_number,
             action='deleted',
             description=f'Tenant {self.name} was deleted from apartment {self.apartment_number}',
             changed_by='System'
         )
+        return archived, history
+    
+    def delete(self, *args, **kwargs):
+        """Override delete to archive tenant before deletion"""
+        # Archive and log the tenant before deletion
+        for record in self.archive_records():
+            record.save()
         
         super().delete(*args, **kwargs)
 
 
+class PaymentQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """Payments by tenants in the user's properties (all payments for superusers)"""
+        if user.is_superuser:
+            return self
+        return self.filter(tenant__property__landlord=user)
+
+
 class Payment(models.Model):
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -144,17 +253,27 @@ class Payment(models.Model):
     date = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=10, choices=PAYMENT_STATUS_CHOICES, default='Paid')
     notes = models.TextField(blank=True, help_text="Optional notes about this payment")
+    transaction_id = models.CharField(max_length=30, unique=True, null=True, blank=True, help_text="M-Pesa receipt or bank reference")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = PaymentQuerySet.as_manager()
     
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['tenant', '-date'], name='payment_tenant_date_idx'),
+            # API cursor pagination across all tenants
+            models.Index(fields=['-date', '-id'], name='payment_date_idx'),
+            # Conditional GET fingerprints: COUNT and MAX(updated_at) per tenant set
+            models.Index(fields=['tenant', 'updated_at'], name='payment_tenant_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.tenant.name} - KSh {self.amount} - {self.status}"
     
-    def delete(self, *args, **kwargs):
-        """Override delete to archive payment before deletion"""
-        # Archive payment before deletion
-        ArchivedPayment.objects.create(
+    def archive_records(self):
+        """Unsaved ArchivedPayment and PaymentHistory rows recording this payment's deletion"""
+        archived = ArchivedPayment(
             original_id=self.id,
             tenant_name=self.tenant.name,
             tenant_apartment=self.tenant.apartment_number,
@@ -167,9 +286,7 @@ class Payment(models.Model):
             archived_by='System',
             archive_reason='Payment deleted'
         )
-        
-        # Log the deletion
-        PaymentHistory.objects.create(
+        history = PaymentHistory(
             tenant_name=self.tenant.name,
             apartment_number=self.tenant.apartment_number,
             payment_amount=self.amount,
@@ -177,30 +294,202 @@ class Payment(models.Model):
             description=f'Payment of KSh {self.amount} was deleted for {self.tenant.name}',
             changed_by='System'
         )
+        return archived, history
+    
+    def delete(self, *args, **kwargs):
+        """Override delete to archive payment before deletion"""
+        # Archive and log the payment before deletion
+        for record in self.archive_records():
+            record.save()
         
         super().delete(*args, **kwargs)
 
 
+class SMSLogQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """Messages to tenants in the user's properties (all messages for superusers)"""
+        if user.is_superuser:
+            return self
+        return self.filter(tenant__property__landlord=user)
+
+
 class SMSLog(models.Model):
     STATUS_CHOICES = [
         ('success', 'Success'),
         ('failure', 'Failure'),
+        ('retrying', 'Retrying'),
+        ('dead', 'Dead Letter'),
+    ]
+    DELIVERY_STATUS_CHOICES = [
+        ('sent', 'Sent to Network'),
+        ('delivered', 'Delivered'),
+        ('failed', 'Not Delivered'),
     ]
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='sms_logs')
     message = models.TextField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    provider = models.CharField(max_length=20, blank=True, help_text="Provider that handled the final attempt")
+    attempts = models.PositiveSmallIntegerField(default=1, help_text="Number of times this message was sent")
+    next_retry_at = models.DateTimeField(null=True, blank=True, help_text="When a retrying message is sent again")
+    provider_message_id = models.CharField(max_length=100, blank=True, db_index=True, help_text="Message ID assigned by the provider")
+    delivery_status = models.CharField(max_length=10, choices=DELIVERY_STATUS_CHOICES, blank=True, help_text="Handset delivery from the provider's delivery report")
+    failure_reason = models.CharField(max_length=50, blank=True, help_text="Delivery failure reason reported by the provider")
+    delivery_updated_at = models.DateTimeField(null=True, blank=True)
     sent_at = models.DateTimeField(auto_now_add=True)
     response_data = models.JSONField(null=True, blank=True, help_text="API response data")
     
+    objects = SMSLogQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-sent_at']
+        indexes = [
+            models.Index(fields=['status', 'next_retry_at']),
+            models.Index(fields=['-sent_at', '-id'], name='smslog_sent_idx'),
+        ]
     
     def __str__(self):
         return f"{self.tenant.name} - {self.status} - {self.sent_at.strftime('%Y-%m-%d %H:%M')}"
 
 
+class MpesaCallback(models.Model):
+    """Staged M-Pesa confirmation, deduplicated on the M-Pesa transaction ID"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('matched', 'Matched'),
+        ('unmatched', 'Unmatched'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    trans_id = models.CharField(max_length=30, unique=True, help_text="M-Pesa transaction ID / receipt number")
+    transaction_type = models.CharField(max_length=30, blank=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    msisdn = models.CharField(max_length=64, blank=True, help_text="Payer phone number as sent by Safaricom")
+    bill_ref_number = models.CharField(max_length=50, blank=True, help_text="Account reference entered by the payer")
+    first_name = models.CharField(max_length=100, blank=True)
+    trans_time = models.DateTimeField(null=True, blank=True)
+    payload = models.JSONField(help_text="Raw callback payload")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    tenant = models.ForeignKey(Tenant, on_delete=models.SET_NULL, null=True, blank=True, related_name='mpesa_callbacks')
+    payment = models.OneToOneField(Payment, on_delete=models.SET_NULL, null=True, blank=True, related_name='mpesa_callback')
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-received_at']
+        indexes = [
+            models.Index(fields=['status', 'received_at']),
+        ]
+        verbose_name = "M-Pesa Callback"
+        verbose_name_plural = "M-Pesa Callbacks"
+    
+    def __str__(self):
+        return f"{self.trans_id} - KSh {self.amount} - {self.status}"
+
+
+class SMSDailyCounter(models.Model):
+    """
+    Running SMS totals per day, provider and status, updated in the same
+    transaction as the SMSLog write. `status` is an SMSLog status, or
+    'delivered'/'undelivered' for delivery reports.
+    """
+    day = models.DateField()
+    provider = models.CharField(max_length=20, blank=True)
+    status = models.CharField(max_length=12)
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'provider', 'status'], name='unique_sms_daily_counter'),
+        ]
+        verbose_name = "SMS Daily Counter"
+        verbose_name_plural = "SMS Daily Counters"
+    
+    def __str__(self):
+        return f"{self.day} - {self.provider or 'none'} - {self.status} - {self.count}"
+
+
+class SMSLogDailySummary(models.Model):
+    """SMS counts per day, tenant and outcome for logs removed by retention"""
+    day = models.DateField()
+    tenant = models.ForeignKey(Tenant, on_delete=models.SET_NULL, null=True, blank=True, related_name='sms_summaries')
+    status = models.CharField(max_length=10, choices=SMSLog.STATUS_CHOICES)
+    delivery_status = models.CharField(max_length=10, blank=True)
+    provider = models.CharField(max_length=20, blank=True)
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-day']
+        indexes = [
+            models.Index(fields=['day']),
+            models.Index(fields=['tenant', 'day']),
+        ]
+        verbose_name = "SMS Daily Summary"
+        verbose_name_plural = "SMS Daily Summaries"
+    
+    def __str__(self):
+        return f"{self.day} - {self.status} - {self.count}"
+
+
+class HistoryDailySummary(models.Model):
+    """Tenant/payment history counts per day, tenant and action for rows removed by retention"""
+    SOURCE_CHOICES = [
+        ('tenant', 'Tenant History'),
+        ('payment', 'Payment History'),
+    ]
+    
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    day = models.DateField()
+    tenant_name = models.CharField(max_length=100)
+    apartment_number = models.CharField(max_length=20)
+    action = models.CharField(max_length=20)
+    count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="Sum of payment amounts (payment history only)")
+    
+    class Meta:
+        ordering = ['-day']
+        indexes = [
+            models.Index(fields=['source', 'day']),
+        ]
+        verbose_name = "History Daily Summary"
+        verbose_name_plural = "History Daily Summaries"
+    
+    def __str__(self):
+        return f"{self.day} - {self.tenant_name} - {self.action} - {self.count}"
+
+
+class DeliveryReport(models.Model):
+    """Staged provider delivery report, applied to SMSLog in batches"""
+    id = models.BigAutoField(primary_key=True)
+    provider = models.CharField(max_length=20)
+    provider_message_id = models.CharField(max_length=100)
+    status = models.CharField(max_length=30, help_text="Status as sent by the provider")
+    failure_reason = models.CharField(max_length=50, blank=True)
+    phone = models.CharField(max_length=20, blank=True)
+    payload = models.JSONField(help_text="Raw report fields")
+    received_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        ordering = ['received_at']
+    
+    def __str__(self):
+        return f"{self.provider_message_id} - {self.status}"
+
+
+class RateLimitBucket(models.Model):
+    """Token bucket for one provider + sender ID, shared by every worker"""
+    key = models.CharField(max_length=100, unique=True, help_text="provider:sender_id")
+    tokens = models.FloatField(help_text="Tokens left after the last reservation (negative while callers wait)")
+    last_refill = models.FloatField(help_text="Unix time the tokens were last refilled")
+    version = models.PositiveIntegerField(default=0, help_text="Compare-and-swap counter")
+    
+    def __str__(self):
+        return f"{self.key} - {self.tokens:.1f} tokens"
+
+
 class ArchivedTenant(models.Model):
     """Archive model for deleted tenants"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -0,0 +1,256 @@
+"""
+M-Pesa (Daraja) confirmation ingestion for Rental Management System
+
+Callbacks are validated and staged in MpesaCallback (deduplicated on the
+M-Pesa transaction ID), then turned into Payment rows and balance updates
+in micro-batches so end-of-month bursts cost one transaction per batch
+instead of one per callback.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import Tenant, Payment, MpesaCallback
+from .payment_service import PaymentService
+from .data_version import DataVersion
+from .phone import normalize_phone
+
+# Daraja timestamps are in East Africa Time
+MPESA_TIMEZONE = ZoneInfo('Africa/Nairobi')
+# MpesaCallback.amount and Payment.amount are max_digits=10, decimal_places=2
+MAX_AMOUNT = Decimal('1e8')
+
+
+class MpesaService:
+    """Service for validating, staging and applying M-Pesa confirmations"""
+
+    @staticmethod
+    def _parse_time(value):
+        """Parse a Daraja YYYYMMDDHHMMSS timestamp (str or int)"""
+        if not value:
+            return None
+        try:
+            naive = datetime.strptime(str(value), '%Y%m%d%H%M%S')
+        except ValueError:
+            return None
+        return naive.replace(tzinfo=MPESA_TIMEZONE)
+
+    @staticmethod
+    def _parse_amount(value):
+        try:
+            amount = Decimal(str(value)).quantize(Decimal('0.01'))
+        except (InvalidOperation, TypeError, ValueError):
+            raise ValueError(f"Invalid amount: {value!r}")
+        # NaN survives quantize() and would raise InvalidOperation on comparison
+        if not amount.is_finite():
+            raise ValueError(f"Invalid amount: {value!r}")
+        if amount <= 0:
+            raise ValueError(f"Amount must be positive: {value!r}")
+        if amount >= MAX_AMOUNT:
+            raise ValueError(f"Amount out of range: {value!r}")
+        return amount
+
+    @staticmethod
+    def parse_callback(payload):
+        """
+        Validate a C2B confirmation or STK-push callback.
+
+        Args:
+            payload (dict): Decoded JSON body from Safaricom
+
+        Returns:
+            dict: Fields for MpesaCallback, or None for an STK callback
+                  reporting a failed/cancelled payment
+
+        Raises:
+            ValueError: If the payload is not a valid confirmation
+        """
+        if not isinstance(payload, dict):
+            raise ValueError("Payload must be a JSON object")
+
+        # STK push: {"Body": {"stkCallback": {...}}}
+        stk = payload.get('Body', {}).get('stkCallback') if isinstance(payload.get('Body'), dict) else None
+        if stk is not None:
+            if not isinstance(stk, dict):
+                raise ValueError("stkCallback must be an object")
+            if stk.get('ResultCode') not in (0, '0'):
+                return None
+            metadata = stk.get('CallbackMetadata')
+            items = metadata.get('Item') if isinstance(metadata, dict) else None
+            if not isinstance(items, list):
+                raise ValueError("Missing CallbackMetadata items")
+            meta = {item.get('Name'): item.get('Value') for item in items if isinstance(item, dict)}
+            trans_id = str(meta.get('MpesaReceiptNumber') or '').strip()
+            if not trans_id:
+                raise ValueError("Missing MpesaReceiptNumber")
+            return {
+                'trans_id': trans_id,
+                'transaction_type': 'STK Push',
+                'amount': MpesaService._parse_amount(meta.get('Amount')),
+                'msisdn': str(meta.get('PhoneNumber') or ''),
+                'bill_ref_number': str(stk.get('AccountReference') or ''),
+                'first_name': '',
+                'trans_time': MpesaService._parse_time(meta.get('TransactionDate')),
+            }
+
+        # C2B confirmation: flat object keyed by TransID
+        trans_id = str(payload.get('TransID') or '').strip()
+        if not trans_id:
+            raise ValueError("Missing TransID")
+        return {
+            'trans_id': trans_id,
+            'transaction_type': str(payload.get('TransactionType') or ''),
+            'amount': MpesaService._parse_amount(payload.get('TransAmount')),
+            'msisdn': str(payload.get('MSISDN') or ''),
+            'bill_ref_number': str(payload.get('BillRefNumber') or '').strip(),
+            'first_name': str(payload.get('FirstName') or ''),
+            'trans_time': MpesaService._parse_time(payload.get('TransTime')),
+        }
+
+    @staticmethod
+    def ingest(payload):
+        """
+        Validate and stage one callback.
+
+        Returns:
+            bool: True if staged, False if it was a duplicate or a failed STK payment
+        """
+        fields = MpesaService.parse_callback(payload)
+        if fields is None:
+            return False
+        if MpesaCallback.objects.filter(trans_id=fields['trans_id']).exists():
+            return False
+        # Safaricom retries confirmations; the unique index drops concurrent repeats
+        MpesaCallback.objects.bulk_create(
+            [MpesaCallback(payload=payload, **fields)],
+            ignore_conflicts=True
+        )
+        return True
+
+    @staticmethod
+    def flush_due():
+        """Check whether the pending queue should be flushed now"""
+        batch_size = getattr(settings, 'MPESA_BATCH_SIZE', 100)
+        max_wait = getattr(settings, 'MPESA_BATCH_MAX_WAIT', 5)
+        pending = MpesaCallback.objects.filter(status='pending')
+        if pending[batch_size - 1:batch_size].exists():
+            return True
+        oldest = pending.order_by('received_at').values_list('received_at', flat=True).first()
+        return oldest is not None and oldest <= timezone.now() - timedelta(seconds=max_wait)
+
+    @staticmethod
+    def match_tenants(callbacks):
+        """
+        Resolve payers to tenants with two queries for the whole batch.
+
+        The account reference (apartment number) wins over the phone number
+        because Daraja masks the MSISDN for many C2B payments. Apartment
+        numbers are unique only within a property, so a reference (or phone)
+        shared by several tenants is ambiguous: the callback is left
+        unmatched for manual reconciliation rather than credited to one.
+
+        Returns:
+            dict: {trans_id: Tenant}
+        """
+        refs = set()
+        for cb in callbacks:
+            if cb.bill_ref_number:
+                refs.update([cb.bill_ref_number, cb.bill_ref_number.upper()])
+        # Masked or hashed MSISDNs normalize to '' and cannot be matched by phone
+        phones = {normalize_phone(cb.msisdn) for cb in callbacks} - {''}
+
+        by_apartment = defaultdict(list)
+        if refs:
+            for tenant in Tenant.objects.filter(apartment_number__in=refs):
+                by_apartment[tenant.apartment_number.upper()].append(tenant)
+
+        by_phone = defaultdict(list)
+        if phones:
+            for tenant in Tenant.objects.filter(phone_e164__in=phones):
+                by_phone[tenant.phone_e164].append(tenant)
+
+        matches = {}
+        for cb in callbacks:
+            candidates = by_apartment.get(cb.bill_ref_number.upper())
+            if not candidates:
+                candidates = by_phone.get(normalize_phone(cb.msisdn))
+            if candidates and len(candidates) == 1:
+                matches[cb.trans_id] = candidates[0]
+        return matches
+
+    @staticmethod
+    def process_pending(limit=None):
+        """
+        Turn one micro-batch of pending callbacks into payments.
+
+        Returns:
+            dict: Counts of matched and unmatched callbacks
+        """
+        limit = limit or getattr(settings, 'MPESA_BATCH_SIZE', 100)
+        now = timezone.now()
+
+        with transaction.atomic():
+            callbacks = list(
+                MpesaCallback.objects.select_for_update(skip_locked=True)
+                .filter(status='pending')
+                .order_by('received_at')[:limit]
+            )
+            if not callbacks:
+                return {'matched': 0, 'unmatched': 0}
+
+            matches = MpesaService.match_tenants(callbacks)
+            # Receipts already recorded by hand or by a statement import
+            existing = dict(
+                Payment.objects.filter(transaction_id__in=[cb.trans_id for cb in callbacks])
+                .values_list('transaction_id', 'id')
+            )
+            payments = []
+            deltas = defaultdict(Decimal)
+
+            for cb in callbacks:
+                tenant = matches.get(cb.trans_id)
+                cb.processed_at = now
+                if cb.trans_id in existing:
+                    cb.status = 'matched'
+                    cb.payment_id = existing[cb.trans_id]
+                    continue
+                if tenant is None:
+                    cb.status = 'unmatched'
+                    continue
+                payment = Payment(
+                    tenant=tenant,
+                    amount=cb.amount,
+                    payment_type='Full' if cb.amount >= tenant.rent_amount else 'Partial',
+                    status='Paid',
+                    transaction_id=cb.trans_id,
+                    notes=f"M-Pesa {cb.trans_id} from {cb.msisdn or 'unknown'}",
+                )
+                payments.append(payment)
+                deltas[tenant.pk] += cb.amount
+                cb.status = 'matched'
+                cb.tenant = tenant
+                cb.payment = payment
+
+            Payment.objects.bulk_create(payments)
+            DataVersion.bump('payments')
+            MpesaCallback.objects.bulk_update(callbacks, ['status', 'tenant', 'payment', 'processed_at'])
+            PaymentService.apply_balance_deltas(deltas)
+
+        unmatched = sum(1 for cb in callbacks if cb.status == 'unmatched')
+        return {'matched': len(callbacks) - unmatched, 'unmatched': unmatched}
+
+    @staticmethod
+    def process_all(limit=None):
+        """Drain the pending queue batch by batch"""
+        totals = {'matched': 0, 'unmatched': 0}
+        while True:
+            result = MpesaService.process_pending(limit)
+            if not result['matched'] and not result['unmatched']:
+                return totals
+            totals['matched'] += result['matched']
+            totals['unmatched'] += result['unmatched']
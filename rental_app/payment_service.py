@@ -0,0 +1,225 @@
+"""
+Payment recording service for Rental Management System
+
+All balance changes go through conditional UPDATE statements so concurrent
+M-Pesa confirmations and clerks recording payments never lose an update.
+UPDATE skips model signals, so each change bumps the tenants data version.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import Tenant, Payment, ArchivedPayment, PaymentHistory
+from .data_version import DataVersion
+
+ZERO = Value(Decimal('0'), output_field=DecimalField(max_digits=10, decimal_places=2))
+
+
+def to_decimal(amount):
+    """Convert form/API input (str, float, int or Decimal) to a 2dp Decimal"""
+    if isinstance(amount, Decimal):
+        return amount
+    return Decimal(str(amount)).quantize(Decimal('0.01'))
+
+
+class PaymentService:
+    """Service for applying payments and balance changes atomically"""
+
+    @staticmethod
+    def _sync_status(tenant_id):
+        """
+        Recompute rent_status for a tenant whose balance was just changed.
+
+        Must be called inside a transaction: the row is locked so the status
+        is derived from the committed balance, and only rent_status is written.
+        """
+        locked = Tenant.objects.select_for_update().only(
+            'id', 'rent_amount', 'rent_status', 'due_date', 'amount_due', 'last_payment_date'
+        ).get(pk=tenant_id)
+        new_status = locked.compute_status()
+        if new_status != locked.rent_status:
+            Tenant.objects.filter(pk=tenant_id).update(rent_status=new_status)
+            locked.rent_status = new_status
+        return locked
+
+    @staticmethod
+    def _refresh(tenant, locked):
+        """Copy the columns we changed back onto the caller's instance"""
+        tenant.amount_due = locked.amount_due
+        tenant.rent_status = locked.rent_status
+        tenant.last_payment_date = locked.last_payment_date
+
+    @staticmethod
+    def apply_payment(tenant, amount):
+        """
+        Reduce a tenant's amount due by a payment that has already been recorded.
+
+        Args:
+            tenant (Tenant): Tenant receiving the payment
+            amount: Payment amount (must be positive)
+        """
+        amount = to_decimal(amount)
+        now = timezone.now()
+
+        with transaction.atomic():
+            Tenant.objects.filter(pk=tenant.pk).update(
+                amount_due=Greatest(F('amount_due') - amount, ZERO),
+                last_payment_date=now,
+                updated_at=now,
+            )
+            locked = PaymentService._sync_status(tenant.pk)
+            DataVersion.bump('tenants')
+
+        PaymentService._refresh(tenant, locked)
+
+    @staticmethod
+    def apply_balance_deltas(deltas, payment_time=None):
+        """
+        Apply aggregated payment totals for many tenants in one pass.
+
+        Args:
+            deltas (dict): {tenant_id: total amount paid}
+            payment_time (datetime): Value for last_payment_date (default: now)
+
+        Returns:
+            int: Number of tenants updated
+        """
+        now = timezone.now()
+        payment_time = payment_time or now
+        updated = 0
+
+        with transaction.atomic():
+            for tenant_id, amount in deltas.items():
+                amount = to_decimal(amount)
+                if amount <= 0:
+                    continue
+                updated += Tenant.objects.filter(pk=tenant_id).update(
+                    amount_due=Greatest(F('amount_due') - amount, ZERO),
+                    last_payment_date=payment_time,
+                    updated_at=now,
+                )
+                PaymentService._sync_status(tenant_id)
+            DataVersion.bump('tenants')
+
+        return updated
+
+    @staticmethod
+    def record_payment(tenant, amount, payment_type='Full', status='Paid', notes='', **extra):
+        """
+        Create a Payment and apply it to the tenant's balance in one transaction.
+
+        Returns:
+            Payment: The created payment
+        """
+        amount = to_decimal(amount)
+
+        with transaction.atomic():
+            payment = Payment.objects.create(
+                tenant=tenant,
+                amount=amount,
+                payment_type=payment_type,
+                status=status,
+                notes=notes,
+                **extra
+            )
+            if status == 'Paid' and amount > 0:
+                PaymentService.apply_payment(tenant, amount)
+
+        return payment
+
+    @staticmethod
+    def save_payment_form(form):
+        """Save a PaymentForm and apply the payment atomically"""
+        with transaction.atomic():
+            payment = form.save()
+            if payment.status == 'Paid' and payment.amount > 0:
+                PaymentService.apply_payment(payment.tenant, payment.amount)
+        return payment
+
+    @staticmethod
+    def mark_rent_paid(tenant):
+        """
+        Mark an unpaid tenant as paid and record a full rent payment.
+
+        The Unpaid -> Paid transition is claimed with a conditional UPDATE, so
+        two clerks clicking at the same time only record one payment.
+
+        Returns:
+            Payment or None: The payment, or None if rent was not Unpaid
+        """
+        now = timezone.now()
+
+        with transaction.atomic():
+            claimed = Tenant.objects.filter(pk=tenant.pk, rent_status='Unpaid').update(
+                rent_status='Paid',
+                amount_due=Greatest(F('amount_due') - F('rent_amount'), ZERO),
+                last_payment_date=now,
+                updated_at=now,
+            )
+            if not claimed:
+                return None
+            DataVersion.bump('tenants')
+
+            tenant.refresh_from_db(fields=['rent_amount', 'amount_due', 'rent_status', 'last_payment_date'])
+            payment = Payment.objects.create(
+                tenant=tenant,
+                amount=tenant.rent_amount,
+                status='Paid'
+            )
+
+        return payment
+
+    @staticmethod
+    def delete_payment(payment):
+        """Delete a payment and add its amount back to the tenant's balance"""
+        now = timezone.now()
+
+        with transaction.atomic():
+            if payment.status == 'Paid':
+                Tenant.objects.filter(pk=payment.tenant_id).update(
+                    amount_due=F('amount_due') + payment.amount,
+                    updated_at=now,
+                )
+                locked = PaymentService._sync_status(payment.tenant_id)
+                PaymentService._refresh(payment.tenant, locked)
+                DataVersion.bump('tenants')
+            payment.delete()
+
+    @staticmethod
+    def delete_payments(payments):
+        """
+        Delete a batch of payments (with tenants loaded) in one transaction.
+
+        Paid amounts are added back once per tenant, and the archive and
+        history rows are written with bulk_create.
+
+        Returns:
+            int: Number of payments deleted
+        """
+        payments = list(payments)
+        if not payments:
+            return 0
+        now = timezone.now()
+        refunds = defaultdict(Decimal)
+        for payment in payments:
+            if payment.status == 'Paid':
+                refunds[payment.tenant_id] += payment.amount
+
+        with transaction.atomic():
+            for tenant_id, amount in refunds.items():
+                Tenant.objects.filter(pk=tenant_id).update(
+                    amount_due=F('amount_due') + amount,
+                    updated_at=now,
+                )
+                PaymentService._sync_status(tenant_id)
+            archived, history = zip(*(payment.archive_records() for payment in payments))
+            ArchivedPayment.objects.bulk_create(archived)
+            PaymentHistory.objects.bulk_create(history)
+            Payment.objects.filter(pk__in=[payment.pk for payment in payments]).delete()
+            DataVersion.bump('tenants', 'payments')
+
+        return len(payments)
@@ -0,0 +1,56 @@
+"""
+Phone number normalization for Rental Management System
+
+Every channel (SMS, WhatsApp, M-Pesa matching, imports) uses normalize_phone
+so a tenant's number is stored and looked up in one canonical E.164 form.
+"""
+
+import re
+
+from django.conf import settings
+
+E164_PATTERN = re.compile(r'^\+[1-9]\d{7,14}$')
+STRIP_PATTERN = re.compile(r'[\s\-().]')
+
+
+def normalize_phone(phone_number, country_code=None):
+    """
+    Convert a phone number to E.164 (+2547XXXXXXXX).
+
+    Accepts local (07..., 7...), national (2547...), international (+2547...,
+    002547...) forms with spaces, dashes, dots or brackets.
+
+    Args:
+        phone_number (str): Raw phone number
+        country_code (str): Calling code for local numbers (default: PHONE_DEFAULT_COUNTRY_CODE)
+
+    Returns:
+        str: E.164 number, or '' if the input cannot be a valid number
+    """
+    if not phone_number:
+        return ''
+    phone_number = str(phone_number).strip()
+    if E164_PATTERN.match(phone_number):
+        return phone_number
+
+    country_code = country_code or getattr(settings, 'PHONE_DEFAULT_COUNTRY_CODE', '254')
+    national_length = getattr(settings, 'PHONE_NATIONAL_NUMBER_LENGTH', 9)
+    cleaned = STRIP_PATTERN.sub('', phone_number)
+
+    if cleaned.startswith('+'):
+        digits = cleaned[1:]
+    elif cleaned.startswith('00'):
+        digits = cleaned[2:]
+    else:
+        if cleaned.startswith(country_code) and len(cleaned) == len(country_code) + national_length:
+            national = cleaned[len(country_code):]
+        else:
+            national = cleaned[1:] if cleaned.startswith('0') else cleaned
+        if len(national) != national_length:
+            return ''
+        digits = country_code + national
+
+    if not digits.isdigit():
+        return ''
+    normalized = '+' + digits
+    return normalized if E164_PATTERN.match(normalized) else ''
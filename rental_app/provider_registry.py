@@ -0,0 +1,107 @@
+"""
+Per-process registry of messaging provider clients
+
+Each provider is built once per process (settings read once) and owns a
+pooled requests.Session, so HTTP connections to the provider are reused
+across messages and requests. Clients are created lazily on first use or
+eagerly by warmup() from gunicorn's post_fork hook (see gunicorn.conf.py).
+
+Pooled sockets must never be shared between processes, so everything is
+dropped in a child process right after fork.
+"""
+
+import os
+import sys
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+PROVIDER_CLASSES = {
+    'smsmobile': 'rental_app.sms_service.SMSMobileService',
+    'africastalking': 'rental_app.africas_talking_service.AfricasTalkingService',
+    'whatsapp': 'rental_app.whatsapp_service.WhatsAppService',
+}
+
+_providers = {}
+_sessions = {}
+_lock = threading.Lock()
+
+
+def build_session():
+    """A Session with a connection pool sized for the worker's threads"""
+    # Imported here so loading the URLconf doesn't pull in requests/urllib3/ssl
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    pool_size = getattr(settings, 'SMS_HTTP_POOL_SIZE', 10)
+    session = requests.Session()
+    # Retries are handled by the router and the retry worker, not urllib3
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session(name):
+    """The pooled HTTP session for a provider"""
+    session = _sessions.get(name)
+    if session is None:
+        with _lock:
+            session = _sessions.get(name)
+            if session is None:
+                session = _sessions[name] = build_session()
+    return session
+
+
+def get_provider(name):
+    """The shared client for a provider, built on first use"""
+    provider = _providers.get(name)
+    if provider is None:
+        with _lock:
+            provider = _providers.get(name)
+            if provider is None:
+                try:
+                    path = PROVIDER_CLASSES[name]
+                except KeyError:
+                    raise KeyError(f"Unknown SMS provider: {name}")
+                provider = _providers[name] = import_string(path)()
+    return provider
+
+
+def warmup(names=None):
+    """Build clients and sessions up front, e.g. in gunicorn post_fork"""
+    from .sms_router import get_sms_router
+
+    for name in names or getattr(settings, 'SMS_PROVIDERS', ['smsmobile', 'africastalking']):
+        get_session(get_provider(name).name)
+    return get_sms_router()
+
+
+def reset():
+    """Close pooled connections and forget every client (settings changes, tests)"""
+    from .sms_router import reset_sms_router
+
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+        _providers.clear()
+    for session in sessions:
+        session.close()
+    reset_sms_router()
+
+
+def _reset_after_fork():
+    """Drop the parent's clients without touching its sockets"""
+    global _lock
+    # The parent may have held the lock while forking
+    _lock = threading.Lock()
+    _sessions.clear()
+    _providers.clear()
+    sms_router = sys.modules.get('rental_app.sms_router')
+    if sms_router is not None:
+        sms_router.forget_router_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,86 @@
+"""
+Shared token-bucket rate limiting for outbound provider traffic
+
+Bucket state lives in RateLimitBucket rows, so every gunicorn worker, the
+retry worker and management scripts draw from the same budget. reserve()
+takes a token with a compare-and-swap UPDATE (no lock is held while waiting)
+and lets the balance go negative: each caller gets a slot in the future and
+sleeps until it, which spreads a burst out at exactly the configured rate
+instead of rejecting it.
+"""
+
+import time
+
+from django.conf import settings
+from django.db.models import F
+
+from .models import RateLimitBucket
+
+# Give up on a reservation after this many lost compare-and-swap races
+MAX_CAS_ATTEMPTS = 50
+
+
+class TokenBucketLimiter:
+    """Database-backed token buckets keyed by provider and sender ID"""
+
+    def __init__(self, clock=time.time, sleep=time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+
+    def reserve(self, key, rate, burst, max_wait=None, tokens=1):
+        """
+        Take `tokens` from the bucket.
+
+        Args:
+            key (str): Bucket key, e.g. 'africastalking:RENTAL'
+            rate (float): Tokens added per second (sustained sends per second)
+            burst (float): Bucket capacity
+            max_wait (float): Refuse instead of queueing longer than this
+
+        Returns:
+            float: Seconds to wait before sending, or None if refused
+        """
+        if not rate or rate <= 0:
+            return 0.0
+
+        for _ in range(MAX_CAS_ATTEMPTS):
+            now = self.clock()
+            bucket, _ = RateLimitBucket.objects.get_or_create(
+                key=key, defaults={'tokens': burst, 'last_refill': now}
+            )
+            elapsed = max(0.0, now - bucket.last_refill)
+            available = min(float(burst), bucket.tokens + elapsed * rate)
+            remaining = available - tokens
+            wait = max(0.0, -remaining / rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+
+            updated = RateLimitBucket.objects.filter(pk=bucket.pk, version=bucket.version).update(
+                tokens=remaining,
+                last_refill=max(now, bucket.last_refill),
+                version=F('version') + 1,
+            )
+            if updated:
+                return wait
+        return None
+
+    def acquire(self, key, rate, burst, max_wait=None, tokens=1):
+        """Reserve and sleep until the slot; returns False if refused"""
+        wait = self.reserve(key, rate, burst, max_wait=max_wait, tokens=tokens)
+        if wait is None:
+            return False
+        if wait > 0:
+            self.sleep(wait)
+        return True
+
+
+def provider_rate_limit(provider_name):
+    """(rate, burst) from settings.SMS_RATE_LIMITS, or (None, None) if unlimited"""
+    limits = getattr(settings, 'SMS_RATE_LIMITS', {}).get(provider_name)
+    if not limits:
+        return None, None
+    rate = float(limits.get('rate') or 0)
+    return rate, float(limits.get('burst') or max(rate, 1))
+
+
+limiter = TokenBucketLimiter()
@@ -0,0 +1,212 @@
+"""
+Retention and rollups for Rental Management System
+
+SMSLog, TenantHistory and PaymentHistory keep `keep_days` of raw rows.
+Older rows are folded into daily summary tables and deleted, one chunk
+per transaction, so an interrupted run loses nothing and the next run
+simply continues with what is left. SMSLog.response_data can be stripped
+earlier than the row itself is removed.
+
+Policies come from settings.RETENTION_POLICIES.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import SMSLog, SMSLogDailySummary, TenantHistory, PaymentHistory, HistoryDailySummary
+
+DEFAULT_POLICIES = {
+    'sms_logs': {'keep_days': 180, 'strip_response_days': 30},
+    'tenant_history': {'keep_days': 365},
+    'payment_history': {'keep_days': 365},
+}
+
+
+def get_policy(table):
+    policies = getattr(settings, 'RETENTION_POLICIES', DEFAULT_POLICIES)
+    return {**DEFAULT_POLICIES.get(table, {}), **policies.get(table, {})}
+
+
+def _increment(model, counts):
+    """Add {key_fields: (count, amount)} to summary rows, creating them as needed"""
+    for key, (count, amount) in counts.items():
+        lookup = dict(key)
+        defaults = {'count': count}
+        if amount is not None:
+            defaults['total_amount'] = amount
+        summary, created = model.objects.get_or_create(**lookup, defaults=defaults)
+        if not created:
+            updates = {'count': F('count') + count}
+            if amount is not None:
+                updates['total_amount'] = F('total_amount') + amount
+            model.objects.filter(pk=summary.pk).update(**updates)
+
+
+class RetentionService:
+    """Chunked, resumable rollup and pruning of log tables"""
+
+    @staticmethod
+    def _cutoff(days, now=None):
+        return (now or timezone.now()) - timedelta(days=days)
+
+    @staticmethod
+    def rollup_sms_logs(keep_days, chunk_size=1000, now=None, dry_run=False):
+        """
+        Fold SMS logs older than keep_days into SMSLogDailySummary and delete them.
+
+        Messages still waiting for a retry are left alone.
+
+        Returns:
+            int: rows rolled up
+        """
+        old = SMSLog.objects.filter(sent_at__lt=RetentionService._cutoff(keep_days, now)).exclude(status='retrying')
+        if dry_run:
+            return old.count()
+
+        total = 0
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    old.order_by('sent_at', 'id')
+                    .values('id', 'sent_at', 'tenant_id', 'status', 'delivery_status', 'provider')[:chunk_size]
+                )
+                if not rows:
+                    return total
+                counts = defaultdict(lambda: [0, None])
+                for row in rows:
+                    key = (
+                        ('day', timezone.localtime(row['sent_at']).date()),
+                        ('tenant_id', row['tenant_id']),
+                        ('status', row['status']),
+                        ('delivery_status', row['delivery_status']),
+                        ('provider', row['provider']),
+                    )
+                    counts[key][0] += 1
+                _increment(SMSLogDailySummary, counts)
+                SMSLog.objects.filter(id__in=[row['id'] for row in rows]).delete()
+            total += len(rows)
+
+    @staticmethod
+    def strip_sms_response_data(strip_days, chunk_size=1000, now=None, dry_run=False):
+        """
+        Drop the provider JSON from SMS logs older than strip_days.
+
+        Returns:
+            int: rows stripped
+        """
+        bulky = SMSLog.objects.filter(
+            sent_at__lt=RetentionService._cutoff(strip_days, now), response_data__isnull=False
+        )
+        if dry_run:
+            return bulky.count()
+
+        total = 0
+        while True:
+            ids = list(bulky.order_by('sent_at', 'id').values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                return total
+            SMSLog.objects.filter(id__in=ids).update(response_data=None)
+            total += len(ids)
+
+    @staticmethod
+    def rollup_history(model, source, keep_days, chunk_size=1000, now=None, dry_run=False):
+        """
+        Fold TenantHistory/PaymentHistory rows older than keep_days into
+        HistoryDailySummary and delete them.
+
+        Returns:
+            int: rows rolled up
+        """
+        old = model.objects.filter(changed_at__lt=RetentionService._cutoff(keep_days, now))
+        if dry_run:
+            return old.count()
+
+        with_amount = model is PaymentHistory
+        fields = ['id', 'changed_at', 'tenant_name', 'apartment_number', 'action']
+        if with_amount:
+            fields.append('payment_amount')
+
+        total = 0
+        while True:
+            with transaction.atomic():
+                rows = list(old.order_by('changed_at', 'id').values(*fields)[:chunk_size])
+                if not rows:
+                    return total
+                counts = defaultdict(lambda: [0, Decimal('0') if with_amount else None])
+                for row in rows:
+                    key = (
+                        ('source', source),
+                        ('day', timezone.localtime(row['changed_at']).date()),
+                        ('tenant_name', row['tenant_name']),
+                        ('apartment_number', row['apartment_number']),
+                        ('action', row['action']),
+                    )
+                    counts[key][0] += 1
+                    if with_amount:
+                        counts[key][1] += row['payment_amount']
+                _increment(HistoryDailySummary, counts)
+                model.objects.filter(id__in=[row['id'] for row in rows]).delete()
+            total += len(rows)
+
+    @staticmethod
+    def apply(tables=None, chunk_size=1000, now=None, dry_run=False):
+        """
+        Apply the configured policy to each table.
+
+        Returns:
+            dict: {table: {'rolled_up': n, 'stripped': n}}
+        """
+        tables = tables or list(DEFAULT_POLICIES)
+        results = {}
+        for table in tables:
+            policy = get_policy(table)
+            result = {'rolled_up': 0, 'stripped': 0}
+            if table == 'sms_logs':
+                if policy.get('strip_response_days'):
+                    result['stripped'] = RetentionService.strip_sms_response_data(
+                        policy['strip_response_days'], chunk_size, now, dry_run
+                    )
+                result['rolled_up'] = RetentionService.rollup_sms_logs(policy['keep_days'], chunk_size, now, dry_run)
+            elif table == 'tenant_history':
+                result['rolled_up'] = RetentionService.rollup_history(
+                    TenantHistory, 'tenant', policy['keep_days'], chunk_size, now, dry_run
+                )
+            elif table == 'payment_history':
+                result['rolled_up'] = RetentionService.rollup_history(
+                    PaymentHistory, 'payment', policy['keep_days'], chunk_size, now, dry_run
+                )
+            else:
+                raise ValueError(f"Unknown retention table: {table}")
+            results[table] = result
+        return results
+
+    @staticmethod
+    def history_action_counts(source, start=None, end=None):
+        """
+        History counts per action over raw rows plus rollups.
+
+        Returns:
+            dict: {action: count}
+        """
+        model = TenantHistory if source == 'tenant' else PaymentHistory
+        raw = model.objects.all()
+        summaries = HistoryDailySummary.objects.filter(source=source)
+        if start:
+            raw = raw.filter(changed_at__date__gte=start)
+            summaries = summaries.filter(day__gte=start)
+        if end:
+            raw = raw.filter(changed_at__date__lte=end)
+            summaries = summaries.filter(day__lte=end)
+
+        counts = defaultdict(int)
+        for row in raw.order_by().values('action').annotate(total=Count('id')):
+            counts[row['action']] += row['total']
+        for row in summaries.order_by().values('action').annotate(total=Sum('count')):
+            counts[row['action']] += row['total']
+        return dict(counts)
@@ -0,0 +1,222 @@
+"""
+Tenant search for Rental Management System
+
+Substring search over name, apartment number and phone, served from an
+index on both databases:
+
+- PostgreSQL: pg_trgm GIN indexes on UPPER(column), which the ILIKE-style
+  queries Django generates for icontains can use
+- SQLite: an FTS5 table with the trigram tokenizer holding a copy of the
+  searched columns, kept in sync by triggers and keyed through
+  FTS_KEYS_TABLE rather than the tenant table's unstable rowid
+
+Migration 0014 creates the index for the current database. SQLite drops
+triggers whenever a migration rebuilds the tenant table, so ensure_index()
+also runs after every migrate (see apps.py) and rebuilds the FTS table if
+its triggers are missing. Whether the index is usable is checked once per
+database and remembered, not on every search.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .models import Tenant
+
+FTS_TABLE = 'rental_app_tenant_search'
+# Maps FTS rowids to tenant ids. The tenant table's own rowid is implicit
+# (its primary key is a UUID), so VACUUM may renumber it; this table's
+# INTEGER PRIMARY KEY is stable.
+FTS_KEYS_TABLE = 'rental_app_tenant_search_key'
+FTS_COLUMNS = ('name', 'apartment_number', 'phone_e164')
+
+
+def fts_key(row):
+    """SQL for the FTS rowid of trigger row `row` ('new' or 'old')"""
+    return f"(SELECT id FROM {FTS_KEYS_TABLE} WHERE tenant_id = {row}.id)"
+
+
+FTS_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON rental_app_tenant BEGIN
+            INSERT INTO {FTS_KEYS_TABLE}(tenant_id) VALUES (new.id);
+            INSERT INTO {FTS_TABLE}(rowid, name, apartment_number, phone_e164)
+            VALUES ({fts_key('new')}, new.name, new.apartment_number, new.phone_e164);
+        END""",
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON rental_app_tenant BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid = {fts_key('old')};
+            DELETE FROM {FTS_KEYS_TABLE} WHERE tenant_id = old.id;
+        END""",
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, apartment_number, phone_e164
+        ON rental_app_tenant BEGIN
+            UPDATE {FTS_TABLE}
+            SET name = new.name, apartment_number = new.apartment_number, phone_e164 = new.phone_e164
+            WHERE rowid = {fts_key('new')};
+        END""",
+}
+TRIGRAM_INDEXES = {
+    'tenant_name_trgm_idx': 'name',
+    'tenant_apartment_trgm_idx': 'apartment_number',
+    'tenant_phone_trgm_idx': 'phone_e164',
+}
+
+# {(alias, database name): bool}, filled by fts_ready()
+_fts_ready = {}
+
+# Trigram indexes need at least 3 characters; shorter queries use prefix matching
+TRIGRAM_MIN_LENGTH = 3
+MAX_QUERY_LENGTH = 100
+
+
+def phone_term(query):
+    """The E.164 digits a phone-like query would match, e.g. '0712 345' -> '254712345'"""
+    digits = re.sub(r'[\s\-()]', '', query)
+    if not re.fullmatch(r'\+?\d{3,}', digits):
+        return None
+    if digits.startswith('+'):
+        return digits[1:]
+    if digits.startswith('0'):
+        return getattr(settings, 'PHONE_DEFAULT_COUNTRY_CODE', '254') + digits[1:]
+    return digits
+
+
+def fts_phrase(term):
+    """Quote a term as an FTS5 phrase so punctuation is not parsed as syntax"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+class TenantSearchService:
+    """Index-backed tenant lookup for the tenant list and the typeahead endpoint"""
+
+    @staticmethod
+    def filter(queryset, query):
+        """Narrow a tenant queryset to tenants matching `query`"""
+        query = (query or '').strip()[:MAX_QUERY_LENGTH]
+        if not query:
+            return queryset
+        phone = phone_term(query)
+        terms = [query] + ([phone] if phone and phone != query else [])
+
+        if len(query) < TRIGRAM_MIN_LENGTH:
+            return queryset.filter(Q(name__istartswith=query) | Q(apartment_number__istartswith=query))
+
+        connection = connections[queryset.db]
+        if connection.vendor == 'sqlite' and TenantSearchService.fts_ready(connection):
+            match = ' OR '.join(fts_phrase(term) for term in terms)
+            # A pk subquery, so SQLite drives the query from the FTS matches
+            return queryset.filter(pk__in=RawSQL(
+                f"SELECT k.tenant_id FROM {FTS_TABLE} JOIN {FTS_KEYS_TABLE} k ON k.id = {FTS_TABLE}.rowid "
+                f"WHERE {FTS_TABLE} MATCH %s",
+                [match],
+            ))
+
+        # On PostgreSQL each icontains is served by a trigram index
+        condition = Q(name__icontains=query) | Q(apartment_number__icontains=query)
+        for term in terms:
+            condition |= Q(phone_e164__icontains=term)
+        return queryset.filter(condition)
+
+    @staticmethod
+    def search(query, user=None, limit=10):
+        """
+        Best matches for a typeahead box.
+
+        Exact apartment matches rank first, then names starting with the
+        query, then other matches by name.
+
+        Returns:
+            list: Tenant objects (with property loaded)
+        """
+        query = (query or '').strip()[:MAX_QUERY_LENGTH]
+        if not query:
+            return []
+        tenants = Tenant.objects.all() if user is None else Tenant.objects.for_user(user)
+        matches = TenantSearchService.filter(tenants, query).annotate(
+            rank=Case(
+                When(apartment_number__iexact=query, then=Value(0)),
+                When(name__istartswith=query, then=Value(1)),
+                default=Value(2),
+                output_field=IntegerField(),
+            )
+        )
+        return list(matches.select_related('property').order_by('rank', 'name')[:limit])
+
+    @staticmethod
+    def fts_ready(connection, refresh=False):
+        """Whether the SQLite FTS tables and triggers exist, checked once per database"""
+        key = (connection.alias, connection.settings_dict['NAME'])
+        if refresh or key not in _fts_ready:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT COUNT(*) FROM sqlite_master WHERE name IN (%s, %s, %s, %s, %s)",
+                    [FTS_TABLE, FTS_KEYS_TABLE, *FTS_TRIGGERS],
+                )
+                _fts_ready[key] = cursor.fetchone()[0] == 2 + len(FTS_TRIGGERS)
+        return _fts_ready[key]
+
+    @staticmethod
+    def ensure_index(connection):
+        """Create the search index for this database if it is missing"""
+        if 'rental_app_tenant' not in connection.introspection.table_names():
+            return
+        if connection.vendor == 'sqlite':
+            TenantSearchService._ensure_fts(connection)
+        elif connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                for index, column in TRIGRAM_INDEXES.items():
+                    cursor.execute(
+                        f"CREATE INDEX IF NOT EXISTS {index} ON rental_app_tenant "
+                        f"USING gin (UPPER({column}::text) gin_trgm_ops)"
+                    )
+
+    @staticmethod
+    def _ensure_fts(connection):
+        if TenantSearchService.fts_ready(connection, refresh=True):
+            return
+        with connection.cursor() as cursor:
+            # Triggers were missing, so the index may be stale (or in an older layout)
+            TenantSearchService._drop_fts(cursor)
+            try:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({', '.join(FTS_COLUMNS)}, tokenize='trigram')"
+                )
+            except Exception:
+                # SQLite older than 3.34 has no trigram tokenizer; search falls back to LIKE
+                TenantSearchService.fts_ready(connection, refresh=True)
+                return
+            cursor.execute(
+                f"CREATE TABLE {FTS_KEYS_TABLE} (id INTEGER PRIMARY KEY, tenant_id char(32) NOT NULL UNIQUE)"
+            )
+            cursor.execute(f"INSERT INTO {FTS_KEYS_TABLE}(tenant_id) SELECT id FROM rental_app_tenant")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, {', '.join(FTS_COLUMNS)}) "
+                f"SELECT k.id, {', '.join('t.' + column for column in FTS_COLUMNS)} "
+                f"FROM rental_app_tenant t JOIN {FTS_KEYS_TABLE} k ON k.tenant_id = t.id"
+            )
+            for sql in FTS_TRIGGERS.values():
+                cursor.execute(sql)
+        TenantSearchService.fts_ready(connection, refresh=True)
+
+    @staticmethod
+    def _drop_fts(cursor):
+        for trigger in FTS_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_KEYS_TABLE}")
+
+    @staticmethod
+    def drop_index(connection):
+        """Remove the search index (migration rollback)"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                TenantSearchService._drop_fts(cursor)
+                _fts_ready.pop((connection.alias, connection.settings_dict['NAME']), None)
+            elif connection.vendor == 'postgresql':
+                for index in TRIGRAM_INDEXES:
+                    cursor.execute(f"DROP INDEX IF EXISTS {index}")
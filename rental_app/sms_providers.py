@@ -0,0 +1,185 @@
+"""
+SMS provider interface for Rental Management System
+
+Every provider (SMSMobile, Africa's Talking, WhatsApp) implements deliver(),
+which makes exactly one API call and returns a SendResult without touching
+the database. Logging and failover happen in SMSRouter (sms_router.py);
+send_sms() on a single provider is kept for scripts that talk to one provider.
+"""
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import SMSLog
+from .message_templates import templates
+from .rate_limit import limiter as default_limiter, provider_rate_limit
+from .sms_retry_service import SMSRetryService
+from .sms_statistics_service import SMSStatisticsService, log_day
+
+# HTTP statuses worth retrying or failing over on
+TRANSIENT_HTTP_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+def provider_timeout():
+    """(connect, read) timeout for provider HTTP calls"""
+    return (
+        getattr(settings, 'SMS_PROVIDER_CONNECT_TIMEOUT', 3),
+        getattr(settings, 'SMS_PROVIDER_TIMEOUT', 10),
+    )
+
+
+class SendResult:
+    """Outcome of one delivery attempt"""
+
+    def __init__(self, success, message, response_data=None, transient=False,
+                 provider='', latency=0.0, provider_message_id=''):
+        self.success = success
+        self.message = message
+        self.response_data = response_data
+        # True when the failure may succeed later (timeout, 5xx, throttling)
+        self.transient = transient
+        self.provider = provider
+        self.latency = latency
+        # Key for matching delivery reports
+        self.provider_message_id = provider_message_id
+
+    def __iter__(self):
+        # Unpacks like the (success, message) tuples the services return
+        return iter((self.success, self.message))
+
+    def __repr__(self):
+        return f"SendResult({self.provider}, success={self.success}, transient={self.transient})"
+
+
+def log_sms(tenant, message, result, response_data=None):
+    """Write one SMSLog row for a send, scheduling a retry for transient failures"""
+    status, next_retry_at = SMSRetryService.outcome(result, attempts=1)
+    try:
+        with transaction.atomic():
+            log = SMSLog.objects.create(
+                tenant=tenant,
+                message=message,
+                status=status,
+                provider=result.provider,
+                provider_message_id=result.provider_message_id or '',
+                next_retry_at=next_retry_at,
+                response_data=response_data if response_data is not None else result.response_data,
+            )
+            SMSStatisticsService.increment(log_day(log.sent_at), log.provider, status)
+        return log
+    except Exception as e:
+        # Log error but don't fail the SMS sending
+        print(f"Failed to log SMS: {e}")
+        return None
+
+
+def send_outcome(result, log):
+    """(success, message) for callers, noting when a retry was scheduled"""
+    if log is not None and log.status == 'retrying':
+        return False, f"{result.message} (will retry automatically)"
+    return result.success, result.message
+
+
+class TenantMessagesMixin:
+    """
+    Tenant-level helpers with one signature for every provider and the router.
+
+    Subclasses implement send_sms(phone_number, message_text, tenant=None).
+    """
+
+    def send_rent_reminder(self, tenant):
+        """Send rent reminder SMS to tenant"""
+        message = templates.render('rent_reminder', tenant)
+        return self.send_sms(tenant.phone_e164 or tenant.phone, message, tenant)
+
+    def send_rent_confirmation(self, tenant, payment_amount=None):
+        """Send rent payment confirmation SMS, with the amount when known"""
+        if payment_amount is not None:
+            message = templates.render('payment_received', tenant, payment_amount=payment_amount)
+        else:
+            message = templates.render('rent_confirmation', tenant)
+        return self.send_sms(tenant.phone_e164 or tenant.phone, message, tenant)
+
+    def send_payment_reminder(self, tenant, amount_due=None, days_overdue=None):
+        """Send payment reminder for the amount due, or with overdue days"""
+        if days_overdue:
+            message = templates.render('rent_days_overdue', tenant, days_overdue=days_overdue)
+        else:
+            if amount_due is None:
+                amount_due = tenant.amount_due
+            message = templates.render('payment_reminder', tenant, amount_due=amount_due)
+        return self.send_sms(tenant.phone_e164 or tenant.phone, message, tenant)
+
+    def send_custom_message(self, tenant, custom_message):
+        """Send custom message to tenant"""
+        return self.send_sms(tenant.phone_e164 or tenant.phone, custom_message, tenant)
+
+    def get_sms_logs(self, tenant=None, limit=50):
+        """Get SMS logs for a tenant or all tenants"""
+        if tenant:
+            return SMSLog.objects.filter(tenant=tenant).order_by('-sent_at')[:limit]
+        return SMSLog.objects.select_related('tenant').order_by('-sent_at')[:limit]
+
+    def get_sms_statistics(self, start=None, end=None):
+        """Get SMS sending statistics, optionally for a date range"""
+        return SMSStatisticsService.summary(start, end)
+
+
+class SMSProvider(TenantMessagesMixin):
+    """Base class for a single messaging provider"""
+
+    name = ''
+
+    def is_configured(self):
+        raise NotImplementedError
+
+    def deliver(self, phone_number, message_text):
+        """
+        Make one API call. Must not raise and must not write to the database.
+
+        Returns:
+            SendResult
+        """
+        raise NotImplementedError
+
+    @property
+    def session(self):
+        """Pooled HTTP session shared by this provider's clients in the process"""
+        from .provider_registry import get_session
+        return get_session(self.name)
+
+    def rate_limit_key(self):
+        """Bucket shared by every sender using the same account and sender ID"""
+        return f"{self.name}:{getattr(self, 'sender_id', '') or ''}"
+
+    def acquire_send_slot(self, limiter=None):
+        """
+        Wait for a token from this provider's shared bucket.
+
+        Returns:
+            bool: False if the queue is longer than SMS_RATE_LIMIT_MAX_WAIT
+        """
+        rate, burst = provider_rate_limit(self.name)
+        if not rate:
+            return True
+        return (limiter or default_limiter).acquire(
+            self.rate_limit_key(), rate, burst,
+            max_wait=getattr(settings, 'SMS_RATE_LIMIT_MAX_WAIT', 30)
+        )
+
+    def send_sms(self, phone_number, message_text, tenant=None):
+        """
+        Send through this provider only and log the attempt.
+
+        Returns:
+            tuple: (success: bool, message: str)
+        """
+        if self.acquire_send_slot():
+            result = self.deliver(phone_number, message_text)
+        else:
+            result = self._result(False, "Rate limit reached, try again later", {'error': 'rate limited'}, transient=True)
+        log = log_sms(tenant, message_text, result) if tenant else None
+        return send_outcome(result, log)
+
+    def _result(self, success, message, response_data=None, transient=False):
+        return SendResult(success, message, response_data, transient, provider=self.name)
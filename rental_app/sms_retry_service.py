@@ -0,0 +1,159 @@
+"""
+SMS retry service for Rental Management System
+
+A send that fails for a transient reason (timeout, 5xx, throttling, all
+providers unavailable) is logged as 'retrying' with next_retry_at set by
+exponential backoff with jitter. The process_sms_retries worker resends
+due messages through the router and updates the same SMSLog row; once
+SMS_RETRY_MAX_ATTEMPTS is reached the message is moved to 'dead'.
+
+Bulk sends use the same queue: enqueue() writes retrying logs with no
+attempts yet, so web requests never wait on providers.
+"""
+
+import random
+from datetime import timedelta
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import SMSLog
+from .sms_statistics_service import SMSStatisticsService, log_day
+
+# How long a claimed retry is hidden from other workers while it is being sent
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+class SMSRetryService:
+    """Schedules, runs and revives SMS retries"""
+
+    @staticmethod
+    def backoff_delay(attempt, rng=random):
+        """
+        Seconds to wait before the next try after `attempt` sends.
+
+        Doubles from SMS_RETRY_BASE_DELAY up to SMS_RETRY_MAX_DELAY, with the
+        upper half randomized so failures from one outage do not retry in step.
+        """
+        base = getattr(settings, 'SMS_RETRY_BASE_DELAY', 30)
+        cap = getattr(settings, 'SMS_RETRY_MAX_DELAY', 3600)
+        delay = min(cap, base * 2 ** max(0, attempt - 1))
+        return delay / 2 + rng.uniform(0, delay / 2)
+
+    @staticmethod
+    def outcome(result, attempts, now=None):
+        """
+        Log status for a send result after `attempts` sends.
+
+        Returns:
+            tuple: (status, next_retry_at)
+        """
+        if result.success:
+            return 'success', None
+        if not result.transient:
+            return 'failure', None
+        if attempts >= getattr(settings, 'SMS_RETRY_MAX_ATTEMPTS', 5):
+            return 'dead', None
+        now = now or timezone.now()
+        return 'retrying', now + timedelta(seconds=SMSRetryService.backoff_delay(attempts))
+
+    @staticmethod
+    def enqueue(messages, now=None):
+        """
+        Queue (tenant, message) pairs for the worker to send, as retrying
+        logs that are due immediately and have not been attempted yet.
+
+        Returns:
+            int: number of messages queued
+        """
+        now = now or timezone.now()
+        logs = [
+            SMSLog(tenant=tenant, message=message, status='retrying', attempts=0, next_retry_at=now)
+            for tenant, message in messages
+        ]
+        with transaction.atomic():
+            SMSLog.objects.bulk_create(logs)
+            SMSStatisticsService.increment(log_day(now), '', 'retrying', len(logs))
+        return len(logs)
+
+    @staticmethod
+    def claim_due(limit=100, now=None):
+        """
+        Claim retries that are due by pushing their next_retry_at forward.
+
+        The conditional update means a row is only handed to one worker.
+        """
+        now = now or timezone.now()
+        due = list(
+            SMSLog.objects.filter(status='retrying', next_retry_at__lte=now)
+            .select_related('tenant')
+            .order_by('next_retry_at')[:limit]
+        )
+        claimed = []
+        for log in due:
+            if SMSLog.objects.filter(
+                pk=log.pk, status='retrying', next_retry_at=log.next_retry_at
+            ).update(next_retry_at=now + CLAIM_TIMEOUT):
+                claimed.append(log)
+        return claimed
+
+    @staticmethod
+    def process_due(limit=100, router=None, now=None):
+        """
+        Resend due messages.
+
+        Returns:
+            dict: counts of success, retrying, dead and failure outcomes
+        """
+        if router is None:
+            from .sms_router import get_sms_router
+            router = get_sms_router()
+
+        totals = {'success': 0, 'retrying': 0, 'dead': 0, 'failure': 0}
+        for log in SMSRetryService.claim_due(limit, now):
+            tenant = log.tenant
+            result, attempts = router.deliver(tenant.phone_e164 or tenant.phone, log.message)
+            status, next_retry_at = SMSRetryService.outcome(result, log.attempts + 1)
+
+            response_data = dict(result.response_data or {})
+            if len(attempts) > 1:
+                response_data['attempts'] = attempts
+            with transaction.atomic():
+                SMSLog.objects.filter(pk=log.pk).update(
+                    status=status,
+                    provider=result.provider,
+                    provider_message_id=result.provider_message_id or '',
+                    attempts=F('attempts') + 1,
+                    next_retry_at=next_retry_at,
+                    response_data=response_data,
+                )
+                SMSStatisticsService.move(log_day(log.sent_at), log.provider, 'retrying', result.provider, status)
+            totals[status] += 1
+        return totals
+
+    @staticmethod
+    def retry_dead_letters(queryset=None, now=None):
+        """
+        Put dead messages back in the retry queue with a fresh retry budget.
+
+        Returns:
+            int: number of messages requeued
+        """
+        queryset = SMSLog.objects.all() if queryset is None else queryset
+        with transaction.atomic():
+            dead = queryset.filter(status='dead').select_for_update()
+            deltas = defaultdict(int)
+            for sent_at, provider in dead.values_list('sent_at', 'provider'):
+                deltas[(log_day(sent_at), provider, 'dead')] -= 1
+                deltas[(log_day(sent_at), provider, 'retrying')] += 1
+            requeued = SMSLog.objects.filter(pk__in=dead.values('pk')).update(
+                status='retrying',
+                attempts=0,
+                next_retry_at=now or timezone.now(),
+            )
+            SMSStatisticsService.apply_deltas(deltas)
+        return requeued
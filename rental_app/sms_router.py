@@ -0,0 +1,262 @@
+"""
+SMS provider router for Rental Management System
+
+Sends through the providers listed in settings.SMS_PROVIDERS in order and
+fails over to the next one when a send fails. Each provider has a circuit
+breaker: after repeated transient failures (timeouts, 5xx, throttling) it
+opens and the provider is skipped until SMS_BREAKER_RESET_TIMEOUT has passed,
+so an outage costs one short timeout instead of one per message.
+
+Breaker and health state live in the process, shared by all requests served
+by a worker through get_sms_router().
+"""
+
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+from .provider_registry import get_provider
+from .sms_providers import SendResult, TenantMessagesMixin, log_sms, send_outcome
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive transient failures,
+    or when the transient failure rate over the recent window reaches
+    `error_rate_threshold`. open -> half_open after `reset_timeout` seconds,
+    letting a single probe through; the probe closes or re-opens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=3, reset_timeout=60, error_rate_threshold=0.5,
+                 min_samples=10, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.error_rate_threshold = error_rate_threshold
+        self.min_samples = min_samples
+        self.clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a request may be sent now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            # Half open: one probe at a time
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def release(self):
+        """Give back a half-open probe slot that was not used"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def record_failure(self, error_rate=0.0, samples=0):
+        """Record a transient failure; error_rate/samples come from ProviderHealth"""
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probing = False
+            if (self.state == self.HALF_OPEN
+                    or self.consecutive_failures >= self.failure_threshold
+                    or (samples >= self.min_samples and error_rate >= self.error_rate_threshold)):
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+
+class ProviderHealth:
+    """Rolling error rate and latency for one provider"""
+
+    def __init__(self, window=50):
+        self._outcomes = deque(maxlen=window)   # (success, transient, latency)
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+
+    def record(self, result):
+        with self._lock:
+            self._outcomes.append((result.success, result.transient, result.latency))
+            self.sent += 1
+            if not result.success:
+                self.failed += 1
+
+    def snapshot(self):
+        with self._lock:
+            outcomes = list(self._outcomes)
+            sent, failed = self.sent, self.failed
+        samples = len(outcomes)
+        latencies = sorted(latency for _, _, latency in outcomes)
+        return {
+            'samples': samples,
+            'sent': sent,
+            'failed': failed,
+            'error_rate': (sum(1 for ok, _, _ in outcomes if not ok) / samples) if samples else 0.0,
+            'transient_error_rate': (sum(1 for _, t, _ in outcomes if t) / samples) if samples else 0.0,
+            'avg_latency': (sum(latencies) / samples) if samples else 0.0,
+            'p95_latency': latencies[min(samples - 1, int(samples * 0.95))] if samples else 0.0,
+        }
+
+
+class SMSRouter(TenantMessagesMixin):
+    """Send through the first healthy provider, failing over in order"""
+
+    def __init__(self, providers=None, clock=time.monotonic, limiter=None):
+        if providers is None:
+            names = getattr(settings, 'SMS_PROVIDERS', ['smsmobile', 'africastalking'])
+            providers = [get_provider(name) for name in names]
+        self.providers = list(providers)
+        self.clock = clock
+        self.limiter = limiter
+        self.breakers = {
+            provider.name: CircuitBreaker(
+                failure_threshold=getattr(settings, 'SMS_BREAKER_FAILURE_THRESHOLD', 3),
+                reset_timeout=getattr(settings, 'SMS_BREAKER_RESET_TIMEOUT', 60),
+                error_rate_threshold=getattr(settings, 'SMS_BREAKER_ERROR_RATE', 0.5),
+                clock=clock,
+            )
+            for provider in self.providers
+        }
+        self.health = {provider.name: ProviderHealth() for provider in self.providers}
+
+    def deliver(self, phone_number, message_text):
+        """
+        Try each configured provider whose breaker is closed.
+
+        Returns:
+            tuple: (SendResult of the last attempt, list of attempt dicts)
+        """
+        attempts = []
+        result = None
+        for provider in self.providers:
+            if not provider.is_configured():
+                continue
+            breaker = self.breakers[provider.name]
+            if not breaker.allow():
+                attempts.append({'provider': provider.name, 'skipped': 'circuit open'})
+                continue
+            if not provider.acquire_send_slot(self.limiter):
+                # Queue for this provider is too long; try the next one
+                breaker.release()
+                attempts.append({'provider': provider.name, 'skipped': 'rate limited'})
+                continue
+
+            started = self.clock()
+            try:
+                result = provider.deliver(phone_number, message_text)
+            except Exception as e:
+                result = SendResult(False, f"Unexpected error: {str(e)}", {'error': str(e)}, transient=True)
+            result.provider = provider.name
+            result.latency = self.clock() - started
+
+            health = self.health[provider.name]
+            health.record(result)
+            if result.transient:
+                snapshot = health.snapshot()
+                breaker.record_failure(snapshot['transient_error_rate'], snapshot['samples'])
+            else:
+                # A definite answer (even a rejection) means the provider is reachable
+                breaker.record_success()
+
+            attempts.append({
+                'provider': provider.name,
+                'success': result.success,
+                'transient': result.transient,
+                'latency_ms': round(result.latency * 1000, 1),
+                'message': result.message,
+            })
+            if result.success:
+                break
+
+        if result is None:
+            # Nothing was attempted: all unconfigured, circuits open or rate limited
+            any_open = any('skipped' in attempt for attempt in attempts)
+            result = SendResult(
+                False,
+                "All SMS providers are temporarily unavailable" if any_open else "No SMS provider configured",
+                transient=any_open,
+            )
+        elif not result.success:
+            # Worth retrying later if any provider failed transiently or was skipped
+            result.transient = any(
+                attempt.get('transient') or 'skipped' in attempt for attempt in attempts
+            )
+        return result, attempts
+
+    def send_sms(self, phone_number, message_text, tenant=None):
+        """
+        Send with failover and write a single log row; transient failures
+        are left for the retry worker.
+
+        Returns:
+            tuple: (success: bool, message: str)
+        """
+        result, attempts = self.deliver(phone_number, message_text)
+        log = None
+        if tenant:
+            response_data = dict(result.response_data or {})
+            if len(attempts) > 1:
+                response_data['attempts'] = attempts
+            log = log_sms(tenant, message_text, result, response_data)
+        return send_outcome(result, log)
+
+    def status(self):
+        """Breaker state and health for each provider, for display"""
+        rows = []
+        for provider in self.providers:
+            row = self.health[provider.name].snapshot()
+            row.update({
+                'provider': provider.name,
+                'configured': provider.is_configured(),
+                'circuit': self.breakers[provider.name].state,
+            })
+            rows.append(row)
+        return rows
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_sms_router():
+    """The process-wide router, so breaker state persists between requests"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = SMSRouter()
+    return _router
+
+
+def reset_sms_router():
+    """Drop the shared router (settings changes, tests)"""
+    global _router
+    with _router_lock:
+        _router = None
+
+
+def forget_router_after_fork():
+    """Start a forked child with its own router and an unlocked lock"""
+    global _router, _router_lock
+    _router_lock = threading.Lock()
+    _router = None
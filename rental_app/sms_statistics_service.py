@@ -0,0 +1,162 @@
+"""
+SMS statistics for Rental Management System
+
+SMSDailyCounter holds running totals per (day, provider, status). Every
+code path that writes or changes an SMSLog status adjusts the counters in
+the same transaction, so statistics for any date range are a SUM over at
+most a few rows per day instead of COUNTs over the whole log table, and
+they are unaffected by retention deleting old logs.
+"""
+
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import SMSDailyCounter, SMSLog, SMSLogDailySummary
+
+LOG_STATUSES = ('success', 'failure', 'retrying', 'dead')
+# SMSLog.delivery_status values that are counted, and their counter status
+DELIVERY_COUNTER_STATUSES = {
+    'delivered': 'delivered',
+    'failed': 'undelivered',
+}
+
+
+def log_day(sent_at=None):
+    """Counter day for a log sent at `sent_at` (default: now)"""
+    return timezone.localdate(sent_at) if sent_at else timezone.localdate()
+
+
+class SMSStatisticsService:
+    """Counter updates and date-range statistics for SMS"""
+
+    @staticmethod
+    def increment(day, provider, status, amount=1):
+        """Add `amount` (may be negative) to one counter; call inside the log write's transaction"""
+        if not amount:
+            return
+        provider = provider or ''
+        counters = SMSDailyCounter.objects.filter(day=day, provider=provider, status=status)
+        if counters.update(count=F('count') + amount):
+            return
+        try:
+            with transaction.atomic():
+                SMSDailyCounter.objects.create(day=day, provider=provider, status=status, count=amount)
+        except IntegrityError:
+            # Another worker created it first
+            counters.update(count=F('count') + amount)
+
+    @staticmethod
+    def apply_deltas(deltas):
+        """Apply {(day, provider, status): amount} collected for a batch"""
+        for (day, provider, status), amount in deltas.items():
+            SMSStatisticsService.increment(day, provider, status, amount)
+
+    @staticmethod
+    def move(day, old_provider, old_status, new_provider, new_status):
+        """A log changed status (and maybe provider), e.g. retrying -> success"""
+        if (old_provider or '') == (new_provider or '') and old_status == new_status:
+            return
+        deltas = defaultdict(int)
+        deltas[(day, old_provider or '', old_status)] -= 1
+        deltas[(day, new_provider or '', new_status)] += 1
+        SMSStatisticsService.apply_deltas(deltas)
+
+    @staticmethod
+    def totals(start=None, end=None, provider=None):
+        """
+        Counter sums per status for a date range (inclusive).
+
+        Returns:
+            dict: {status: count}
+        """
+        counters = SMSDailyCounter.objects.all()
+        if start:
+            counters = counters.filter(day__gte=start)
+        if end:
+            counters = counters.filter(day__lte=end)
+        if provider is not None:
+            counters = counters.filter(provider=provider)
+        return {
+            row['status']: row['total']
+            for row in counters.order_by().values('status').annotate(total=Sum('count'))
+        }
+
+    @staticmethod
+    def summary(start=None, end=None, provider=None):
+        """
+        Totals and rates for a date range, in the shape the SMS logs page uses.
+
+        Returns:
+            dict: total_sent, success_count, failure_count, retrying_count,
+                  dead_count, delivered_count, undelivered_count,
+                  success_rate, delivery_rate
+        """
+        return SMSStatisticsService._summarize(defaultdict(int, SMSStatisticsService.totals(start, end, provider)))
+
+    @staticmethod
+    def summary_for_landlord(user):
+        """
+        summary() for one landlord's tenants, in two queries.
+
+        The counters are system-wide, so this counts the landlord's raw logs
+        and adds the SMSLogDailySummary rows retention folded theirs into.
+        """
+        logs = SMSLog.objects.filter(tenant__property__landlord=user).order_by()
+        totals = logs.aggregate(
+            **{status: Count('pk', filter=Q(status=status)) for status in LOG_STATUSES},
+            **{counter: Count('pk', filter=Q(delivery_status=status)) for status, counter in DELIVERY_COUNTER_STATUSES.items()},
+        )
+        rolled_up = SMSLogDailySummary.objects.filter(tenant__property__landlord=user).order_by().aggregate(
+            **{status: Sum('count', filter=Q(status=status)) for status in LOG_STATUSES},
+            **{counter: Sum('count', filter=Q(delivery_status=status)) for status, counter in DELIVERY_COUNTER_STATUSES.items()},
+        )
+        for key, count in rolled_up.items():
+            totals[key] += count or 0
+        return SMSStatisticsService._summarize(defaultdict(int, totals))
+
+    @staticmethod
+    def _summarize(totals):
+        """Rates and the summary() shape from {status: count}"""
+        success = totals['success']
+        failure = totals['failure'] + totals['dead']
+        total_sent = success + failure + totals['retrying']
+        delivered = totals['delivered']
+        undelivered = totals['undelivered']
+
+        success_rate = (success / total_sent * 100) if total_sent else 0
+        # Share of messages with a final delivery report that reached the handset
+        reported = delivered + undelivered
+        delivery_rate = (delivered / reported * 100) if reported else 0
+
+        return {
+            'total_sent': total_sent,
+            'success_count': success,
+            'failure_count': failure,
+            'retrying_count': totals['retrying'],
+            'dead_count': totals['dead'],
+            'delivered_count': delivered,
+            'undelivered_count': undelivered,
+            'success_rate': round(success_rate, 2),
+            'delivery_rate': round(delivery_rate, 2),
+        }
+
+    @staticmethod
+    def by_provider(start=None, end=None):
+        """
+        Per-provider totals for a date range.
+
+        Returns:
+            dict: {provider: {status: count}}
+        """
+        counters = SMSDailyCounter.objects.all()
+        if start:
+            counters = counters.filter(day__gte=start)
+        if end:
+            counters = counters.filter(day__lte=end)
+        result = defaultdict(dict)
+        for row in counters.order_by().values('provider', 'status').annotate(total=Sum('count')):
+            result[row['provider']][row['status']] = row['total']
+        return dict(result)
@@ -1,10 +1,12 @@
 from django.urls import path
-from . import views
+from . import views, api
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('tenants/', views.tenant_list, name='tenant_list'),
     path('tenants/add/', views.add_tenant, name='add_tenant'),
+    path('tenants/search/', views.tenant_search, name='tenant_search'),
+    path('tenants/import/', views.import_tenants, name='import_tenants'),
     path('tenants/<uuid:tenant_id>/edit/', views.edit_tenant, name='edit_tenant'),
     path('tenants/<uuid:tenant_id>/delete/', views.delete_tenant, name='delete_tenant'),
     path('tenants/<uuid:tenant_id>/mark-paid/', views.mark_rent_paid, name='mark_rent_paid'),
@@ -12,6 +14,7 @@ urlpatterns = [
     path('tenants/<uuid:tenant_id>/partial-payment/', views.add_partial_payment, name='add_partial_payment'),
     path('payments/', views.payment_history, name='payment_history'),
     path('payments/add/', views.add_payment, name='add_payment'),
+    path('payments/import/', views.import_payments, name='import_payments'),
     path('payments/<uuid:payment_id>/delete/', views.delete_payment, name='delete_payment'),
     path('analytics/', views.analytics, name='analytics'),
     path('records/', views.record_management, name='record_management'),
@@ -22,4 +25,11 @@ urlpatterns = [
     path('sms/', views.sms_logs, name='sms_logs'),
     path('sms/send-custom/<uuid:tenant_id>/', views.send_custom_sms, name='send_custom_sms'),
     path('sms/bulk-reminder/', views.bulk_sms_reminder, name='bulk_sms_reminder'),
+    path('sms/retry-dead/', views.retry_dead_sms, name='retry_dead_sms'),
+    path('sms/delivery-report/', views.sms_delivery_report, name='sms_delivery_report'),
+    path('mpesa/callback/', views.mpesa_callback, name='mpesa_callback'),
+    path('api/tenants/', api.tenants, name='api_tenants'),
+    path('api/payments/', api.payments, name='api_payments'),
+    path('api/sms-logs/', api.sms_logs, name='api_sms_logs'),
+    path('api/analytics/summary/', api.analytics_summary, name='api_analytics_summary'),
 ]
@@ -1,26 +1,68 @@
+import hmac
+import io
+import json
+
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import JsonResponse, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import timedelta
-from .models import Tenant, Payment
-from .forms import TenantForm, PaymentForm
-from .sms_service import SMSMobileService
+from .models import Property, Tenant, Payment, SMSLog
+from .forms import (
+    TenantForm, PaymentForm, StatementUploadForm, TenantUploadForm, BulkTenantFilterForm, BulkPaymentFilterForm,
+)
+from .sms_router import get_sms_router
+from .sms_retry_service import SMSRetryService
+from .delivery_report_service import DeliveryReportService
+from .payment_service import PaymentService, to_decimal
+from .mpesa_service import MpesaService
+from .importers import PaymentStatementImporter, TenantImporter, TenantIndex
+from .message_templates import templates
 from .analytics import AnalyticsService
+from .sms_statistics_service import SMSStatisticsService
+from .search_service import TenantSearchService
+from .conditional import conditional_page, fingerprint
+from .data_version import DataVersion
+from .bulk_service import (
+    BulkActionService, TooManySelected, selected, CHUNK_SIZE, MAX_SELECTED_IDS, PREVIEW_LIMIT, REMINDER_TYPES,
+)
+
+
+def tenants_version(request):
+    # Tenant rows show their property's name
+    return [
+        fingerprint(Tenant.objects.for_user(request.user)),
+        fingerprint(Property.objects.for_user(request.user)),
+    ]
+
+
+def payments_version(request):
+    # Payment rows show tenant names, so tenant edits count too
+    return [tenants_version(request), fingerprint(Payment.objects.for_user(request.user))]
+
+
+def dashboard_version(request):
+    # Monthly income and overdue counts also move with the calendar
+    return [timezone.localdate(), payments_version(request)]
 
 
 @login_required
+@conditional_page(dashboard_version)
 def dashboard(request):
     """Main dashboard view"""
-    tenants = Tenant.objects.all()
-    analytics = AnalyticsService.get_tenant_analytics()
-    monthly_income = AnalyticsService.get_monthly_income()
-    overdue_tenants = AnalyticsService.get_overdue_tenants()[:5]
+    tenants = Tenant.objects.for_user(request.user)
+    analytics = AnalyticsService.get_tenant_analytics(user=request.user)
+    monthly_income = AnalyticsService.get_monthly_income(user=request.user)
+    overdue_tenants = AnalyticsService.get_overdue_tenants(user=request.user)[:5]
     
     # Recent payments
-    recent_payments = Payment.objects.select_related('tenant').order_by('-date')[:5]
+    recent_payments = Payment.objects.for_user(request.user).select_related('tenant').order_by('-date')[:5]
     
     context = {
         'tenants': tenants,
@@ -28,45 +70,107 @@ def dashboard(request):
         'analytics': analytics,
         'monthly_income': monthly_income,
         'overdue_tenants': overdue_tenants,
+        # Cache keys for the tenant table and recent payments fragments
+        'data_version': DataVersion.get(),
     }
     return render(request, 'rental_app/dashboard.html', context)
 
 
 @login_required
+@conditional_page(tenants_version)
 def tenant_list(request):
-    """List all tenants"""
-    tenants = Tenant.objects.all()
-    return render(request, 'rental_app/tenant_list.html', {'tenants': tenants})
+    """List the tenants in the user's properties, optionally filtered by a search"""
+    query = request.GET.get('q', '').strip()
+    tenants = Tenant.objects.for_user(request.user).select_related('property')
+    if query:
+        tenants = TenantSearchService.filter(tenants, query)
+    return render(request, 'rental_app/tenant_list.html', {'tenants': tenants, 'query': query})
+
+
+@login_required
+def tenant_search(request):
+    """Typeahead: top matches by name, apartment or phone as JSON"""
+    tenants = TenantSearchService.search(request.GET.get('q', ''), user=request.user)
+    return JsonResponse({
+        'results': [
+            {
+                'id': str(tenant.id),
+                'name': tenant.name,
+                'apartment_number': tenant.apartment_number,
+                'phone': tenant.phone,
+                'property': tenant.property.name if tenant.property else '',
+                'rent_status': tenant.rent_status,
+                'amount_due': str(tenant.amount_due),
+                'url': reverse('edit_tenant', args=[tenant.id]),
+            }
+            for tenant in tenants
+        ]
+    })
 
 
 @login_required
 def add_tenant(request):
     """Add a new tenant"""
     if request.method == 'POST':
-        form = TenantForm(request.POST)
+        form = TenantForm(request.POST, user=request.user)
         if form.is_valid():
             form.save()
             messages.success(request, 'Tenant added successfully!')
             return redirect('tenant_list')
     else:
-        form = TenantForm()
+        form = TenantForm(user=request.user)
     
     return render(request, 'rental_app/tenant_form.html', {'form': form, 'title': 'Add Tenant'})
 
 
+@login_required
+def import_tenants(request):
+    """Onboard tenants in bulk from an uploaded CSV or XLSX file"""
+    report = None
+    
+    if request.method == 'POST':
+        form = TenantUploadForm(request.POST, request.FILES, user=request.user)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            importer = TenantImporter(
+                dry_run=form.cleaned_data['dry_run'],
+                skip_invalid=form.cleaned_data['skip_invalid'],
+                property=form.cleaned_data['property']
+            )
+            if upload.name.lower().endswith(('.xlsx', '.xlsm')):
+                fileobj = upload.file
+            else:
+                fileobj = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            try:
+                report = importer.run(fileobj, filename=upload.name)
+            except (ValueError, UnicodeDecodeError) as e:
+                messages.error(request, f'Could not import tenants: {e}')
+            else:
+                if report.invalid_rows and not importer.skip_invalid:
+                    messages.error(request, f'{report.invalid_rows} rows have errors. No tenants were created.')
+                elif report.dry_run:
+                    messages.info(request, f'Dry run: {report.created} tenants would be created.')
+                else:
+                    messages.success(request, f'Created {report.created} tenants.')
+    else:
+        form = TenantUploadForm(user=request.user)
+    
+    return render(request, 'rental_app/import_tenants.html', {'form': form, 'report': report})
+
+
 @login_required
 def edit_tenant(request, tenant_id):
     """Edit an existing tenant"""
-    tenant = get_object_or_404(Tenant, id=tenant_id)
+    tenant = get_object_or_404(Tenant.objects.for_user(request.user), id=tenant_id)
     
     if request.method == 'POST':
-        form = TenantForm(request.POST, instance=tenant)
+        form = TenantForm(request.POST, instance=tenant, user=request.user)
         if form.is_valid():
             form.save()
             messages.success(request, 'Tenant updated successfully!')
             return redirect('tenant_list')
     else:
-        form = TenantForm(instance=tenant)
+        form = TenantForm(instance=tenant, user=request.user)
     
     return render(request, 'rental_app/tenant_form.html', {'form': form, 'title': 'Edit Tenant'})
 
@@ -74,7 +178,7 @@ def edit_tenant(request, tenant_id):
 @login_required
 def delete_tenant(request, tenant_id):
     """Delete a tenant"""
-    tenant = get_object_or_404(Tenant, id=tenant_id)
+    tenant = get_object_or_404(Tenant.objects.for_user(request.user), id=tenant_id)
     
     if request.method == 'POST':
         tenant.delete()
@@ -87,22 +191,14 @@ def delete_tenant(request, tenant_id):
 @login_required
 def mark_rent_paid(request, tenant_id):
     """Mark rent as paid and send confirmation"""
-    tenant = get_object_or_404(Tenant, id=tenant_id)
+    tenant = get_object_or_404(Tenant.objects.for_user(request.user), id=tenant_id)
     
-    if tenant.rent_status == 'Unpaid':
-        tenant.rent_status = 'Paid'
-        tenant.save()
-        
-        # Create payment record
-        Payment.objects.create(
-            tenant=tenant,
-            amount=tenant.rent_amount,
-            status='Paid'
-        )
-        
+    # Claims the Unpaid -> Paid transition and creates the payment record atomically
+    payment = PaymentService.mark_rent_paid(tenant)
+    
+    if payment:
         # Send SMS confirmation
-        sms = SMSMobileService()
-        success, message = sms.send_rent_confirmation(tenant)
+        success, message = get_sms_router().send_rent_confirmation(tenant)
         
         if success:
             messages.success(request, f'Rent marked as paid and SMS confirmation sent to {tenant.name}!')
@@ -117,10 +213,9 @@ def mark_rent_paid(request, tenant_id):
 @login_required
 def send_reminder(request, tenant_id):
     """Send SMS reminder to tenant"""
-    tenant = get_object_or_404(Tenant, id=tenant_id)
+    tenant = get_object_or_404(Tenant.objects.for_user(request.user), id=tenant_id)
     
-    sms = SMSMobileService()
-    success, message = sms.send_rent_reminder(tenant)
+    success, message = get_sms_router().send_rent_reminder(tenant)
     
     if success:
         messages.success(request, f'SMS reminder sent to {tenant.name}!')
@@ -131,9 +226,10 @@ def send_reminder(request, tenant_id):
 
 
 @login_required
+@conditional_page(payments_version)
 def payment_history(request):
     """View payment history"""
-    payments = Payment.objects.select_related('tenant').order_by('-date')
+    payments = Payment.objects.for_user(request.user).select_related('tenant').order_by('-date')
     return render(request, 'rental_app/payment_history.html', {'payments': payments})
 
 
@@ -141,20 +237,46 @@ def payment_history(request):
 def add_payment(request):
     """Add a manual payment record"""
     if request.method == 'POST':
-        form = PaymentForm(request.POST)
+        form = PaymentForm(request.POST, user=request.user)
         if form.is_valid():
-            payment = form.save()
-            # Update tenant amount due if payment is marked as paid
-            if payment.status == 'Paid':
-                payment.tenant.add_payment(payment.amount)
+            # Saves the payment and updates tenant amount due in one transaction
+            PaymentService.save_payment_form(form)
             messages.success(request, 'Payment recorded successfully!')
             return redirect('payment_history')
     else:
-        form = PaymentForm()
+        form = PaymentForm(user=request.user)
     
     return render(request, 'rental_app/payment_form.html', {'form': form})
 
 
+@login_required
+def import_payments(request):
+    """Import payments from an uploaded M-Pesa statement or bank CSV"""
+    report = None
+    
+    if request.method == 'POST':
+        form = StatementUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            # Stream the upload instead of reading it into memory
+            stream = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            try:
+                report = PaymentStatementImporter(
+                    dry_run=form.cleaned_data['dry_run'],
+                    tenant_index=TenantIndex(Tenant.objects.for_user(request.user))
+                ).run(stream)
+            except (ValueError, UnicodeDecodeError) as e:
+                messages.error(request, f'Could not import statement: {e}')
+            else:
+                if report.dry_run:
+                    messages.info(request, f'Dry run: {report.imported} payments would be imported.')
+                else:
+                    messages.success(request, f'Imported {report.imported} payments (KSh {report.total_amount}).')
+    else:
+        form = StatementUploadForm()
+    
+    return render(request, 'rental_app/import_payments.html', {'form': form, 'report': report})
+
+
 @login_required
 def analytics(request):
     """Analytics dashboard"""
@@ -168,11 +290,13 @@ def analytics(request):
         year = timezone.now().year
         month = timezone.now().month
     
-    tenant_analytics = AnalyticsService.get_tenant_analytics()
-    monthly_income = AnalyticsService.get_monthly_income(year, month)
-    yearly_income = AnalyticsService.get_yearly_income(year)
-    payment_trends = AnalyticsService.get_payment_trends(30)
-    overdue_tenants = AnalyticsService.get_overdue_tenants()
+    tenant_analytics = AnalyticsService.get_tenant_analytics(user=request.user)
+    monthly_income = AnalyticsService.get_monthly_income(year, month, user=request.user)
+    yearly_income = AnalyticsService.get_yearly_income(year, user=request.user)
+    payment_trends = AnalyticsService.get_payment_trends(30, user=request.user)
+    overdue_tenants = AnalyticsService.get_overdue_tenants(user=request.user)
+    # History is not scoped to properties, so only superusers see record activity
+    record_activity = AnalyticsService.get_record_activity(year, month) if request.user.is_superuser else None
     
     context = {
         'tenant_analytics': tenant_analytics,
@@ -180,6 +304,7 @@ def analytics(request):
         'yearly_income': yearly_income,
         'payment_trends': payment_trends,
         'overdue_tenants': overdue_tenants,
+        'record_activity': record_activity,
         'current_year': year,
         'current_month': month,
     }
@@ -189,31 +314,27 @@ def analytics(request):
 @login_required
 def add_partial_payment(request, tenant_id):
     """Add a partial payment for a specific tenant"""
-    tenant = get_object_or_404(Tenant, id=tenant_id)
+    tenant = get_object_or_404(Tenant.objects.for_user(request.user), id=tenant_id)
     
     if request.method == 'POST':
         amount = request.POST.get('amount')
         notes = request.POST.get('notes', '')
         
         try:
-            amount = float(amount)
+            amount = to_decimal(amount)
             if amount > 0:
-                # Create payment record
-                Payment.objects.create(
-                    tenant=tenant,
-                    amount=amount,
+                # Create payment record and update tenant amount due
+                PaymentService.record_payment(
+                    tenant,
+                    amount,
                     payment_type='Partial',
-                    status='Paid',
                     notes=notes
                 )
                 
-                # Update tenant amount due
-                tenant.add_payment(amount)
-                
                 messages.success(request, f'Partial payment of KSh {amount} recorded for {tenant.name}!')
             else:
                 messages.error(request, 'Payment amount must be greater than 0.')
-        except (ValueError, TypeError):
+        except (ValueError, TypeError, ArithmeticError):
             messages.error(request, 'Invalid payment amount.')
         
         return redirect('tenant_list')
@@ -224,16 +345,19 @@ def add_partial_payment(request, tenant_id):
 @login_required
 def record_management(request):
     """Record management dashboard"""
+    tenants = Tenant.objects.for_user(request.user)
+    payments = Payment.objects.for_user(request.user)
+    
     # Get statistics
-    total_tenants = Tenant.objects.count()
-    total_payments = Payment.objects.count()
+    total_tenants = tenants.count()
+    total_payments = payments.count()
     
     # Get recent records
-    recent_tenants = Tenant.objects.order_by('-created_at')[:10]
-    recent_payments = Payment.objects.select_related('tenant').order_by('-date')[:10]
+    recent_tenants = tenants.order_by('-created_at')[:10]
+    recent_payments = payments.select_related('tenant').order_by('-date')[:10]
     
     # Get overdue tenants
-    overdue_tenants = Tenant.objects.filter(rent_status='Overdue')[:5]
+    overdue_tenants = tenants.filter(rent_status='Overdue')[:5]
     
     context = {
         'total_tenants': total_tenants,
@@ -245,71 +369,101 @@ def record_management(request):
     return render(request, 'rental_app/record_management.html', context)
 
 
+def bulk_matches(request, queryset, form_class):
+    """The filter form from the query string and the rows it matches"""
+    filter_form = form_class(request.GET or None, user=request.user)
+    if not filter_form.is_bound:
+        return filter_form, queryset
+    if not filter_form.is_valid():
+        return filter_form, queryset.none()
+    return filter_form, filter_form.filter(queryset)
+
+
+def bulk_target(request, queryset, filter_form, matching, ids_field):
+    """
+    The rows a bulk action POST applies to: everything matching the filter
+    for scope=filter, else the explicitly selected ids. None if there are
+    none, including scope=filter without any filter applied.
+    Raises TooManySelected for oversized selections.
+    """
+    if request.POST.get('scope') == 'filter':
+        return matching if filter_form.has_filters() else None
+    ids = request.POST.getlist(ids_field)
+    if not ids:
+        return None
+    return selected(queryset, ids)
+
+
+def bulk_context(filter_form, matching, **extra):
+    return {
+        'filter_form': filter_form,
+        'match_count': matching.count(),
+        'preview_limit': PREVIEW_LIMIT,
+        'max_selected': MAX_SELECTED_IDS,
+        **extra,
+    }
+
+
 @login_required
 def bulk_delete_tenants(request):
-    """Bulk delete tenants"""
+    """Bulk delete tenants matching a filter or selected by hand"""
+    tenants = Tenant.objects.for_user(request.user)
+    filter_form, matching = bulk_matches(request, tenants, BulkTenantFilterForm)
+    
     if request.method == 'POST':
-        tenant_ids = request.POST.getlist('tenant_ids')
-        if tenant_ids:
-            deleted_count = 0
-            for tenant_id in tenant_ids:
-                try:
-                    tenant = Tenant.objects.get(id=tenant_id)
-                    tenant.delete()
-                    deleted_count += 1
-                except Tenant.DoesNotExist:
-                    continue
-            
+        try:
+            target = bulk_target(request, tenants, filter_form, matching, 'tenant_ids')
+        except TooManySelected as e:
+            messages.error(request, str(e))
+            return redirect(request.get_full_path())
+        if target is not None:
+            deleted_count = BulkActionService.delete_tenants(target)
             messages.success(request, f'Successfully deleted {deleted_count} tenants.')
         else:
             messages.warning(request, 'No tenants selected for deletion.')
         
         return redirect('record_management')
     
-    # Get tenants for selection
-    tenants = Tenant.objects.all()
-    return render(request, 'rental_app/bulk_delete_tenants.html', {'tenants': tenants})
+    context = bulk_context(filter_form, matching, tenants=matching.order_by('name')[:PREVIEW_LIMIT])
+    return render(request, 'rental_app/bulk_delete_tenants.html', context)
 
 
 @login_required
 def bulk_delete_payments(request):
-    """Bulk delete payments"""
+    """Bulk delete payments matching a filter or selected by hand"""
+    payments = Payment.objects.for_user(request.user)
+    filter_form, matching = bulk_matches(request, payments, BulkPaymentFilterForm)
+    
     if request.method == 'POST':
-        payment_ids = request.POST.getlist('payment_ids')
-        if payment_ids:
-            deleted_count = 0
-            for payment_id in payment_ids:
-                try:
-                    payment = Payment.objects.get(id=payment_id)
-                    # Update tenant amount due before deleting payment
-                    payment.tenant.amount_due += payment.amount
-                    payment.tenant.update_status()
-                    payment.delete()
-                    deleted_count += 1
-                except Payment.DoesNotExist:
-                    continue
-            
+        try:
+            target = bulk_target(request, payments, filter_form, matching, 'payment_ids')
+        except TooManySelected as e:
+            messages.error(request, str(e))
+            return redirect(request.get_full_path())
+        if target is not None:
+            # Tenant balances are restored and payments deleted chunk by chunk
+            deleted_count = BulkActionService.delete_payments(target)
             messages.success(request, f'Successfully deleted {deleted_count} payments.')
         else:
             messages.warning(request, 'No payments selected for deletion.')
         
         return redirect('record_management')
     
-    # Get payments for selection
-    payments = Payment.objects.select_related('tenant').order_by('-date')
-    return render(request, 'rental_app/bulk_delete_payments.html', {'payments': payments})
+    context = bulk_context(
+        filter_form, matching,
+        payments=matching.select_related('tenant').order_by('-date')[:PREVIEW_LIMIT],
+    )
+    return render(request, 'rental_app/bulk_delete_payments.html', context)
 
 
 @login_required
 def delete_payment(request, payment_id):
     """Delete a single payment"""
-    payment = get_object_or_404(Payment, id=payment_id)
+    payment = get_object_or_404(Payment.objects.for_user(request.user), id=payment_id)
     
     if request.method == 'POST':
-        # Update tenant amount due before deleting payment
-        payment.tenant.amount_due += payment.amount
-        payment.tenant.update_status()
-        payment.delete()
+        # Update tenant amount due and delete payment atomically
+        PaymentService.delete_payment(payment)
         
         messages.success(request, 'Payment deleted successfully!')
         return redirect('payment_history')
@@ -324,7 +478,7 @@ def clear_old_payments(request):
         days = int(request.POST.get('days', 365))
         cutoff_date = timezone.now() - timedelta(days=days)
         
-        old_payments = Payment.objects.filter(date__lt=cutoff_date)
+        old_payments = Payment.objects.for_user(request.user).filter(date__lt=cutoff_date)
         count = old_payments.count()
         
         if count > 0:
@@ -353,7 +507,7 @@ def export_data(request):
     writer.writerow(['TENANTS DATA'])
     writer.writerow(['Name', 'Phone', 'Apartment', 'Rent Amount', 'Amount Due', 'Status', 'Due Date', 'Created'])
     
-    for tenant in Tenant.objects.all():
+    for tenant in Tenant.objects.for_user(request.user):
         writer.writerow([
             tenant.name,
             tenant.phone,
@@ -371,7 +525,7 @@ def export_data(request):
     writer.writerow(['PAYMENTS DATA'])
     writer.writerow(['Tenant', 'Amount', 'Type', 'Status', 'Date', 'Notes'])
     
-    for payment in Payment.objects.select_related('tenant').all():
+    for payment in Payment.objects.for_user(request.user).select_related('tenant'):
         writer.writerow([
             payment.tenant.name,
             payment.amount,
@@ -387,31 +541,45 @@ def export_data(request):
 @login_required
 def sms_logs(request):
     """View SMS logs"""
-    from .models import SMSLog
-    
     tenant_id = request.GET.get('tenant_id')
     if tenant_id:
-        tenant = get_object_or_404(Tenant, id=tenant_id)
+        tenant = get_object_or_404(Tenant.objects.for_user(request.user), id=tenant_id)
         sms_logs = SMSLog.objects.filter(tenant=tenant).order_by('-sent_at')
     else:
-        sms_logs = SMSLog.objects.select_related('tenant').order_by('-sent_at')
+        sms_logs = SMSLog.objects.for_user(request.user).select_related('tenant').order_by('-sent_at')
     
-    # Get SMS statistics
-    sms_service = SMSMobileService()
-    stats = sms_service.get_sms_statistics()
+    # Get SMS statistics; the daily counters are system-wide, so landlords get theirs from their logs and rollups
+    sms_router = get_sms_router()
+    if request.user.is_superuser:
+        stats = sms_router.get_sms_statistics()
+    else:
+        stats = SMSStatisticsService.summary_for_landlord(request.user)
     
     context = {
         'sms_logs': sms_logs,
         'stats': stats,
+        'provider_status': sms_router.status(),
         'selected_tenant': tenant if tenant_id else None,
     }
     return render(request, 'rental_app/sms_logs.html', context)
 
 
+@login_required
+@require_POST
+def retry_dead_sms(request):
+    """Requeue every dead-letter SMS for the retry worker"""
+    requeued = SMSRetryService.retry_dead_letters(SMSLog.objects.for_user(request.user))
+    if requeued:
+        messages.success(request, f'{requeued} failed SMS message(s) queued for retry.')
+    else:
+        messages.info(request, 'There are no dead-letter SMS messages to retry.')
+    return redirect('sms_logs')
+
+
 @login_required
 def send_custom_sms(request, tenant_id):
     """Send custom SMS to tenant"""
-    tenant = get_object_or_404(Tenant, id=tenant_id)
+    tenant = get_object_or_404(Tenant.objects.for_user(request.user), id=tenant_id)
     
     if request.method == 'POST':
         message = request.POST.get('message', '').strip()
@@ -420,8 +588,7 @@ def send_custom_sms(request, tenant_id):
             messages.error(request, 'Please enter a message.')
             return redirect('send_custom_sms', tenant_id=tenant_id)
         
-        sms = SMSMobileService()
-        success, result_message = sms.send_custom_message(tenant, message)
+        success, result_message = get_sms_router().send_custom_message(tenant, message)
         
         if success:
             messages.success(request, f'Custom SMS sent to {tenant.name}!')
@@ -435,42 +602,88 @@ def send_custom_sms(request, tenant_id):
 
 @login_required
 def bulk_sms_reminder(request):
-    """Send SMS reminders to multiple tenants"""
+    """Queue SMS reminders for tenants matching a filter or selected by hand"""
+    tenants = Tenant.objects.for_user(request.user).filter(rent_status__in=['Unpaid', 'Partial', 'Overdue'])
+    filter_form, matching = bulk_matches(request, tenants, BulkTenantFilterForm)
+    
     if request.method == 'POST':
-        tenant_ids = request.POST.getlist('tenant_ids')
         message_type = request.POST.get('message_type', 'rent_reminder')
-        
-        if not tenant_ids:
+        if message_type not in REMINDER_TYPES:
+            messages.error(request, 'Unknown reminder type.')
+            return redirect(request.get_full_path())
+        try:
+            target = bulk_target(request, tenants, filter_form, matching, 'tenant_ids')
+        except TooManySelected as e:
+            messages.error(request, str(e))
+            return redirect(request.get_full_path())
+        if target is None:
             messages.warning(request, 'No tenants selected.')
-            return redirect('bulk_sms_reminder')
-        
-        sms = SMSMobileService()
-        success_count = 0
-        failure_count = 0
-        
-        for tenant_id in tenant_ids:
-            try:
-                tenant = Tenant.objects.get(id=tenant_id)
-                
-                if message_type == 'rent_reminder':
-                    success, _ = sms.send_rent_reminder(tenant)
-                elif message_type == 'payment_reminder':
-                    success, _ = sms.send_payment_reminder(tenant, tenant.amount_due)
-                else:
-                    success = False
-                
-                if success:
-                    success_count += 1
-                else:
-                    failure_count += 1
-                    
-            except Tenant.DoesNotExist:
-                failure_count += 1
-                continue
+            return redirect(request.get_full_path())
         
-        messages.success(request, f'Bulk SMS completed: {success_count} sent, {failure_count} failed.')
-        return redirect('record_management')
+        # The process_sms_retries worker sends them; see the SMS logs for results
+        queued_count = BulkActionService.queue_reminders(target, message_type)
+        messages.success(request, f'Queued {queued_count} SMS reminders for sending.')
+        return redirect('sms_logs')
+    
+    # Billable segment preview for each message type, streamed over every match
+    segment_reports = {
+        message_type: templates.get(message_type).segment_report(matching.iterator(chunk_size=CHUNK_SIZE))
+        for message_type in REMINDER_TYPES
+    }
+    
+    context = bulk_context(
+        filter_form, matching,
+        tenants=matching.order_by('name')[:PREVIEW_LIMIT],
+        segment_reports=segment_reports,
+    )
+    return render(request, 'rental_app/bulk_sms_reminder.html', context)
+
+
+def webhook_token_valid(request, setting):
+    """
+    Whether ?token= matches the shared secret in `setting`. Fails closed:
+    an unset secret rejects every request.
+    """
+    expected = getattr(settings, setting, None)
+    if not expected:
+        return False
+    return hmac.compare_digest(request.GET.get('token', '').encode(), expected.encode())
+
+
+@csrf_exempt
+@require_POST
+def mpesa_callback(request):
+    """M-Pesa C2B confirmation / STK-push callback webhook"""
+    if not webhook_token_valid(request, 'MPESA_CALLBACK_TOKEN'):
+        return JsonResponse({'ResultCode': 1, 'ResultDesc': 'Unauthorized'}, status=403)
+    
+    try:
+        payload = json.loads(request.body)
+        MpesaService.ingest(payload)
+    except ValueError as e:
+        return JsonResponse({'ResultCode': 1, 'ResultDesc': f'Rejected: {e}'}, status=400)
+    
+    # Apply staged callbacks in micro-batches rather than one transaction per callback
+    if MpesaService.flush_due():
+        MpesaService.process_pending()
+    
+    return JsonResponse({'ResultCode': 0, 'ResultDesc': 'Accepted'})
+
+
+@csrf_exempt
+@require_POST
+def sms_delivery_report(request):
+    """Africa's Talking SMS delivery report webhook"""
+    if not webhook_token_valid(request, 'AFRICASTALKING_DLR_TOKEN'):
+        return HttpResponse('Unauthorized', status=403)
+    
+    try:
+        DeliveryReportService.ingest(request.POST)
+    except ValueError as e:
+        return HttpResponse(f'Rejected: {e}', status=400)
+    
+    # Apply staged reports in batches rather than one UPDATE per report
+    if DeliveryReportService.flush_due():
+        DeliveryReportService.process_pending()
     
-    # Get tenants for selection
-    tenants = Tenant.objects.filter(rent_status__in=['Unpaid', 'Partial', 'Overdue'])
-    return render(request, 'rental_app/bulk_sms_reminder.html', {'tenants': tenants})
+    return HttpResponse('OK')
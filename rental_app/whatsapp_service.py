@@ -1,25 +1,37 @@
 import requests
-import json
 from django.conf import settings
-from django.contrib import messages
+from .phone import normalize_phone
+from .sms_providers import SMSProvider, TRANSIENT_HTTP_STATUSES, provider_timeout
 
 
-class WhatsAppService:
+class WhatsAppService(SMSProvider):
+    name = 'whatsapp'
+
     def __init__(self):
         self.access_token = settings.WHATSAPP_ACCESS_TOKEN
         self.phone_number_id = settings.WHATSAPP_PHONE_NUMBER_ID
-        self.base_url = f"https://graph.facebook.com/v18.0/{self.phone_number_id}/messages"
-    
-    def send_message(self, to_phone, message):
+        api_url = getattr(settings, 'WHATSAPP_API_URL', None) or 'https://graph.facebook.com/v18.0'
+        self.base_url = f"{api_url.rstrip('/')}/{self.phone_number_id}/messages"
+
+    def is_configured(self):
+        return bool(self.access_token and self.phone_number_id)
+
+    def rate_limit_key(self):
+        return f"{self.name}:{self.phone_number_id or ''}"
+
+    def deliver(self, to_phone, message):
         """Send a WhatsApp message to a phone number"""
-        if not self.access_token or not self.phone_number_id:
-            return False, "WhatsApp API not configured"
-        
+        if not self.is_configured():
+            return self._result(False, "WhatsApp API not configured")
+
         headers = {
             'Authorization': f'Bearer {self.access_token}',
             'Content-Type': 'application/json'
         }
-        
+
+        # WhatsApp Cloud API expects the E.164 number without the leading +
+        to_phone = (normalize_phone(to_phone) or to_phone).lstrip('+')
+
         data = {
             "messaging_product": "whatsapp",
             "to": to_phone,
@@ -28,22 +40,23 @@ class WhatsAppService:
                 "body": message
             }
         }
-        
+
         try:
-            response = requests.post(self.base_url, headers=headers, json=data)
-            if response.status_code == 200:
-                return True, "Message sent successfully"
-            else:
-                return False, f"Failed to send message: {response.text}"
-        except Exception as e:
-            return False, f"Error sending message: {str(e)}"
-    
-    def send_rent_confirmation(self, tenant):
-        """Send rent payment confirmation message"""
-        message = f"Hello {tenant.name}, we have received your rent payment for apartment {tenant.apartment_number}. Thank you!"
-        return self.send_message(tenant.phone, message)
-    
-    def send_rent_reminder(self, tenant):
-        """Send rent reminder message"""
-        message = f"Hello {tenant.name}, this is a friendly reminder that your rent for apartment {tenant.apartment_number} (KSh {tenant.rent_amount}) is due. Please make your payment as soon as possible. Thank you!"
-        return self.send_message(tenant.phone, message)
+            response = self.session.post(self.base_url, headers=headers, json=data, timeout=provider_timeout())
+        except requests.exceptions.Timeout:
+            return self._result(False, "WhatsApp request timed out", {'error': 'timeout'}, transient=True)
+        except requests.exceptions.RequestException as e:
+            error_msg = f"Error sending message: {str(e)}"
+            return self._result(False, error_msg, {'error': error_msg}, transient=True)
+
+        if response.status_code == 200:
+            return self._result(True, "Message sent successfully", {'response': response.text[:500]})
+        return self._result(
+            False, f"Failed to send message: {response.text}", {'error': f"HTTP {response.status_code}"},
+            transient=response.status_code in TRANSIENT_HTTP_STATUSES
+        )
+
+    def send_message(self, to_phone, message):
+        """Send a WhatsApp message without logging"""
+        result = self.deliver(to_phone, message)
+        return result.success, result.message
@@ -4,14 +4,15 @@ Django settings for rental_management project.
 
 import os
 from pathlib import Path
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Load environment variables from .env in development; Heroku sets real ones
+if (BASE_DIR / '.env').exists():
+    from dotenv import load_dotenv
+    load_dotenv(BASE_DIR / '.env')
+
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv('SECRET_KEY', 'django-insecure-change-this-in-production')
 
@@ -83,6 +84,29 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Wait for concurrent writers instead of failing with "database is locked"
+            'OPTIONS': {'timeout': 20},
+            # File-backed test database so threaded tests get real write locking
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+
+# Cache - shared by all gunicorn workers. Use Redis (REDIS_URL, set by the Heroku Redis
+# add-on; needs the redis package) when running more than one dyno/machine, otherwise a
+# local file cache
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', str(BASE_DIR / '.django_cache')),
+            'OPTIONS': {'MAX_ENTRIES': 5000},
         }
     }
 
@@ -136,17 +160,94 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 
+# Phone numbers without an international prefix are treated as local numbers of this country
+PHONE_DEFAULT_COUNTRY_CODE = os.getenv('PHONE_DEFAULT_COUNTRY_CODE', '254')
+PHONE_NATIONAL_NUMBER_LENGTH = int(os.getenv('PHONE_NATIONAL_NUMBER_LENGTH', '9'))
+
 # Africa's Talking SMS Configuration
 AFRICASTALKING_USERNAME = os.getenv('AFRICASTALKING_USERNAME', 'sandbox')
 AFRICASTALKING_API_KEY = os.getenv('AFRICASTALKING_API_KEY')
 AFRICASTALKING_SENDER_ID = os.getenv('AFRICASTALKING_SENDER_ID', 'RENTAL')
+# Defaults to the sandbox or live messaging endpoint depending on the username
+AFRICASTALKING_API_URL = os.getenv('AFRICASTALKING_API_URL')
+# Delivery reports: register /sms/delivery-report/?token=... as the DLR callback URL.
+# Required: reports are rejected with 403 while it is unset
+AFRICASTALKING_DLR_TOKEN = os.getenv('AFRICASTALKING_DLR_TOKEN')
+# Reports are applied in batches of this size, or once the oldest has waited this many seconds
+DLR_BATCH_SIZE = int(os.getenv('DLR_BATCH_SIZE', '200'))
+DLR_BATCH_MAX_WAIT = int(os.getenv('DLR_BATCH_MAX_WAIT', '5'))
 
 # SMSMobile API Configuration (Legacy - can be removed)
 SMSMOBILE_API_KEY = os.getenv('SMSMOBILE_API_KEY')
 SMSMOBILE_API_URL = os.getenv('SMSMOBILE_API_URL', 'https://api.smsmobileapi.com/sendsms')
 SMSMOBILE_SENDER_ID = os.getenv('SMSMOBILE_SENDER_ID', 'RENTAL')
 
+# SMS provider routing
+# Providers are tried in this order; unconfigured ones are skipped
+SMS_PROVIDERS = [name.strip() for name in os.getenv('SMS_PROVIDERS', 'smsmobile,africastalking').split(',') if name.strip()]
+# Seconds to wait for a provider to connect / respond before failing over
+SMS_PROVIDER_CONNECT_TIMEOUT = float(os.getenv('SMS_PROVIDER_CONNECT_TIMEOUT', '3'))
+SMS_PROVIDER_TIMEOUT = float(os.getenv('SMS_PROVIDER_TIMEOUT', '10'))
+# Keep-alive connections per provider in each worker process
+SMS_HTTP_POOL_SIZE = int(os.getenv('SMS_HTTP_POOL_SIZE', '10'))
+# Circuit breaker: open after this many consecutive timeouts/5xx (or this error rate), retry after the reset timeout
+SMS_BREAKER_FAILURE_THRESHOLD = int(os.getenv('SMS_BREAKER_FAILURE_THRESHOLD', '3'))
+SMS_BREAKER_ERROR_RATE = float(os.getenv('SMS_BREAKER_ERROR_RATE', '0.5'))
+SMS_BREAKER_RESET_TIMEOUT = int(os.getenv('SMS_BREAKER_RESET_TIMEOUT', '60'))
+# Token buckets per provider + sender ID, shared by all workers through the database:
+# `rate` sends per second sustained, bursts of up to `burst`
+SMS_RATE_LIMITS = {
+    'smsmobile': {
+        'rate': float(os.getenv('SMSMOBILE_RATE_LIMIT', '5')),
+        'burst': float(os.getenv('SMSMOBILE_RATE_BURST', '5')),
+    },
+    'africastalking': {
+        'rate': float(os.getenv('AFRICASTALKING_RATE_LIMIT', '10')),
+        'burst': float(os.getenv('AFRICASTALKING_RATE_BURST', '20')),
+    },
+    'whatsapp': {
+        'rate': float(os.getenv('WHATSAPP_RATE_LIMIT', '20')),
+        'burst': float(os.getenv('WHATSAPP_RATE_BURST', '20')),
+    },
+}
+# Fail over (or fail) rather than queue longer than this many seconds for a provider
+SMS_RATE_LIMIT_MAX_WAIT = float(os.getenv('SMS_RATE_LIMIT_MAX_WAIT', '30'))
+# Transient failures are resent by `manage.py process_sms_retries --loop` with exponential
+# backoff (base delay doubling up to the max, half of it randomized) before being dead-lettered
+SMS_RETRY_MAX_ATTEMPTS = int(os.getenv('SMS_RETRY_MAX_ATTEMPTS', '5'))
+SMS_RETRY_BASE_DELAY = int(os.getenv('SMS_RETRY_BASE_DELAY', '30'))
+SMS_RETRY_MAX_DELAY = int(os.getenv('SMS_RETRY_MAX_DELAY', '3600'))
+
+# Retention (`manage.py apply_retention`): raw rows older than keep_days are rolled into
+# daily summary tables and deleted; SMS provider responses are dropped after strip_response_days
+RETENTION_POLICIES = {
+    'sms_logs': {
+        'keep_days': int(os.getenv('SMS_LOG_RETENTION_DAYS', '180')),
+        'strip_response_days': int(os.getenv('SMS_RESPONSE_RETENTION_DAYS', '30')),
+    },
+    'tenant_history': {'keep_days': int(os.getenv('TENANT_HISTORY_RETENTION_DAYS', '365'))},
+    'payment_history': {'keep_days': int(os.getenv('PAYMENT_HISTORY_RETENTION_DAYS', '365'))},
+}
+
+# Cold storage (`manage.py archive_cold_storage`): ArchivedTenant/ArchivedPayment rows older than
+# COLD_STORAGE_MONTHS move into compressed segment files under COLD_STORAGE_DIR (read them back
+# with rental_app.cold_storage.ColdStorageService). No default: it must be persistent, backed-up
+# storage, never a Heroku dyno's ephemeral disk, because the rows are deleted from the database.
+COLD_STORAGE_DIR = os.getenv('COLD_STORAGE_DIR')
+COLD_STORAGE_MONTHS = int(os.getenv('COLD_STORAGE_MONTHS', '12'))
+
+# M-Pesa (Daraja) Confirmation Callbacks
+# Shared secret expected as ?token=... on the callback URL registered with Safaricom.
+# Required: callbacks are rejected with 403 while it is unset
+MPESA_CALLBACK_TOKEN = os.getenv('MPESA_CALLBACK_TOKEN')
+# Callbacks are applied in micro-batches of this size, or once the oldest has waited this many seconds
+# (by the next callback, or by the worker's process_sms_retries --loop)
+MPESA_BATCH_SIZE = int(os.getenv('MPESA_BATCH_SIZE', '100'))
+MPESA_BATCH_MAX_WAIT = int(os.getenv('MPESA_BATCH_MAX_WAIT', '5'))
+
 # WhatsApp Configuration (deprecated - kept for backward compatibility)
 WHATSAPP_ACCESS_TOKEN = os.getenv('WHATSAPP_ACCESS_TOKEN')
 WHATSAPP_PHONE_NUMBER_ID = os.getenv('WHATSAPP_PHONE_NUMBER_ID')
 WHATSAPP_VERIFY_TOKEN = os.getenv('WHATSAPP_VERIFY_TOKEN')
+# Graph API base URL; override to point at a local stand-in such as sms_simulator.py
+WHATSAPP_API_URL = os.getenv('WHATSAPP_API_URL', 'https://graph.facebook.com/v18.0')
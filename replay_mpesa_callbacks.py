@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""
+Replay recorded M-Pesa callback payloads against the callback webhook
+
+Usage:
+    # Record synthetic C2B confirmations for the tenants in the local database
+    python replay_mpesa_callbacks.py --generate 5000 --output callbacks.jsonl
+
+    # Replay them against a running server (python manage.py runserver)
+    python replay_mpesa_callbacks.py callbacks.jsonl --concurrency 16
+
+Each line of the input file is one JSON payload exactly as Safaricom posted it.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+# Add the project directory to Python path
+project_dir = Path(__file__).resolve().parent
+sys.path.append(str(project_dir))
+
+
+def generate_payloads(count, output, duplicate_rate):
+    """Write synthetic C2B confirmations for existing tenants"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rental_management.settings')
+    import django
+    django.setup()
+
+    from rental_app.models import Tenant
+
+    tenants = list(Tenant.objects.values('phone', 'apartment_number', 'rent_amount', 'name'))
+    if not tenants:
+        print("❌ No tenants found! Run add_sample_tenants.py first")
+        return False
+
+    written = []
+    with open(output, 'w') as fh:
+        for i in range(count):
+            if written and random.random() < duplicate_rate:
+                # Safaricom re-sends confirmations it thinks were not acknowledged
+                payload = random.choice(written)
+            else:
+                tenant = random.choice(tenants)
+                use_account = random.random() < 0.7
+                payload = {
+                    "TransactionType": "Pay Bill",
+                    "TransID": f"RPL{i:07d}",
+                    "TransTime": time.strftime('%Y%m%d%H%M%S'),
+                    "TransAmount": str(random.choice([tenant['rent_amount'], tenant['rent_amount'] / 2])),
+                    "BusinessShortCode": "600638",
+                    "BillRefNumber": tenant['apartment_number'] if use_account else "",
+                    "InvoiceNumber": "",
+                    "OrgAccountBalance": "",
+                    "ThirdPartyTransID": "",
+                    "MSISDN": tenant['phone'].lstrip('+'),
+                    "FirstName": tenant['name'].split()[0],
+                }
+                written.append(payload)
+            fh.write(json.dumps(payload, default=str) + '\n')
+
+    print(f"✅ Wrote {count} callbacks to {output}")
+    return True
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def replay(path, url, concurrency):
+    """POST every payload in the file and report throughput and latency"""
+    with open(path) as fh:
+        payloads = [line for line in fh if line.strip()]
+
+    print(f"📤 Replaying {len(payloads)} callbacks to {url} ({concurrency} concurrent)")
+    print("=" * 60)
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    def post(body):
+        start = time.perf_counter()
+        try:
+            response = session.post(url, data=body, headers={'Content-Type': 'application/json'}, timeout=30)
+            status = response.status_code
+        except requests.exceptions.RequestException:
+            status = None
+        return status, time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(post, payloads))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency * 1000 for _, latency in results]
+    accepted = sum(1 for status, _ in results if status == 200)
+    rejected = sum(1 for status, _ in results if status and status != 200)
+    errors = sum(1 for status, _ in results if status is None)
+
+    print(f"✅ Accepted: {accepted}")
+    print(f"⚠️  Rejected: {rejected}")
+    print(f"❌ Network errors: {errors}")
+    print(f"⏱️  {len(results) / elapsed:.1f} callbacks/sec over {elapsed:.2f}s")
+    print(f"📊 Latency p50 {percentile(latencies, 50):.1f} ms, "
+          f"p99 {percentile(latencies, 99):.1f} ms, max {max(latencies or [0]):.1f} ms")
+    print("\n💡 Run 'python manage.py process_mpesa_callbacks' to flush the last partial batch")
+    return errors == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('file', nargs='?', help='JSONL file of recorded callback payloads')
+    parser.add_argument('--url', default='http://127.0.0.1:8000/mpesa/callback/', help='Callback URL (include ?token=... if configured)')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--generate', type=int, metavar='N', help='Generate N synthetic callbacks instead of replaying')
+    parser.add_argument('--output', default='mpesa_callbacks.jsonl', help='Output file for --generate')
+    parser.add_argument('--duplicate-rate', type=float, default=0.02, help='Fraction of re-sent duplicates for --generate')
+    args = parser.parse_args()
+
+    if args.generate:
+        return generate_payloads(args.generate, args.output, args.duplicate_rate)
+    if not args.file:
+        parser.error('a callback file is required unless --generate is used')
+    return replay(args.file, args.url, args.concurrency)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+"""
+Local stand-in for the SMS and WhatsApp provider APIs
+
+Speaks just enough of each API for the service classes in rental_app:
+
+    GET  /sendsms                          SMSMobile (text response)
+    POST /version1/messaging               Africa's Talking (JSON, messageId)
+    POST /<version>/<phone_id>/messages    WhatsApp Cloud API (JSON)
+    GET  /_stats                           Request counters (JSON)
+
+Latency, error rate and a per-provider rate limit (HTTP 429) are
+configurable, so failover, retries and throttling can be exercised offline.
+
+Usage:
+    python sms_simulator.py --port 8025 --latency 80 --jitter 40 --error-rate 0.05 --rate-limit 10
+
+Then point the app at it (the script prints the exact values):
+    SMSMOBILE_API_URL=http://127.0.0.1:8025/sendsms
+    AFRICASTALKING_API_URL=http://127.0.0.1:8025/version1/messaging
+    WHATSAPP_API_URL=http://127.0.0.1:8025/v18.0
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from urllib.request import Request, urlopen
+
+WHATSAPP_PATH = re.compile(r'^/v[\d.]+/[^/]+/messages$')
+
+
+class Bucket:
+    """Token bucket for one provider account"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class ProviderSimulator:
+    """Threaded HTTP server that answers like the real providers"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 rate_limit=None, burst=None, dlr_url=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.burst = burst or rate_limit
+        self.dlr_url = dlr_url
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), SimulatorHandler)
+        self.server.daemon_threads = True
+        self.server.simulator = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def settings_overrides(self):
+        """Settings that send every provider to this simulator"""
+        return {
+            'SMSMOBILE_API_KEY': 'simulator',
+            'SMSMOBILE_API_URL': f"{self.url}/sendsms",
+            'AFRICASTALKING_API_KEY': 'simulator',
+            'AFRICASTALKING_API_URL': f"{self.url}/version1/messaging",
+            'WHATSAPP_ACCESS_TOKEN': 'simulator',
+            'WHATSAPP_PHONE_NUMBER_ID': '100000000000000',
+            'WHATSAPP_API_URL': f"{self.url}/v18.0",
+        }
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def throttled(self, provider):
+        """True if this request is over the provider's rate limit"""
+        if not self.rate_limit:
+            return False
+        with self.lock:
+            bucket = self.buckets.get(provider)
+            if bucket is None:
+                bucket = self.buckets[provider] = Bucket(self.rate_limit, self.burst)
+        return not bucket.take()
+
+    def should_fail(self):
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def wait(self):
+        with self.lock:
+            delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+
+    def send_delivery_report(self, message_id, phone):
+        """Post an Africa's Talking style 'Success' report to the app"""
+        if not self.dlr_url:
+            return
+
+        def post():
+            time.sleep(self.latency)
+            body = f"id={message_id}&status=Success&phoneNumber={phone}&networkCode=63902".encode()
+            try:
+                urlopen(Request(self.dlr_url, data=body, method='POST'), timeout=5).read()
+                self.count('dlr_sent')
+            except Exception:
+                self.count('dlr_failed')
+
+        threading.Thread(target=post, daemon=True).start()
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; avoid delayed-ACK stalls on keep-alive
+    disable_nagle_algorithm = True
+
+    @property
+    def simulator(self):
+        return self.server.simulator
+
+    def do_GET(self):
+        path = urlparse(self.path)
+        if path.path == '/_stats':
+            return self.reply(200, self.simulator.snapshot())
+        if path.path == '/sendsms':
+            return self.smsmobile(parse_qs(path.query))
+        return self.reply(404, {'error': 'not found'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        path = urlparse(self.path).path
+        if path == '/version1/messaging':
+            return self.africastalking(parse_qs(body.decode()))
+        if WHATSAPP_PATH.match(path):
+            return self.whatsapp(body)
+        return self.reply(404, {'error': 'not found'})
+
+    def admit(self, provider):
+        """Apply the rate limit, latency and error rate; returns False if already answered"""
+        self.simulator.count(f"{provider}_requests")
+        if self.simulator.throttled(provider):
+            self.simulator.count(f"{provider}_throttled")
+            self.reply(429, {'error': 'Too many requests'}, headers={'Retry-After': '1'})
+            return False
+        self.simulator.wait()
+        return True
+
+    def smsmobile(self, params):
+        if not self.admit('smsmobile'):
+            return
+        if not params.get('api_key'):
+            self.simulator.count('smsmobile_rejected')
+            return self.reply(401, 'Invalid API key')
+        if self.simulator.should_fail():
+            self.simulator.count('smsmobile_errors')
+            return self.reply(503, 'Service temporarily unavailable')
+        self.simulator.count('smsmobile_sent')
+        self.reply(200, 'Message sent successfully')
+
+    def africastalking(self, form):
+        if not self.admit('africastalking'):
+            return
+        if not self.headers.get('apiKey'):
+            self.simulator.count('africastalking_rejected')
+            return self.reply(401, 'The supplied authentication is invalid')
+        phone = (form.get('to') or [''])[0]
+        if self.simulator.should_fail():
+            self.simulator.count('africastalking_errors')
+            recipient = {'statusCode': 500, 'number': phone, 'status': 'InternalServerError',
+                         'cost': '0', 'messageId': 'None'}
+            message = 'Sent to 0/1 Total Cost: 0'
+        else:
+            self.simulator.count('africastalking_sent')
+            message_id = f"ATXid_{uuid.uuid4().hex}"
+            recipient = {'statusCode': 101, 'number': phone, 'status': 'Success',
+                         'cost': 'KES 0.8000', 'messageId': message_id}
+            message = 'Sent to 1/1 Total Cost: KES 0.8000'
+            self.simulator.send_delivery_report(message_id, phone)
+        self.reply(201, {'SMSMessageData': {'Message': message, 'Recipients': [recipient]}})
+
+    def whatsapp(self, body):
+        if not self.admit('whatsapp'):
+            return
+        if not (self.headers.get('Authorization') or '').startswith('Bearer '):
+            self.simulator.count('whatsapp_rejected')
+            return self.reply(401, {'error': {'message': 'Invalid OAuth access token', 'code': 190}})
+        if self.simulator.should_fail():
+            self.simulator.count('whatsapp_errors')
+            return self.reply(500, {'error': {'message': 'An unknown error occurred', 'code': 1}})
+        try:
+            to = json.loads(body or b'{}').get('to', '')
+        except ValueError:
+            return self.reply(400, {'error': {'message': 'Invalid JSON', 'code': 100}})
+        self.simulator.count('whatsapp_sent')
+        self.reply(200, {
+            'messaging_product': 'whatsapp',
+            'contacts': [{'input': to, 'wa_id': to}],
+            'messages': [{'id': f"wamid.{uuid.uuid4().hex}"}],
+        })
+
+    def reply(self, status, body, headers=None):
+        if isinstance(body, (dict, list)):
+            payload, content_type = json.dumps(body).encode(), 'application/json'
+        else:
+            payload, content_type = str(body).encode(), 'text/plain'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--latency', type=float, default=0, help='Base response latency in ms')
+    parser.add_argument('--jitter', type=float, default=0, help='Extra random latency up to this many ms')
+    parser.add_argument('--error-rate', type=float, default=0, help='Share of requests that fail transiently (0-1)')
+    parser.add_argument('--rate-limit', type=float, help='Requests per second per provider before HTTP 429')
+    parser.add_argument('--burst', type=float, help='Burst size for the rate limit (default: the rate)')
+    parser.add_argument('--dlr-url', help="Post Africa's Talking delivery reports here, "
+                                          "e.g. http://127.0.0.1:8000/sms/delivery-report/?token=...")
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible errors and jitter')
+    args = parser.parse_args()
+
+    simulator = ProviderSimulator(
+        args.host, args.port, latency=args.latency / 1000, jitter=args.jitter / 1000,
+        error_rate=args.error_rate, rate_limit=args.rate_limit, burst=args.burst,
+        dlr_url=args.dlr_url, seed=args.seed,
+    )
+    print(f"📡 SMS provider simulator listening on {simulator.url}")
+    print("💡 Point the app at it with:")
+    for name, value in simulator.settings_overrides().items():
+        print(f"   {name}={value}")
+    try:
+        simulator.server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {simulator.snapshot()}")
+    finally:
+        simulator.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+/*
+ * Tenant picker for forms using TenantAutocompleteWidget: searches
+ * /tenants/search/ as the user types and stores the chosen tenant's id in
+ * the hidden input that is submitted with the form.
+ */
+(function () {
+    function setup(container) {
+        const input = container.querySelector('input[type="search"]');
+        const hidden = container.querySelector('input[type="hidden"]');
+        const results = container.querySelector('.list-group');
+        let timer = null;
+        let controller = null;
+
+        function clear() {
+            results.replaceChildren();
+        }
+
+        function choose(tenant) {
+            hidden.value = tenant.id;
+            input.value = tenant.name + ' - Apt ' + tenant.apartment_number;
+            input.setCustomValidity('');
+            clear();
+        }
+
+        function render(tenants) {
+            clear();
+            tenants.forEach(function (tenant) {
+                const item = document.createElement('button');
+                item.type = 'button';
+                item.className = 'list-group-item list-group-item-action py-1';
+                const name = document.createElement('strong');
+                name.textContent = tenant.name;
+                const detail = document.createElement('small');
+                detail.className = 'text-muted ms-2';
+                detail.textContent = [tenant.property, tenant.apartment_number, 'KSh ' + tenant.amount_due + ' due']
+                    .filter(Boolean).join(' · ');
+                item.append(name, detail);
+                item.addEventListener('click', function () { choose(tenant); });
+                results.appendChild(item);
+            });
+        }
+
+        input.addEventListener('input', function () {
+            // Typing invalidates the previous choice until a result is picked
+            hidden.value = '';
+            clearTimeout(timer);
+            const query = input.value.trim();
+            if (query.length < 2) {
+                clear();
+                return;
+            }
+            timer = setTimeout(function () {
+                if (controller) {
+                    controller.abort();
+                }
+                controller = new AbortController();
+                fetch(container.dataset.url + '?q=' + encodeURIComponent(query), {signal: controller.signal})
+                    .then(function (response) { return response.json(); })
+                    .then(function (data) { render(data.results); })
+                    .catch(function () {});
+            }, 150);
+        });
+
+        input.form.addEventListener('submit', function (event) {
+            if (input.required && !hidden.value) {
+                input.setCustomValidity('Choose a tenant from the list');
+                input.reportValidity();
+                event.preventDefault();
+            }
+        });
+
+        document.addEventListener('click', function (event) {
+            if (!container.contains(event.target)) {
+                clear();
+            }
+        });
+    }
+
+    document.querySelectorAll('[data-tenant-autocomplete]').forEach(setup);
+})();